@@ -135,7 +135,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'showcase.pagination.StandardPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
@@ -162,4 +162,23 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'flush-engagement-counters': {
+        'task': 'showcase.tasks.flush_engagement_counters',
+        'schedule': 60.0,
+    },
+    'compact-engagement-buckets': {
+        'task': 'showcase.tasks.compact_engagement_buckets',
+        'schedule': 24 * 60 * 60.0,
+    },
+    # Filet de sécurité si une tâche de basculement programmée est perdue
+    'swap-promotion-timeline': {
+        'task': 'showcase.tasks.swap_promotion_timeline',
+        'schedule': 5 * 60.0,
+    },
+    'reconcile-promotion-usage': {
+        'task': 'showcase.tasks.reconcile_promotion_usage',
+        'schedule': 24 * 60 * 60.0,
+    },
+}
 
@@ -157,6 +157,10 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
+# Envoi des campagnes : connexions SMTP parallèles, débit par connexion (messages/s)
+NEWSLETTER_SEND_WORKERS = config('NEWSLETTER_SEND_WORKERS', default=4, cast=int)
+NEWSLETTER_SEND_RATE = config('NEWSLETTER_SEND_RATE', default=None, cast=lambda v: float(v) if v else None)
+
 # =============================================================================
 # LOGGING
 # =============================================================================
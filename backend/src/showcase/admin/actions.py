@@ -1,20 +1,19 @@
 from django.contrib import messages
 
+from ..response_cache import invalidate_tags
+
 
 class ProductActions:
     """Bulk actions for Product admin"""
 
     @staticmethod
     def recalculate_scores(modeladmin, request, queryset):
+        from ..models import ProductStatus
         from ..services.scoring_service import ScoringService
 
-        count = 0
-        for product in queryset:
-            if hasattr(product, 'status'):
-                product.status.recalculate_scores()
-                count += 1
+        count = ScoringService.bulk_recalculate(ProductStatus.objects.filter(product__in=queryset))
 
-        messages.success(request, f"✅ Scores recalculés pour {count} produit(s)")
+        messages.success(request, f"✅ Scores mis à jour pour {count} produit(s)")
 
     @staticmethod
     def force_featured(modeladmin, request, queryset):
@@ -23,6 +22,7 @@ class ProductActions:
             status__is_featured=True,
             status__featured_score=100.0
         )
+        invalidate_tags('products', 'categories')
         messages.success(request, f"⭐ {count} produit(s) forcé(s) en vedette")
 
     @staticmethod
@@ -32,6 +32,7 @@ class ProductActions:
             status__is_recommended=True,
             status__recommendation_score=100.0
         )
+        invalidate_tags('products', 'categories')
         messages.success(request, f"👍 {count} produit(s) forcé(s) en recommandé")
 
     @staticmethod
@@ -40,6 +41,7 @@ class ProductActions:
             status__exclude_from_featured=True,
             status__is_featured=False
         )
+        invalidate_tags('products', 'categories')
         messages.success(request, f"🚫 {count} produit(s) exclu(s) des vedettes")
 
     @staticmethod
@@ -48,26 +50,31 @@ class ProductActions:
             status__exclude_from_recommended=True,
             status__is_recommended=False
         )
+        invalidate_tags('products', 'categories')
         messages.success(request, f"🚫 {count} produit(s) exclu(s) des recommandations")
 
     @staticmethod
     def activate(modeladmin, request, queryset):
         count = queryset.update(is_active=True)
+        invalidate_tags('products', 'categories')
         messages.success(request, f"✅ {count} produit(s) activé(s)")
 
     @staticmethod
     def deactivate(modeladmin, request, queryset):
         count = queryset.update(is_active=False)
+        invalidate_tags('products', 'categories')
         messages.success(request, f"⏸️ {count} produit(s) désactivé(s)")
 
     @staticmethod
     def mark_in_stock(modeladmin, request, queryset):
         count = queryset.update(is_in_stock=True)
+        invalidate_tags('products', 'categories')
         messages.success(request, f"📦 {count} produit(s) marqué(s) en stock")
 
     @staticmethod
     def mark_out_of_stock(modeladmin, request, queryset):
         count = queryset.update(is_in_stock=False)
+        invalidate_tags('products', 'categories')
         messages.warning(request, f"📦 {count} produit(s) marqué(s) rupture de stock")
 
 
@@ -85,24 +92,38 @@ class CategoryActions:
 class PromotionActions:
     """Bulk actions for Promotion admin"""
 
+    @staticmethod
+    def _promotions_changed():
+        # update() n'émet pas de signal : calendrier des promotions et prix effectifs à recalculer
+        from ..promotion_timeline import invalidate_promotion_timeline
+        from ..services.pricing_service import PricingService
+
+        invalidate_tags('promotions', 'products')
+        invalidate_promotion_timeline()
+        PricingService.schedule_refresh()
+
     @staticmethod
     def activate_promotions(modeladmin, request, queryset):
         count = queryset.update(active=True)
+        PromotionActions._promotions_changed()
         messages.success(request, f"✅ {count} promotion(s) activée(s)")
 
     @staticmethod
     def deactivate_promotions(modeladmin, request, queryset):
         count = queryset.update(active=False)
+        PromotionActions._promotions_changed()
         messages.warning(request, f"⏸️ {count} promotion(s) désactivée(s)")
 
     @staticmethod
     def mark_stackable(modeladmin, request, queryset):
         count = queryset.update(is_stackable=True)
+        PromotionActions._promotions_changed()
         messages.info(request, f"🔗 {count} promotion(s) marquée(s) comme empilables")
 
     @staticmethod
     def mark_non_stackable(modeladmin, request, queryset):
         count = queryset.update(is_stackable=False)
+        PromotionActions._promotions_changed()
         messages.info(request, f"🚫 {count} promotion(s) marquée(s) comme non-empilables")
 
 
@@ -132,3 +153,30 @@ class NewsletterActions:
     def subscribe_users(modeladmin, request, queryset):
         count = queryset.update(subscribed=True)
         messages.success(request, f"✅ {count} abonné(s) réabonné(s)")
+
+    @staticmethod
+    def send_campaigns(modeladmin, request, queryset):
+        from ..tasks import send_newsletter_campaign
+
+        campaigns = list(queryset.exclude(status__in=['sending', 'sent', 'cancelled']))
+        for campaign in campaigns:
+            send_newsletter_campaign.delay(campaign.pk)
+        messages.success(request, f"📤 Envoi lancé pour {len(campaigns)} campagne(s)")
+
+    @staticmethod
+    def resume_campaigns(modeladmin, request, queryset):
+        from ..tasks import send_newsletter_campaign
+
+        campaigns = list(queryset.filter(status__in=['sent', 'cancelled']))
+        for campaign in campaigns:
+            send_newsletter_campaign.delay(campaign.pk, resume=True)
+        messages.success(request, f"🔁 Reprise lancée pour {len(campaigns)} campagne(s)")
+
+    @staticmethod
+    def retry_failed_campaigns(modeladmin, request, queryset):
+        from ..tasks import send_newsletter_campaign
+
+        campaigns = list(queryset.filter(status__in=['sent', 'cancelled']))
+        for campaign in campaigns:
+            send_newsletter_campaign.delay(campaign.pk, resume=True, retry_failed=True)
+        messages.success(request, f"🔁 Renvoi des échecs lancé pour {len(campaigns)} campagne(s)")
@@ -1,6 +1,9 @@
 from django.contrib.admin import SimpleListFilter, DateFieldListFilter
 from django.utils.translation import gettext_lazy as _
 
+from ..constants import PRICE_RANGES
+from ..utils import get_price_range_q
+
 
 class StockStatusFilter(SimpleListFilter):
     title = _("Statut du stock")
@@ -24,22 +27,12 @@ class PriceRangeFilter(SimpleListFilter):
     parameter_name = "price_range"
 
     def lookups(self, request, model_admin):
-        return (
-            ("<10k", _("Moins de 10k FCFA")),
-            ("10k-50k", _("10k - 50k FCFA")),
-            ("50k-100k", _("50k - 100k FCFA")),
-            (">100k", _("Plus de 100k FCFA")),
-        )
+        return tuple((key, label) for key, label, _minimum, _maximum in PRICE_RANGES)
 
     def queryset(self, request, queryset):
-        if self.value() == "<10k":
-            return queryset.filter(price__lt=10000)
-        if self.value() == "10k-50k":
-            return queryset.filter(price__gte=10000, price__lt=50000)
-        if self.value() == "50k-100k":
-            return queryset.filter(price__gte=50000, price__lt=100000)
-        if self.value() == ">100k":
-            return queryset.filter(price__gte=100000)
+        condition = get_price_range_q(self.value())
+        if condition is not None:
+            return queryset.filter(condition)
 
 
 class DiscountFilter(SimpleListFilter):
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
 
 from ..models import (
     NewsletterSubscriber,
@@ -11,9 +12,21 @@ from .actions import NewsletterActions
 from .utils import AdminDisplay
 
 
+class RecentLogFormSet(BaseInlineFormSet):
+    """Limite l'inline aux logs les plus récents (une ligne par destinataire sinon)"""
+
+    def get_queryset(self):
+        if not hasattr(self, '_limited_queryset'):
+            self._limited_queryset = super().get_queryset()[:NewsletterLogInline.max_logs]
+        return self._limited_queryset
+
+
 class NewsletterLogInline(OptimizedTabularInline):
     model = NewsletterLog
+    formset = RecentLogFormSet
     extra = 0
+    max_logs = 50
+    verbose_name_plural = f"Derniers logs ({max_logs} au plus, le détail dans l'admin des logs)"
     fields = ['subscriber', 'status', 'created_at']
     readonly_fields = ['subscriber', 'status', 'created_at']
 
@@ -21,7 +34,7 @@ class NewsletterLogInline(OptimizedTabularInline):
         return False
 
     def optimize_queryset(self, qs):
-        return qs.select_related('subscriber', 'campaign')
+        return qs.select_related('subscriber', 'campaign').order_by('-created_at')
 
 
 @admin.register(NewsletterSubscriber)
@@ -299,8 +312,14 @@ class NewsletterCampaignAdmin(OptimizedModelAdmin, TimestampReadOnlyMixin):
 
     inlines = [NewsletterLogInline]
 
+    actions = [
+        'send_campaigns',
+        'resume_campaigns',
+        'retry_failed_campaigns',
+    ]
+
     def optimize_queryset(self, qs):
-        return qs.select_related('template').prefetch_related('subscribers')
+        return qs.select_related('template', 'stats').prefetch_related('subscribers')
 
     def status_badge(self, obj):
         status_map = {
@@ -331,6 +350,12 @@ class NewsletterCampaignAdmin(OptimizedModelAdmin, TimestampReadOnlyMixin):
         info = f"<strong>Statut:</strong> {obj.get_status_display()}<br>"
         info += f"<strong>Envoyé:</strong> {obj.sent_count}<br>"
 
+        stats = getattr(obj, 'stats', None)
+        if stats:
+            info += f"<strong>Échecs:</strong> {stats.failed}<br>"
+            for error_class, count in sorted(stats.error_counts.items(), key=lambda item: -item[1]):
+                info += f"&nbsp;&nbsp;{error_class}: {count}<br>"
+
         if obj.scheduled_at:
             info += f"<strong>Programmée pour:</strong> {obj.scheduled_at.strftime('%d/%m/%Y à %H:%M')}<br>"
 
@@ -338,6 +363,19 @@ class NewsletterCampaignAdmin(OptimizedModelAdmin, TimestampReadOnlyMixin):
 
     campaign_info.short_description = "Informations"
 
+    # Actions
+    def send_campaigns(self, request, queryset):
+        return NewsletterActions.send_campaigns(self, request, queryset)
+    send_campaigns.short_description = "📤 Envoyer"
+
+    def resume_campaigns(self, request, queryset):
+        return NewsletterActions.resume_campaigns(self, request, queryset)
+    resume_campaigns.short_description = "🔁 Reprendre l'envoi"
+
+    def retry_failed_campaigns(self, request, queryset):
+        return NewsletterActions.retry_failed_campaigns(self, request, queryset)
+    retry_failed_campaigns.short_description = "♻️ Renvoyer aux destinataires en échec"
+
 
 @admin.register(NewsletterLog)
 class NewsletterLogAdmin(OptimizedModelAdmin):
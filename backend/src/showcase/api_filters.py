@@ -1,7 +1,9 @@
 from django_filters import rest_framework as filters
 from django.db import models
 from .models import Product, Category, Promotion, NewsletterCampaign, NewsletterSubscriber, NewsletterTemplate
-from .constants import PROMOTION_TYPES, NEWSLETTER_CAMPAIGN_STATUSES
+from .constants import PROMOTION_TYPES, NEWSLETTER_CAMPAIGN_STATUSES, PRICE_RANGES
+from .services.search_service import ProductSearchService
+from .utils import get_price_range_q
 
 
 class ProductFilter(filters.FilterSet):
@@ -17,6 +19,12 @@ class ProductFilter(filters.FilterSet):
     min_price = filters.NumberFilter(field_name='price', lookup_expr='gte')
     max_price = filters.NumberFilter(field_name='price', lookup_expr='lte')
     price_range = filters.RangeFilter(field_name='price')
+    min_effective_price = filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_effective_price = filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+    price_bucket = filters.ChoiceFilter(
+        choices=[(key, label) for key, label, _minimum, _maximum in PRICE_RANGES],
+        method='filter_price_bucket'
+    )
     
     # Filtres de stock
     is_in_stock = filters.BooleanFilter()
@@ -39,6 +47,7 @@ class ProductFilter(filters.FilterSet):
         fields=(
             ('name', 'name'),
             ('price', 'price'),
+            ('effective_price', 'effective_price'),
             ('created_at', 'created_at'),
             ('status__view_count', 'view_count'),
             ('status__featured_score', 'featured_score'),
@@ -56,15 +65,25 @@ class ProductFilter(filters.FilterSet):
         else:
             return queryset.filter(compare_at_price__isnull=True) | queryset.filter(compare_at_price__lte=0)
     
+    def filter_price_bucket(self, queryset, name, value):
+        """Filtre sur une gamme de prix prédéfinie (mêmes gammes que l'admin)"""
+        return queryset.filter(get_price_range_q(value))
+    
     def filter_search(self, queryset, name, value):
-        """Recherche dans nom, brand, description, SKU"""
-        return queryset.filter(
-            models.Q(name__icontains=value) |
-            models.Q(brand__icontains=value) |
-            models.Q(description__icontains=value) |
-            models.Q(sku__icontains=value) |
-            models.Q(barcode__icontains=value)
-        )
+        """Recherche plein texte (nom, marque, descriptions, SKU, code-barres), par pertinence"""
+        return ProductSearchService.search(queryset, value).order_by('-search_rank', '-created_at')
+
+
+def get_filter_params(filterset_class):
+    """Paramètres de requête lus par un FilterSet (`price_range_min`, ... pour les plages)"""
+    params = set()
+    for name, filter_ in filterset_class.base_filters.items():
+        suffixes = getattr(filter_.field.widget, 'suffixes', None)
+        if suffixes:
+            params.update(f'{name}_{suffix}' if suffix else name for suffix in suffixes)
+        else:
+            params.add(name)
+    return frozenset(params)
 
 
 class CategoryFilter(filters.FilterSet):
@@ -146,21 +165,12 @@ class PromotionFilter(filters.FilterSet):
         fields = []
     
     def filter_is_active_now(self, queryset, name, value):
-        """Filtre les promotions actuellement actives"""
-        from django.utils import timezone
-        now = timezone.now()
+        """Filtre les promotions actuellement actives (calendrier précalculé)"""
+        from .promotion_timeline import get_active_promotion_ids
         
         if value:
-            return queryset.filter(
-                active=True,
-                start_at__lte=now,
-                end_at__gte=now
-            )
-        return queryset.exclude(
-            active=True,
-            start_at__lte=now,
-            end_at__gte=now
-        )
+            return queryset.filter(pk__in=get_active_promotion_ids())
+        return queryset.exclude(pk__in=get_active_promotion_ids())
     
     def filter_search(self, queryset, name, value):
         """Recherche dans nom et code"""
@@ -0,0 +1,208 @@
+"""
+Structures partagées (ensembles, hashes, compteurs) pour les files et
+compteurs applicatifs.
+
+En production le cache par défaut est Redis (django_redis) : les opérations
+sont atomiques et partagées entre workers. Sans Redis (dev, tests), un
+équivalent en mémoire du processus est utilisé.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+KEY_PREFIX = 'showcase:'
+
+# Incrémente un compteur de hash et l'inscrit comme valeur de champs d'un autre hash
+HSET_VERSION_SCRIPT = """
+local version = redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+for i = 2, #ARGV do
+    redis.call('HSET', KEYS[1], ARGV[i], version)
+end
+return version
+"""
+
+
+class RedisCacheStore:
+    """Opérations atomiques sur la connexion Redis du cache par défaut"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._hset_version_script = None
+
+    def sadd(self, key, *members):
+        return self.connection.sadd(KEY_PREFIX + key, *members)
+
+    def scard(self, key):
+        return self.connection.scard(KEY_PREFIX + key)
+
+    def pop_all(self, key):
+        """Retire et retourne tous les membres d'un ensemble"""
+        pipe = self.connection.pipeline(transaction=True)
+        pipe.smembers(KEY_PREFIX + key)
+        pipe.delete(KEY_PREFIX + key)
+        members, _ = pipe.execute()
+        return {m.decode() if isinstance(m, bytes) else m for m in members}
+
+    def incr(self, key, amount=1):
+        return self.connection.incrby(KEY_PREFIX + key, amount)
+
+    def get_int(self, key):
+        return int(self.connection.get(KEY_PREFIX + key) or 0)
+
+    def hincrby(self, key, field, amount=1):
+        return self.connection.hincrby(KEY_PREFIX + key, field, amount)
+
+    def hset(self, key, field, value):
+        self.connection.hset(KEY_PREFIX + key, field, int(value))
+
+    def hget(self, key, field):
+        value = self.connection.hget(KEY_PREFIX + key, field)
+        return int(value) if value is not None else None
+
+    def hlen(self, key):
+        return self.connection.hlen(KEY_PREFIX + key)
+
+    def hset_version(self, key, fields, version_key, version_field='version'):
+        """
+        Incrémente `version_field` de `version_key` et affecte la nouvelle
+        valeur à chacun des `fields` de `key`, en une opération atomique.
+        Retourne la nouvelle version.
+        """
+        if self._hset_version_script is None:
+            self._hset_version_script = self.connection.register_script(HSET_VERSION_SCRIPT)
+        return int(self._hset_version_script(
+            keys=[KEY_PREFIX + key, KEY_PREFIX + version_key],
+            args=[version_field, *fields]
+        ))
+
+    def hmget_multi(self, keys, fields):
+        """Valeurs de `fields` dans chaque hash de `keys`, en un aller-retour"""
+        pipe = self.connection.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(KEY_PREFIX + key, list(fields))
+        return [
+            [int(value) if value is not None else None for value in values]
+            for values in pipe.execute()
+        ]
+
+    def hgetall(self, key):
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in self.connection.hgetall(KEY_PREFIX + key).items()
+        }
+
+    def pop_hash(self, key):
+        """Retire et retourne tout le contenu d'un hash"""
+        pipe = self.connection.pipeline(transaction=True)
+        pipe.hgetall(KEY_PREFIX + key)
+        pipe.delete(KEY_PREFIX + key)
+        values, _ = pipe.execute()
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in values.items()
+        }
+
+    def delete(self, *keys):
+        if keys:
+            self.connection.delete(*[KEY_PREFIX + key for key in keys])
+
+
+class LocalCacheStore:
+    """Équivalent en mémoire du processus, sans partage entre workers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets = defaultdict(set)
+        self._hashes = defaultdict(lambda: defaultdict(int))
+        self._counters = defaultdict(int)
+
+    def sadd(self, key, *members):
+        with self._lock:
+            before = len(self._sets[key])
+            self._sets[key].update(str(m) for m in members)
+            return len(self._sets[key]) - before
+
+    def scard(self, key):
+        with self._lock:
+            return len(self._sets.get(key, ()))
+
+    def pop_all(self, key):
+        with self._lock:
+            return self._sets.pop(key, set())
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+            return self._counters[key]
+
+    def get_int(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            self._hashes[key][str(field)] += amount
+            return self._hashes[key][str(field)]
+
+    def hset(self, key, field, value):
+        with self._lock:
+            self._hashes[key][str(field)] = int(value)
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._hashes.get(key, {}).get(str(field))
+
+    def hlen(self, key):
+        with self._lock:
+            return len(self._hashes.get(key, ()))
+
+    def hset_version(self, key, fields, version_key, version_field='version'):
+        with self._lock:
+            self._hashes[version_key][str(version_field)] += 1
+            version = self._hashes[version_key][str(version_field)]
+            for field in fields:
+                self._hashes[key][str(field)] = version
+            return version
+
+    def hmget_multi(self, keys, fields):
+        with self._lock:
+            return [
+                [self._hashes.get(key, {}).get(str(field)) for field in fields]
+                for key in keys
+            ]
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def pop_hash(self, key):
+        with self._lock:
+            return dict(self._hashes.pop(key, {}))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._sets.pop(key, None)
+                self._hashes.pop(key, None)
+                self._counters.pop(key, None)
+
+
+_local_store = LocalCacheStore()
+_redis_store = None
+
+
+def get_cache_store():
+    """Retourne le store Redis si le cache par défaut est django_redis"""
+    global _redis_store
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.startswith('django_redis'):
+        from django_redis import get_redis_connection
+
+        # Un store par connexion : les scripts Lua n'y sont enregistrés qu'une fois
+        connection = get_redis_connection('default')
+        if _redis_store is None or _redis_store.connection is not connection:
+            _redis_store = RedisCacheStore(connection)
+        return _redis_store
+    return _local_store
@@ -0,0 +1,134 @@
+"""
+Instantané en mémoire de l'arbre des catégories.
+
+L'arbre change rarement mais il est lu à chaque page : il est construit en une
+requête, conservé par processus et reconstruit lorsque la version partagée
+dans le cache change (sauvegarde, suppression ou reconstruction MPTT).
+"""
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'showcase:category_tree:version'
+
+
+class CategoryNode:
+    """Nœud de l'instantané, compatible en lecture avec les serializers de catégories"""
+
+    __slots__ = (
+        'id', 'pk', 'name', 'slug', 'level', 'parent_id', 'children_ids',
+        'ancestor_ids', 'full_path', 'product_count', 'direct_product_count', '_tree'
+    )
+
+    def __init__(self, tree, id, name, slug, level, parent_id, product_count, direct_product_count):
+        self._tree = tree
+        self.id = self.pk = id
+        self.name = name
+        self.slug = slug
+        self.level = level
+        self.parent_id = parent_id
+        self.children_ids = []
+        self.ancestor_ids = ()
+        self.full_path = name
+        self.product_count = product_count
+        self.direct_product_count = direct_product_count
+
+    @property
+    def is_main_category(self):
+        return self.parent_id is None
+
+    def get_children(self):
+        return [self._tree.nodes[pk] for pk in self.children_ids]
+
+    def get_breadcrumb(self):
+        return [self._tree.nodes[pk] for pk in self.ancestor_ids] + [self]
+
+    def get_full_path(self, separator=' > '):
+        if separator == ' > ':
+            return self.full_path
+        return separator.join(node.name for node in self.get_breadcrumb())
+
+
+class CategoryTree:
+    """Nœuds indexés par id, parcourus dans l'ordre de l'arbre (tree_id, lft)"""
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.nodes = {}
+        self.roots = []
+        self.slugs = {}
+
+        for row in rows:
+            node = CategoryNode(
+                self,
+                row['id'], row['name'], row['slug'], row['level'], row['parent_id'],
+                row['annotated_product_count'], row['annotated_direct_product_count']
+            )
+            parent = self.nodes.get(node.parent_id)
+            if parent is not None:
+                parent.children_ids.append(node.id)
+                node.ancestor_ids = parent.ancestor_ids + (parent.id,)
+                node.full_path = f"{parent.full_path} > {node.name}"
+            else:
+                self.roots.append(node)
+            self.nodes[node.id] = node
+            self.slugs[node.slug] = node
+
+    @classmethod
+    def build(cls, version=None):
+        from .models import Category
+
+        rows = Category.objects.with_product_counts().order_by('tree_id', 'lft').values(
+            'id', 'name', 'slug', 'level', 'parent_id',
+            'annotated_product_count', 'annotated_direct_product_count'
+        )
+        return cls(rows, version)
+
+    def get(self, pk):
+        return self.nodes.get(pk)
+
+    def get_by_slug(self, slug):
+        return self.slugs.get(slug)
+
+    def get_root_nodes(self):
+        return list(self.roots)
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_category_tree():
+    """Retourne l'instantané courant, reconstruit si la version partagée a changé"""
+    global _snapshot
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            version = cache.get(VERSION_KEY)
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CategoryTree.build(version)
+        return _snapshot
+
+
+def _bump_version():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_category_tree():
+    """
+    Invalide l'instantané dans tous les processus. La version est aussi
+    renouvelée après le commit : un processus ayant reconstruit l'arbre avant
+    le commit ne garde pas un état périmé.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
@@ -1,5 +1,7 @@
 from decimal import Decimal
 
+from django.utils.translation import gettext_lazy as _
+
 FEATURED_SCORE_THRESHOLD = Decimal('70.0')
 RECOMMENDATION_SCORE_THRESHOLD = Decimal('65.0')
 
@@ -23,6 +25,44 @@ RECOMMENDATION_WEIGHTS = {
     'recency': Decimal('10.0'),
 }
 
+# Fenêtre de regroupement des recalculs de scores (secondes)
+SCORE_QUEUE_WINDOW_SECONDS = 30
+
+ENGAGEMENT_EVENT_TYPES = [
+    ('view', "Vue"),
+    ('whatsapp_click', "Clic WhatsApp"),
+]
+
+ENGAGEMENT_PERIODS = [
+    ('day', "Jour"),
+    ('month', "Mois"),
+]
+
+# Au-delà, les compteurs journaliers sont regroupés par mois
+ENGAGEMENT_DAY_RETENTION_DAYS = 90
+
+# Cache des réponses publiques (secondes)
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_STALE_TTL = 60
+
+# Statistiques produits : fraîcheur, puis délai pendant lequel l'ancienne valeur
+# reste servie le temps d'un recalcul en tâche de fond (secondes)
+STATS_CACHE_TIMEOUT = 60
+STATS_STALE_TTL = 600
+
+# Gammes de prix (FCFA) : clé, libellé, minimum inclus, maximum exclu
+PRICE_RANGES = [
+    ('<10k', _("Moins de 10k FCFA"), None, 10000),
+    ('10k-50k', _("10k - 50k FCFA"), 10000, 50000),
+    ('50k-100k', _("50k - 100k FCFA"), 50000, 100000),
+    ('>100k', _("Plus de 100k FCFA"), 100000, None),
+]
+
+# Autocomplétion : nombre de suggestions et changements en attente avant reconstruction
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_PENDING_CHANGES = 1000
+
 PRODUCT_IMAGE_FORMATS = ['jpg', 'jpeg', 'png', 'webp']
 ICON_FORMATS = ['ico', 'png', 'jpg', 'jpeg', 'svg', 'webp']
 
@@ -48,3 +88,12 @@ NEWSLETTER_CAMPAIGN_STATUSES = [
     ('sent', "Envoyée"),
     ('cancelled', "Annulée"),
 ]
+
+# Envoi des campagnes : connexions SMTP parallèles et débit maximal par
+# connexion (messages par seconde, None = sans limite). Surchargeables par
+# les réglages NEWSLETTER_SEND_WORKERS et NEWSLETTER_SEND_RATE.
+NEWSLETTER_SEND_WORKERS = 4
+NEWSLETTER_SEND_RATE = None
+
+# Plages de destinataires lancées à la fois par campagne (envoi réparti)
+NEWSLETTER_DISPATCH_WINDOW = 20
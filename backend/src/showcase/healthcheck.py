@@ -47,6 +47,13 @@ def healthcheck(request):
         health_status["checks"]["cache"] = f"unhealthy: {str(e)}"
         all_healthy = False
     
+    # Métriques : file de recalcul des scores (informatif, n'affecte pas le statut)
+    try:
+        from showcase.services.score_queue_service import ScoreQueueService
+        health_status["score_queue"] = ScoreQueueService.get_metrics()
+    except Exception as e:
+        health_status["score_queue"] = f"unavailable: {str(e)}"
+
     # Check 3: Settings
     health_status["checks"]["debug_mode"] = "ON" if settings.DEBUG else "OFF"
     
@@ -0,0 +1,121 @@
+"""
+Envoi d'e-mails en masse sur des connexions SMTP maintenues ouvertes.
+
+Le pool ouvre `size` connexions (`get_connection`) une fois pour toute la
+campagne ; chaque lot de messages est réparti entre elles et envoyé par
+autant de threads, chaque connexion respectant son propre débit maximal.
+Aucun accès à la base n'a lieu ici : l'appelant prépare les messages avant
+l'envoi et enregistre les résultats après.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import get_connection
+
+
+class RateLimiter:
+    """Espace les envois d'au moins 1/`rate` secondes (pas de limite si `rate` est nul)"""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+class MailConnectionPool:
+    """
+    Connexions SMTP réutilisées d'un lot à l'autre.
+
+    Chaque message part par un `send_messages` sur une connexion déjà
+    ouverte : un échec est attribué au bon destinataire sans renvoyer les
+    messages déjà acceptés, et la connexion est rouverte après une erreur.
+    """
+
+    def __init__(self, size=1, rate=None, connection_factory=None):
+        self.size = max(1, int(size))
+        self.rate = rate
+        self.connection_factory = connection_factory
+        self.connections = []
+        self.limiters = []
+        self._executor = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        factory = self.connection_factory or get_connection
+        for _ in range(self.size):
+            connection = factory(fail_silently=False)
+            connection.open()
+            self.connections.append(connection)
+            self.limiters.append(RateLimiter(self.rate))
+        if self.size > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix='mail-pool'
+            )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for connection in self.connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self.connections = []
+        self.limiters = []
+
+    def _send_share(self, slot, messages, indexes, results):
+        connection = self.connections[slot]
+        limiter = self.limiters[slot]
+        for index in indexes:
+            limiter.wait()
+            try:
+                connection.send_messages([messages[index]])
+                results[index] = None
+            except Exception as exc:
+                results[index] = exc
+                # La connexion est peut-être rompue : repartir d'une connexion neuve
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception:
+                    pass
+
+    def send(self, messages):
+        """
+        Envoie `messages` sur les connexions du pool. Retourne, dans l'ordre
+        des messages, None pour un envoi réussi ou l'exception levée.
+        """
+        messages = list(messages)
+        results = [None] * len(messages)
+        shares = [
+            (slot, range(slot, len(messages), self.size))
+            for slot in range(min(self.size, len(messages)))
+        ]
+
+        if self._executor is None:
+            for slot, indexes in shares:
+                self._send_share(slot, messages, indexes, results)
+            return results
+
+        futures = [
+            self._executor.submit(self._send_share, slot, messages, indexes, results)
+            for slot, indexes in shares
+        ]
+        for future in futures:
+            future.result()
+        return results
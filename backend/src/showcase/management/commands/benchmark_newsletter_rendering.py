@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Mesure le coût par destinataire du rendu newsletter (str.format vs template compilé)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=10000,
+            help="Nombre de destinataires simulés"
+        )
+        parser.add_argument(
+            '--template',
+            default=None,
+            help="Slug du template à mesurer (un template d'exemple par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        from showcase.models import NewsletterSubscriber, NewsletterTemplate
+
+        if options['template']:
+            template = NewsletterTemplate.objects.get(slug=options['template'])
+        else:
+            template = NewsletterTemplate(
+                name='Benchmark',
+                subject="{name}, nos nouveautés de la semaine",
+                plain_content=(
+                    "Bonjour {name},\n\n" + "Découvrez nos nouveaux produits.\n" * 20 +
+                    "\nVous recevez cet e-mail à {email}. Se désinscrire : {unsubscribe_url}\n"
+                ),
+                html_content=(
+                    "<p>Bonjour {name},</p>" + "<p>Découvrez nos nouveaux produits.</p>" * 20 +
+                    "<p><a href='{unsubscribe_url}'>Se désinscrire</a> ({email})</p>"
+                ),
+            )
+
+        # Abonnés non enregistrés : seul le rendu est mesuré
+        subscribers = [
+            NewsletterSubscriber(email=f'client{i}@example.com', name=f'Client {i}')
+            for i in range(max(1, options['recipients']))
+        ]
+
+        def render_format(subscriber):
+            context = {
+                'name': subscriber.name or '',
+                'email': subscriber.email,
+                'unsubscribe_url': subscriber.get_unsubscribe_url(),
+            }
+            subject = template.subject.format(name=context['name'], email=subscriber.email)
+            text = template.plain_content.format(**context) if template.plain_content else ''
+            html = template.html_content.format(**context) if template.html_content else ''
+            return subject, text, html
+
+        started = time.perf_counter()
+        compiled = template.compile()
+        compile_time = time.perf_counter() - started
+
+        for label, render in (
+            ('str.format', render_format),
+            ('compilé', compiled.render),
+        ):
+            started = time.perf_counter()
+            for subscriber in subscribers:
+                render(subscriber)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:>12} : {elapsed * 1e6 / len(subscribers):8.2f} µs/destinataire '
+                f'({elapsed:.3f} s pour {len(subscribers)})'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Compilation du template : {compile_time * 1e6:.0f} µs (une fois par campagne)'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index d'applicabilité des promotions (produit → promotions)"
+
+    def handle(self, *args, **options):
+        from showcase.models import PromotionApplicability
+        from showcase.services.promotion_index_service import PromotionIndexService
+
+        PromotionIndexService.rebuild()
+        count = PromotionApplicability.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'✅ Index reconstruit : {count} ligne(s)'))
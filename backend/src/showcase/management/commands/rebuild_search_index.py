@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des produits"
+
+    def handle(self, *args, **options):
+        from showcase.services.search_service import ProductSearchService
+
+        count = ProductSearchService.rebuild()
+        backend = ProductSearchService.backend()
+        self.stdout.write(self.style.SUCCESS(f'✅ Index reconstruit ({backend}) : {count} produit(s)'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Recalcule les scores vedette/recommandation de tout le catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help="Nombre de statuts traités et écrits par lot"
+        )
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help="Délègue le recalcul à une tâche Celery"
+        )
+
+    def handle(self, *args, **options):
+        from showcase.services.scoring_service import ScoringService
+        from showcase.tasks import bulk_recalculate_product_scores
+
+        if options['run_async']:
+            bulk_recalculate_product_scores.delay()
+            self.stdout.write(self.style.SUCCESS('✅ Recalcul des scores planifié'))
+            return
+
+        updated = ScoringService.bulk_recalculate(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Scores recalculés : {updated} statut(s) mis à jour'))
@@ -1,7 +1,8 @@
 from datetime import timedelta
 from decimal import Decimal
 from django.db import models
-from django.db.models import Avg, Count, F, Q
+from django.db.models import Avg, Count, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .constants import FEATURED_SCORE_THRESHOLD, RECOMMENDATION_SCORE_THRESHOLD, NEW_PRODUCT_DAYS_THRESHOLD
@@ -17,6 +18,24 @@ class ProductQuerySet(models.QuerySet):
     def available(self):
         return self.active().in_stock()
 
+    def with_primary_image(self):
+        """
+        Précharge uniquement l'image principale, à défaut la première image
+        (même ordre que `Product.get_main_image`), en une requête.
+        """
+        from .models import ProductImage
+
+        first_image = ProductImage.objects.filter(product=OuterRef('product')).order_by(
+            '-is_primary', 'order', 'created_at'
+        ).values('pk')[:1]
+        return self.prefetch_related(
+            Prefetch(
+                'images',
+                queryset=ProductImage.objects.filter(pk=Subquery(first_image)),
+                to_attr='primary_images'
+            )
+        )
+
     def featured(self):
         return self.filter(
             status__is_featured=True,
@@ -72,6 +91,9 @@ class ProductManager(models.Manager):
     def available(self):
         return self.get_queryset().available()
 
+    def with_primary_image(self):
+        return self.get_queryset().with_primary_image()
+
     def featured(self, limit=10):
         return self.get_queryset().featured().order_by(
             '-status__featured_score',
@@ -100,6 +122,29 @@ class CategoryQuerySet(models.QuerySet):
             direct_products=Count('products', filter=Q(products__is_active=True))
         )
 
+    def with_product_counts(self):
+        """
+        Annote le nombre de produits directs et du sous-arbre de chaque
+        catégorie via des sous-requêtes sur les bornes MPTT (lft/rght), soit
+        une seule requête quel que soit le nombre de catégories.
+        """
+        from .models import Product
+
+        subtree_products = Product.objects.filter(
+            category__tree_id=OuterRef('tree_id'),
+            category__lft__gte=OuterRef('lft'),
+            category__rght__lte=OuterRef('rght')
+        ).order_by().values('category__tree_id').annotate(total=Count('pk')).values('total')
+
+        direct_products = Product.objects.filter(
+            category_id=OuterRef('pk')
+        ).order_by().values('category_id').annotate(total=Count('pk')).values('total')
+
+        return self.annotate(
+            annotated_product_count=Coalesce(Subquery(subtree_products), 0),
+            annotated_direct_product_count=Coalesce(Subquery(direct_products), 0)
+        )
+
     def root_categories(self):
         return self.filter(parent__isnull=True)
 
@@ -117,39 +162,29 @@ class CategoryManager(models.Manager):
     def with_product_count(self):
         return self.get_queryset().with_product_count()
 
+    def with_product_counts(self):
+        return self.get_queryset().with_product_counts()
+
+    def rebuild(self):
+        """Reconstruit les bornes MPTT (le gestionnaire d'arbre n'est pas `objects`)"""
+        from .category_tree import invalidate_category_tree
+
+        self.model._tree_manager.rebuild()
+        invalidate_category_tree()
+
 
 class PromotionQuerySet(models.QuerySet):
     def active(self):
-        now = timezone.now()
-        return self.filter(
-            active=True,
-            start_at__lte=now,
-            end_at__gte=now
-        ) | self.filter(
-            active=True,
-            start_at__isnull=True,
-            end_at__isnull=True
-        ) | self.filter(
-            active=True,
-            start_at__lte=now,
-            end_at__isnull=True
-        ) | self.filter(
-            active=True,
-            start_at__isnull=True,
-            end_at__gte=now
-        )
-
-    def for_product(self, product):
-        now = timezone.now()
-        base_qs = self.filter(active=True)
+        """Promotions actives selon le calendrier précalculé (cf. promotion_timeline)"""
+        from .promotion_timeline import get_active_promotion_ids
 
-        all_products = base_qs.filter(applies_to_all=True)
-        specific_products = base_qs.filter(products=product)
+        return self.filter(pk__in=get_active_promotion_ids())
 
-        product_ancestors = product.category.get_ancestors(include_self=True).values_list('pk', flat=True)
-        category_promotions = base_qs.filter(categories__pk__in=product_ancestors)
+    def for_product(self, product):
+        from .models import PromotionApplicability
 
-        return (all_products | specific_products | category_promotions).distinct()
+        indexed = PromotionApplicability.objects.filter(product_id=product.pk).values('promotion_id')
+        return self.filter(active=True).filter(Q(applies_to_all=True) | Q(pk__in=indexed))
 
 
 class PromotionManager(models.Manager):
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_index(apps, schema_editor):
+    Promotion = apps.get_model('showcase', 'Promotion')
+    Product = apps.get_model('showcase', 'Product')
+    PromotionApplicability = apps.get_model('showcase', 'PromotionApplicability')
+
+    rows = []
+    for promotion in Promotion.objects.filter(applies_to_all=False):
+        product_ids = set(promotion.products.values_list('pk', flat=True))
+        for category in promotion.categories.all():
+            product_ids.update(
+                Product.objects.filter(
+                    category__tree_id=category.tree_id,
+                    category__lft__gte=category.lft,
+                    category__rght__lte=category.rght,
+                ).values_list('pk', flat=True)
+            )
+        rows.extend(
+            PromotionApplicability(promotion_id=promotion.pk, product_id=pk)
+            for pk in product_ids
+        )
+    PromotionApplicability.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0005_remove_product_description_product_characteristics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionApplicability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_applicability', to='showcase.product')),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applicability', to='showcase.promotion')),
+            ],
+            options={
+                'verbose_name': 'Applicabilité promotion',
+                'verbose_name_plural': 'Applicabilités promotions',
+                'indexes': [models.Index(fields=['product', 'promotion'], name='showcase_pr_product_bf8ee3_idx')],
+                'unique_together': {('promotion', 'product')},
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def seed_buckets(apps, schema_editor):
+    # Sans historique, les vues cumulées sont rattachées au jour de la dernière vue
+    ProductStatus = apps.get_model('showcase', 'ProductStatus')
+    ProductEngagementBucket = apps.get_model('showcase', 'ProductEngagementBucket')
+
+    buckets = [
+        ProductEngagementBucket(
+            product_id=product_id,
+            event_type='view',
+            period='day',
+            bucket_date=timezone.localdate(last_viewed_at),
+            count=view_count,
+        )
+        for product_id, view_count, last_viewed_at in ProductStatus.objects.filter(
+            view_count__gt=0, last_viewed_at__isnull=False
+        ).values_list('product_id', 'view_count', 'last_viewed_at')
+    ]
+    ProductEngagementBucket.objects.bulk_create(buckets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0006_promotionapplicability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductEngagementBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('view', 'Vue'), ('whatsapp_click', 'Clic WhatsApp')], max_length=20)),
+                ('period', models.CharField(choices=[('day', 'Jour'), ('month', 'Mois')], default='day', max_length=10)),
+                ('bucket_date', models.DateField(verbose_name='Début de la période')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_buckets', to='showcase.product')),
+            ],
+            options={
+                'verbose_name': "Compteur d'engagement",
+                'verbose_name_plural': "Compteurs d'engagement",
+                'indexes': [models.Index(fields=['event_type', 'bucket_date'], name='showcase_pr_event_t_1a3638_idx')],
+                'unique_together': {('product', 'event_type', 'period', 'bucket_date')},
+            },
+        ),
+        migrations.RunPython(seed_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+import unicodedata
+
+
+FTS_TABLE = 'showcase_product_fts'
+DOCUMENT_TABLE = 'showcase_productsearchdocument'
+COLUMNS = 'name, brand, body, codes'
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', brand), 'B') || "
+    "setweight(to_tsvector('simple', codes), 'B') || "
+    "setweight(to_tsvector('simple', body), 'C')"
+)
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX showcase_product_search_gin ON {DOCUMENT_TABLE} USING GIN (({PG_VECTOR}))"
+        )
+    elif connection.vendor == 'sqlite' and _has_fts5(connection):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({COLUMNS}, "
+            f"content='{DOCUMENT_TABLE}', content_rowid='product_id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert = (
+            f"INSERT INTO {FTS_TABLE}(rowid, {COLUMNS}) "
+            "VALUES (new.product_id, new.name, new.brand, new.body, new.codes);"
+        )
+        delete = (
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS}) "
+            "VALUES ('delete', old.product_id, old.name, old.brand, old.body, old.codes);"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN {insert} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN {delete} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN {delete} {insert} END"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS showcase_product_search_gin")
+    elif connection.vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _normalize(value):
+    value = str(value or '').replace('œ', 'oe').replace('Œ', 'OE').replace('æ', 'ae').replace('Æ', 'AE')
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char)).lower()
+    return ' '.join(re.findall(r'[^\W_]+', value))
+
+
+def build_documents(apps, schema_editor):
+    Product = apps.get_model('showcase', 'Product')
+    ProductSearchDocument = apps.get_model('showcase', 'ProductSearchDocument')
+
+    documents = [
+        ProductSearchDocument(
+            product_id=product.pk,
+            name=_normalize(product.name),
+            brand=_normalize(product.brand),
+            body=_normalize(f"{product.short_description} {product.characteristics}"),
+            codes=_normalize(f"{product.sku} {product.barcode}"),
+        )
+        for product in Product.objects.all()
+    ]
+    ProductSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0007_productengagementbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='showcase.product')),
+                ('name', models.TextField(default='')),
+                ('brand', models.TextField(default='')),
+                ('body', models.TextField(default='', verbose_name='Description et caractéristiques')),
+                ('codes', models.TextField(default='', verbose_name='SKU et code-barres')),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def init_effective_prices(apps, schema_editor):
+    # Les promotions sont appliquées au premier passage du job de prix
+    Product = apps.get_model('showcase', 'Product')
+    Product.objects.update(effective_price=models.F('price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0008_productsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='best_promotion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='showcase.promotion', verbose_name='Meilleure promotion'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Prix après promotions'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'effective_price'], name='showcase_pr_is_acti_db0109_idx'),
+        ),
+        migrations.RunPython(init_effective_prices, migrations.RunPython.noop),
+    ]
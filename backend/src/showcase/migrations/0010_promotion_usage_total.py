@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:25
+
+from django.db import migrations, models
+
+
+def init_usage_totals(apps, schema_editor):
+    Promotion = apps.get_model('showcase', 'Promotion')
+    PromotionUsage = apps.get_model('showcase', 'PromotionUsage')
+    totals = PromotionUsage.objects.values('promotion_id').annotate(total=models.Sum('count'))
+    for row in totals:
+        Promotion.objects.filter(pk=row['promotion_id']).update(usage_total=row['total'] or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0009_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='usage_total',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Utilisations'),
+        ),
+        migrations.RunPython(init_usage_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def init_campaign_stats(apps, schema_editor):
+    # Les classes d'erreur des logs existants ne sont pas connues
+    NewsletterLog = apps.get_model('showcase', 'NewsletterLog')
+    NewsletterCampaignStats = apps.get_model('showcase', 'NewsletterCampaignStats')
+    sent_later = NewsletterLog.objects.filter(
+        campaign_id=models.OuterRef('campaign_id'),
+        subscriber_id=models.OuterRef('subscriber_id'),
+        status='sent',
+    )
+    totals = NewsletterLog.objects.values('campaign_id').annotate(
+        sent=models.Count('pk', filter=models.Q(status='sent')),
+        failed=models.Count(
+            'subscriber', distinct=True,
+            filter=models.Q(status='failed') & ~models.Q(models.Exists(sent_later))
+        ),
+    )
+    NewsletterCampaignStats.objects.bulk_create([
+        NewsletterCampaignStats(campaign_id=row['campaign_id'], sent=row['sent'], failed=row['failed'])
+        for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0010_promotion_usage_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterCampaignStats',
+            fields=[
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='showcase.newslettercampaign')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='Envoyés')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Échecs')),
+                ('error_counts', models.JSONField(blank=True, default=dict, verbose_name='Erreurs par type')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques campagne',
+                'verbose_name_plural': 'Statistiques campagnes',
+            },
+        ),
+        migrations.RunPython(init_campaign_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0011_newsletter_campaign_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='checkpoint_pk',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Dernier destinataire traité'),
+        ),
+        migrations.AddIndex(
+            model_name='newslettersubscriber',
+            index=models.Index(fields=['subscribed', 'confirmed', 'id'], name='showcase_ne_subscri_f88dfd_idx'),
+        ),
+    ]
@@ -1,21 +1,28 @@
 from .category import Category
-from .product import Product, ProductStatus, ProductImage
-from .promotion import Promotion, PromotionUsage
+from .product import (
+    Product, ProductStatus, ProductImage, ProductEngagementBucket,
+    ProductSearchDocument
+)
+from .promotion import Promotion, PromotionUsage, PromotionApplicability
 from .service import Service
 from .settings import SiteSettings, SocialLink
 from .newsletter import (
     NewsletterSubscriber,
     NewsletterTemplate,
     NewsletterCampaign,
-    NewsletterLog
+    NewsletterLog,
+    NewsletterCampaignStats
 )
 __all__ = [
     'Category',
     'Product',
     'ProductStatus',
     'ProductImage',
+    'ProductEngagementBucket',
+    'ProductSearchDocument',
     'Promotion',
     'PromotionUsage',
+    'PromotionApplicability',
     'Service',
     'SiteSettings',
     'SocialLink',
@@ -23,5 +30,6 @@ __all__ = [
     'NewsletterTemplate',
     'NewsletterCampaign',
     'NewsletterLog',
+    'NewsletterCampaignStats',
     
 ]
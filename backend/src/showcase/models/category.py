@@ -57,12 +57,20 @@ class Category(MPTTModel):
 
     @property
     def product_count(self):
+        # Valeur annotée par `with_product_counts()` si disponible
+        if hasattr(self, 'annotated_product_count'):
+            return self.annotated_product_count
         return self.get_all_products().count()
 
     @property
     def direct_product_count(self):
+        if hasattr(self, 'annotated_direct_product_count'):
+            return self.annotated_direct_product_count
         return self.products.count()
 
+    def get_children_with_counts(self):
+        return Category.objects.filter(parent=self).with_product_counts().order_by('lft')
+
     def get_all_products(self):
         descendant_ids = self.get_descendants(include_self=True).values_list('id', flat=True)
         from .product import Product
@@ -1,13 +1,12 @@
 import urllib.parse
 import uuid
-from django.conf import settings
-from django.contrib.sites.models import Site
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 
 from ..constants import NEWSLETTER_CAMPAIGN_STATUSES
 from ..managers import NewsletterSubscriberManager
+from ..utils import build_absolute_url
 
 
 class NewsletterSubscriber(models.Model):
@@ -35,7 +34,9 @@ class NewsletterSubscriber(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['email']),
-            models.Index(fields=['confirmation_token'])
+            models.Index(fields=['confirmation_token']),
+            # Parcours par clé (id) de l'audience par défaut des campagnes
+            models.Index(fields=['subscribed', 'confirmed', 'id']),
         ]
 
     def __str__(self):
@@ -52,15 +53,7 @@ class NewsletterSubscriber(models.Model):
         except Exception:
             rel = f"/newsletter/confirm/{self.confirmation_token}/"
 
-        if request:
-            return request.build_absolute_uri(rel)
-
-        try:
-            current_site = Site.objects.get_current()
-            return f"https://{current_site.domain}{rel}"
-        except Exception:
-            frontend = getattr(settings, "FRONTEND_URL", None) or "https://localhost"
-            return f"{frontend}{rel}"
+        return build_absolute_url(rel, request)
 
     def get_unsubscribe_url(self, request=None):
         try:
@@ -68,15 +61,7 @@ class NewsletterSubscriber(models.Model):
         except Exception:
             rel = f"/newsletter/unsubscribe/{urllib.parse.quote(self.email)}/"
 
-        if request:
-            return request.build_absolute_uri(rel)
-
-        try:
-            current_site = Site.objects.get_current()
-            return f"https://{current_site.domain}{rel}"
-        except Exception:
-            frontend = getattr(settings, "FRONTEND_URL", None) or "https://localhost"
-            return f"{frontend}{rel}"
+        return build_absolute_url(rel, request)
 
     def send_confirmation_email(self, request=None, from_email=None):
         from ..services.newsletter_service import NewsletterService
@@ -118,14 +103,13 @@ class NewsletterTemplate(models.Model):
             self.slug = generate_unique_slug(NewsletterTemplate, self.name, max_length=180)
         super().save(*args, **kwargs)
 
+    def compile(self):
+        """Version découpée une fois pour le rendu d'une campagne entière"""
+        from ..newsletter_rendering import CompiledNewsletterTemplate
+        return CompiledNewsletterTemplate(self)
+
     def render_for_subscriber(self, subscriber):
-        context = {
-            'name': subscriber.name or '',
-            'email': subscriber.email,
-            'unsubscribe_url': subscriber.get_unsubscribe_url(),
-        }
-        text = self.plain_content.format(**context) if self.plain_content else ''
-        html = self.html_content.format(**context) if self.html_content else ''
+        _subject, text, html = self.compile().render(subscriber)
         return text, html
 
 
@@ -158,6 +142,13 @@ class NewsletterCampaign(models.Model):
         default=STATUS_DRAFT
     )
     sent_count = models.PositiveIntegerField(default=0)
+    # Tous les destinataires d'id inférieur ou égal ont été traités
+    checkpoint_pk = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Dernier destinataire traité"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -170,10 +161,12 @@ class NewsletterCampaign(models.Model):
         return f"{self.name} ({self.status})"
 
     def queue_recipients(self):
-        qs = self.subscribers.all()
-        if not qs.exists():
-            qs = NewsletterSubscriber.objects.filter(subscribed=True, confirmed=True)
-        return qs
+        """Abonnés choisis, à défaut tous les abonnés confirmés (choix fait dans la requête)"""
+        selected = NewsletterCampaign.subscribers.through.objects.filter(newslettercampaign_id=self.pk)
+        return NewsletterSubscriber.objects.filter(
+            models.Exists(selected.filter(newslettersubscriber_id=models.OuterRef('pk'))) |
+            (~models.Exists(selected) & models.Q(subscribed=True, confirmed=True))
+        )
 
     def send(self, chunk_size=100, from_email=None):
         from ..services.newsletter_service import NewsletterService
@@ -211,3 +204,29 @@ class NewsletterLog(models.Model):
     def __str__(self):
         subscriber_email = self.subscriber.email if self.subscriber else 'N/A'
         return f"{self.campaign.name} → {subscriber_email}: {self.status}"
+
+
+class NewsletterCampaignStats(models.Model):
+    """
+    Totaux des logs d'une campagne, tenus à jour à chaque lot d'envoi :
+    l'admin et l'API les lisent sans agréger les logs.
+    """
+    campaign = models.OneToOneField(
+        NewsletterCampaign,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    sent = models.PositiveIntegerField(default=0, verbose_name="Envoyés")
+    # Destinataires dont le dernier envoi a échoué (un envoi réussi à la reprise les retire)
+    failed = models.PositiveIntegerField(default=0, verbose_name="Échecs")
+    # Tentatives échouées par classe d'exception, reprises comprises
+    error_counts = models.JSONField(default=dict, blank=True, verbose_name="Erreurs par type")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistiques campagne"
+        verbose_name_plural = "Statistiques campagnes"
+
+    def __str__(self):
+        return f"{self.campaign.name}: {self.sent} envoyé(s), {self.failed} échec(s)"
@@ -3,13 +3,17 @@ from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator, MinValueValidator
 from django.db import models
 from django.db.models import F
+from django.db.models.base import DEFERRED
 from django.urls import reverse
 from django.utils import timezone
 from mptt.models import TreeForeignKey
 
-from ..constants import PRODUCT_IMAGE_FORMATS, MAX_IMAGES_PER_PRODUCT, NEW_PRODUCT_DAYS_THRESHOLD
+from ..constants import (
+    PRODUCT_IMAGE_FORMATS, MAX_IMAGES_PER_PRODUCT, NEW_PRODUCT_DAYS_THRESHOLD,
+    ENGAGEMENT_EVENT_TYPES, ENGAGEMENT_PERIODS
+)
 from ..managers import ProductManager
-from ..utils import format_price, generate_unique_slug, generate_sku, build_whatsapp_message, build_whatsapp_link
+from ..utils import format_price, generate_unique_slug, generate_sku
 from ..validators import validate_product_image_size
 
 
@@ -55,6 +59,24 @@ class Product(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))],
         verbose_name="Prix de revient"
     )
+    # Prix unitaire après promotions, tenu à jour par PricingService.refresh_effective_prices
+    effective_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Prix après promotions"
+    )
+    best_promotion = models.ForeignKey(
+        'Promotion',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        editable=False,
+        verbose_name="Meilleure promotion"
+    )
 
     brand = models.CharField(
         max_length=100,
@@ -123,6 +145,7 @@ class Product(models.Model):
             models.Index(fields=['category', 'is_active']),
             models.Index(fields=['brand', 'is_active']),
             models.Index(fields=['price']),
+            models.Index(fields=['is_active', 'effective_price']),
         ]
 
     def __str__(self):
@@ -138,6 +161,44 @@ class Product(models.Model):
         badge_str = " ".join(badges)
         return f"{badge_str} {self.name} - {self.brand}".strip()
 
+    # Champs dont les signaux comparent la valeur chargée (arbre des catégories, promotions, prix effectif)
+    TRACKED_FIELDS = ('category_id', 'is_active', 'price')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not DEFERRED
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        refreshed = None if fields is None else {
+            field.attname for field in self._meta.concrete_fields
+            if field.name in fields or field.attname in fields
+        }
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', {})
+        loaded.update(
+            (name, getattr(self, name)) for name in self.TRACKED_FIELDS
+            if name not in deferred and (refreshed is None or name in refreshed)
+        )
+        self._loaded_values = loaded
+
+    def has_changed(self, *fields, update_fields=None):
+        """
+        Vrai si l'un des `fields` diffère de sa valeur chargée (toujours vrai
+        pour une valeur non chargée), sans requête. Avec `update_fields`,
+        seuls les champs enregistrés comptent.
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        if update_fields is not None:
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            fields = [name for name in fields if name in saved]
+        return any(name not in loaded or loaded[name] != getattr(self, name) for name in fields)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = generate_unique_slug(Product, f"{self.name}-{self.brand}", max_length=220)
@@ -147,6 +208,18 @@ class Product(models.Model):
 
         super().save(*args, **kwargs)
 
+        # Les valeurs enregistrées deviennent la référence des prochains `has_changed`
+        update_fields = kwargs.get('update_fields')
+        saved = None if update_fields is None else {
+            self._meta.get_field(name).attname for name in update_fields
+        }
+        loaded = getattr(self, '_loaded_values', {})
+        loaded.update(
+            (name, getattr(self, name)) for name in self.TRACKED_FIELDS
+            if saved is None or name in saved
+        )
+        self._loaded_values = loaded
+
     @property
     def is_new(self):
         return (timezone.now() - self.created_at).days <= NEW_PRODUCT_DAYS_THRESHOLD
@@ -192,10 +265,49 @@ class Product(models.Model):
         return PromotionService.get_best_promotion(self, quantity)
 
     def get_main_image(self):
-        try:
-            return self.images.filter(is_primary=True).first() or self.images.first()
-        except Exception:
-            return None
+        """
+        Image principale (ou première image), résolue sans requête si les images
+        ont été préchargées (`prefetch_related('images')` ou
+        `with_primary_image()`), et mémorisée sur l'instance.
+        """
+        if '_main_image' in self.__dict__:
+            return self._main_image
+
+        if hasattr(self, 'primary_images'):
+            images = self.primary_images
+        elif 'images' in getattr(self, '_prefetched_objects_cache', {}):
+            images = sorted(self.images.all(), key=lambda img: not img.is_primary)
+        else:
+            try:
+                images = [self.images.order_by('-is_primary', 'order', 'created_at').first()]
+            except Exception:
+                images = []
+
+        self._main_image = images[0] if images else None
+        return self._main_image
+
+    def get_main_image_url(self, request=None):
+        """URL de l'image principale, absolue si une requête est fournie (mémorisée)"""
+        key = request.get_host() if request else None
+        urls = self.__dict__.setdefault('_main_image_urls', {})
+        if key not in urls:
+            main_image = self.get_main_image()
+            url = None
+            if main_image and main_image.image:
+                image_str = str(main_image.image)
+                # URL externe : retournée brute
+                if image_str.startswith('http'):
+                    url = image_str
+                elif request:
+                    url = request.build_absolute_uri(main_image.image.url)
+                else:
+                    url = main_image.image.url
+            urls[key] = url
+        return urls[key]
+
+    def clear_main_image_cache(self):
+        self.__dict__.pop('_main_image', None)
+        self.__dict__.pop('_main_image_urls', None)
 
     def get_all_images(self):
         return self.images.all().order_by('-is_primary', 'order')
@@ -225,14 +337,12 @@ class Product(models.Model):
     
     def get_whatsapp_link(self):
         """Retourne le lien WhatsApp pour le produit"""
+        from .settings import SiteSettings
+        from ..services.whatsapp_service import WhatsAppService
         try:
-            from .settings import SiteSettings
-            settings = SiteSettings.load()
-            message = build_whatsapp_message(self, settings)
-            return build_whatsapp_link(settings.whatsapp_number, message)
+            return WhatsAppService.get_link(self)
         except Exception:
-            from .settings import SiteSettings
-            settings = SiteSettings.load()
+            settings = SiteSettings.get_settings()
             return f"https://wa.me/{settings.whatsapp_number}"
     
     @property
@@ -302,12 +412,26 @@ class ProductStatus(models.Model):
         return f"Statut de {self.product.name}"
 
     def get_views_last_n_days(self, days=30):
-        if not self.last_viewed_at:
-            return 0
-        days_since_view = (timezone.now() - self.last_viewed_at).days
-        if days_since_view > days:
-            return 0
-        return min(int(self.view_count * (days / max(days_since_view, 1))), self.view_count)
+        from ..services.engagement_service import EngagementBucketService
+
+        totals = EngagementBucketService.get_window_totals([self.product_id], days=days)
+        return totals.get(self.product_id, 0)
+
+    @property
+    def live_view_count(self):
+        """Vues en base plus les vues pas encore reportées"""
+        from ..services.counter_service import EngagementCounterService
+        return self.view_count + EngagementCounterService.get_pending(self.pk)[0]
+
+    @property
+    def live_whatsapp_click_count(self):
+        from ..services.counter_service import EngagementCounterService
+        return self.whatsapp_click_count + EngagementCounterService.get_pending(self.pk)[1]
+
+    @property
+    def live_last_viewed_at(self):
+        from ..services.counter_service import EngagementCounterService
+        return EngagementCounterService.get_pending(self.pk)[2] or self.last_viewed_at
 
     def increment_view_count(self):
         self.view_count = F('view_count') + 1
@@ -339,6 +463,56 @@ class ProductStatus(models.Model):
         ])
 
 
+class ProductEngagementBucket(models.Model):
+    """Compteur d'événements d'un produit sur un jour (ou un mois après compactage)"""
+
+    product = models.ForeignKey(
+        'Product',
+        on_delete=models.CASCADE,
+        related_name='engagement_buckets'
+    )
+    event_type = models.CharField(max_length=20, choices=ENGAGEMENT_EVENT_TYPES)
+    period = models.CharField(max_length=10, choices=ENGAGEMENT_PERIODS, default='day')
+    bucket_date = models.DateField(verbose_name="Début de la période")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur d'engagement"
+        verbose_name_plural = "Compteurs d'engagement"
+        unique_together = ('product', 'event_type', 'period', 'bucket_date')
+        indexes = [
+            models.Index(fields=['event_type', 'bucket_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.event_type} {self.bucket_date}: {self.count}"
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Texte indexé d'un produit, normalisé (minuscules, sans accents).
+    L'index plein texte (FTS5 sous SQLite, GIN sous PostgreSQL) porte sur cette table.
+    """
+
+    product = models.OneToOneField(
+        'Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    name = models.TextField(default='')
+    brand = models.TextField(default='')
+    body = models.TextField(default='', verbose_name="Description et caractéristiques")
+    codes = models.TextField(default='', verbose_name="SKU et code-barres")
+
+    class Meta:
+        verbose_name = "Document de recherche"
+        verbose_name_plural = "Documents de recherche"
+
+    def __str__(self):
+        return f"{self.product_id}: {self.name}"
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(
         Product,
@@ -395,12 +569,14 @@ class ProductImage(models.Model):
             raise ValidationError(f"Maximum {MAX_IMAGES_PER_PRODUCT} images par produit.")
 
         super().save(*args, **kwargs)
+        self.product.clear_main_image_cache()
 
     def delete(self, *args, **kwargs):
         was_primary = self.is_primary
         product = self.product
 
         super().delete(*args, **kwargs)
+        product.clear_main_image_cache()
 
         if was_primary:
             next_image = product.images.first()
@@ -71,6 +71,12 @@ class Promotion(models.Model):
         blank=True,
         verbose_name="Limite par utilisateur"
     )
+    # Somme des PromotionUsage.count, tenue par PromotionService.redeem_promotion
+    usage_total = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Utilisations"
+    )
 
     is_stackable = models.BooleanField(
         default=False,
@@ -104,6 +110,12 @@ class Promotion(models.Model):
         if not self.slug:
             from ..utils import generate_unique_slug
             self.slug = generate_unique_slug(Promotion, self.name, max_length=180)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Ne pas écraser un compteur incrémenté depuis le chargement de l'instance
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'usage_total'
+            ]
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -128,7 +140,7 @@ class Promotion(models.Model):
         return True
 
     def usage_count(self):
-        return self.usages.aggregate(total=models.Sum('count'))['total'] or 0
+        return self.usage_total
 
     def applies_to_product(self, product):
         if not product:
@@ -137,24 +149,19 @@ class Promotion(models.Model):
         if self.applies_to_all:
             return True
 
-        if self.products.filter(pk=product.pk).exists():
-            return True
+        return self.applicability.filter(product_id=product.pk).exists()
 
-        if product.category and self.categories.exists():
-            product_ancestors = product.category.get_ancestors(include_self=True).values_list('pk', flat=True)
-            if self.categories.filter(pk__in=product_ancestors).exists():
-                return True
+    def get_discount_amount(self, product, quantity=1):
+        if not self.applies_to_product(product) or not self.is_active_now():
+            return Decimal('0.00'), product.price
 
-        return False
+        return self.compute_discount(product.price, quantity)
 
-    def get_discount_amount(self, product, quantity=1):
+    def compute_discount(self, price, quantity=1):
+        """Calcule (remise totale, prix unitaire final) sans vérifier l'éligibilité"""
         qty = max(1, int(quantity))
-        price = product.price
         discount = Decimal('0.00')
 
-        if not self.applies_to_product(product) or not self.is_active_now():
-            return discount, price
-
         if self.promotion_type == self.PERCENT:
             percent = (self.value or Decimal('0')) / Decimal('100')
             discount = (price * percent) * qty
@@ -227,3 +234,32 @@ class PromotionUsage(models.Model):
     def __str__(self):
         who = self.user.username if self.user else "ANONYME/GLOBAL"
         return f"{self.promotion.name} - {who}: {self.count}"
+
+
+class PromotionApplicability(models.Model):
+    """
+    Index matérialisé produit → promotion ciblée (via le M2M produits ou une
+    catégorie ancêtre). Les promotions `applies_to_all` n'y figurent pas :
+    elles s'appliquent à tout le catalogue.
+    """
+    promotion = models.ForeignKey(
+        Promotion,
+        on_delete=models.CASCADE,
+        related_name='applicability'
+    )
+    product = models.ForeignKey(
+        'Product',
+        on_delete=models.CASCADE,
+        related_name='promotion_applicability'
+    )
+
+    class Meta:
+        verbose_name = "Applicabilité promotion"
+        verbose_name_plural = "Applicabilités promotions"
+        unique_together = [['promotion', 'product']]
+        indexes = [
+            models.Index(fields=['product', 'promotion']),
+        ]
+
+    def __str__(self):
+        return f"{self.promotion_id} → {self.product_id}"
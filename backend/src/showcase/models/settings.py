@@ -1,6 +1,11 @@
+import threading
+import uuid
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
 
 from ..constants import SOCIAL_MEDIA_PLATFORMS
 
@@ -13,6 +18,13 @@ class SocialLink(models.Model):
         return f"{self.name}"
 
 
+SETTINGS_VERSION_KEY = 'showcase:site_settings:version'
+SETTINGS_DATA_KEY = 'showcase:site_settings:data:{}'
+
+_settings_lock = threading.Lock()
+_local_settings = {'version': None, 'obj': None}
+
+
 class SiteSettings(models.Model):
     whatsapp_number = models.CharField(
         max_length=20,
@@ -64,6 +76,7 @@ class SiteSettings(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super().save(*args, **kwargs)
+        SiteSettings.invalidate_cache()
 
     def delete(self, *args, **kwargs):
         raise ValidationError("La suppression des paramètres du site est interdite.")
@@ -72,3 +85,40 @@ class SiteSettings(models.Model):
     def load(cls):
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
+
+    @classmethod
+    def get_settings(cls):
+        """
+        Paramètres en cache (liens sociaux préchargés) : copie par processus,
+        rechargée lorsque la version partagée change. L'objet retourné est
+        partagé et ne doit pas être modifié ; utiliser `load()` pour éditer.
+        """
+        version = cache.get(SETTINGS_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(SETTINGS_VERSION_KEY, version, timeout=None):
+                version = cache.get(SETTINGS_VERSION_KEY)
+
+        local = _local_settings
+        if local['version'] == version and local['obj'] is not None:
+            return local['obj']
+
+        with _settings_lock:
+            if _local_settings['version'] != version or _local_settings['obj'] is None:
+                data_key = SETTINGS_DATA_KEY.format(version)
+                obj = cache.get(data_key)
+                if obj is None:
+                    obj = cls.load()
+                    prefetch_related_objects([obj], 'social_links')
+                    cache.set(data_key, obj, timeout=None)
+                _local_settings.update(version=version, obj=obj)
+            return _local_settings['obj']
+
+    @staticmethod
+    def invalidate_cache():
+        """Invalide les paramètres en cache dans tous les processus (à nouveau après le commit)"""
+        def bump():
+            cache.set(SETTINGS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+        bump()
+        transaction.on_commit(bump)
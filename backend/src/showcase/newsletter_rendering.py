@@ -0,0 +1,97 @@
+"""
+Rendu compilé des templates newsletter.
+
+Le sujet et les contenus d'un template sont découpés une fois (par campagne)
+en segments statiques et champs `{name}`, `{email}`, `{unsubscribe_url}` ;
+le préfixe absolu du lien de désinscription est résolu une fois aussi. Le
+rendu d'un destinataire se réduit à des concaténations, avec le même
+résultat (et les mêmes erreurs) que `str.format`.
+"""
+import urllib.parse
+from string import Formatter
+
+from django.urls import NoReverseMatch, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from .utils import build_absolute_url
+
+# Jeton sans caractère à échapper, remplacé par l'adresse du destinataire
+EMAIL_MARKER = 'newsletter-email-marker'
+
+
+class CompiledText:
+    """Texte au format `str.format` découpé en (segment statique, champ)"""
+
+    __slots__ = ('source', 'parts')
+
+    def __init__(self, source):
+        self.source = source or ''
+        try:
+            parts = []
+            for literal, field, format_spec, conversion in Formatter().parse(self.source):
+                if field is not None and (
+                    format_spec or conversion or not field.isidentifier()
+                ):
+                    # Formats, conversions ou accès {a.b} / {0} : rendu par str.format
+                    parts = None
+                    break
+                parts.append((literal, field))
+        except ValueError:
+            # Accolade orpheline : str.format lèvera l'erreur au rendu, comme avant
+            parts = None
+        self.parts = parts
+
+    def render(self, context):
+        if self.parts is None:
+            return self.source.format(**context)
+        chunks = []
+        for literal, field in self.parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(str(context[field]))
+        return ''.join(chunks)
+
+
+def compile_unsubscribe_url():
+    """
+    Retourne une fonction email -> lien de désinscription absolu, identique à
+    `NewsletterSubscriber.get_unsubscribe_url()` sans requête.
+    """
+    try:
+        rel = reverse('newsletter_unsubscribe', kwargs={'email': EMAIL_MARKER})
+        reversed_url = True
+    except NoReverseMatch:
+        rel = f"/newsletter/unsubscribe/{EMAIL_MARKER}/"
+        reversed_url = False
+
+    prefix, suffix = build_absolute_url(rel).split(EMAIL_MARKER)
+
+    def unsubscribe_url(email):
+        escaped = urllib.parse.quote(email)
+        if reversed_url:
+            # reverse() échappe à nouveau l'argument
+            escaped = urllib.parse.quote(escaped, safe=RFC3986_SUBDELIMS + '/~:@')
+        return f"{prefix}{escaped}{suffix}"
+
+    return unsubscribe_url
+
+
+class CompiledNewsletterTemplate:
+    """Template newsletter prêt pour un rendu par destinataire sans analyse ni requête"""
+
+    def __init__(self, template):
+        self.subject = CompiledText(template.subject)
+        self.plain = CompiledText(template.plain_content)
+        self.html = CompiledText(template.html_content)
+        self.unsubscribe_url = compile_unsubscribe_url()
+
+    def render(self, subscriber):
+        """Retourne (sujet, texte, html) pour un abonné"""
+        name = subscriber.name or ''
+        context = {
+            'name': name,
+            'email': subscriber.email,
+            'unsubscribe_url': self.unsubscribe_url(subscriber.email),
+        }
+        subject = self.subject.render({'name': name, 'email': subscriber.email})
+        return subject, self.plain.render(context), self.html.render(context)
@@ -0,0 +1,126 @@
+"""
+Pagination de l'API : pages numérotées (avec comptage optionnel) ou curseur
+(keyset) pour les flux de produits consultés en défilement infini.
+"""
+from django.db.models import F
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Pages numérotées ; `?page_size=` ajuste la taille et `?count=false`
+    supprime le `COUNT(*)` (la page suivante est détectée avec un élément de plus).
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_free = request.query_params.get(self.count_query_param, '').lower() in ('0', 'false')
+        if not self.count_free:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            self.page_number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            self.page_number = 1
+
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.count_free:
+            return super().get_paginated_response(data)
+
+        url = self.request.build_absolute_uri()
+        next_link = replace_query_param(url, self.page_query_param, self.page_number + 1) if self.has_next else None
+        if self.page_number == 1:
+            previous_link = None
+        elif self.page_number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        else:
+            previous_link = replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+        return Response({
+            'next': next_link,
+            'previous': previous_link,
+            'results': data,
+        })
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur les ordres indexés des produits, sans
+    `COUNT(*)` ni `OFFSET` croissant. Les champs de tri traversant une
+    relation sont exposés par annotation (le curseur ne lit que des attributs).
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    ORDERINGS = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'effective_price': ('effective_price', 'id'),
+        '-effective_price': ('-effective_price', '-id'),
+        '-featured_score': ('-featured_score', '-created_at', '-id'),
+    }
+    ANNOTATIONS = {
+        'featured_score': F('status__featured_score'),
+    }
+
+    def __init__(self, ordering='-created_at'):
+        self.default_ordering = ordering
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get('ordering')
+        key = requested if requested in self.ORDERINGS else self.default_ordering
+        return self.ORDERINGS[key]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        annotations = {
+            name: expression
+            for name, expression in self.ANNOTATIONS.items()
+            if any(field.lstrip('-') == name for field in ordering)
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class CursorPaginationMixin:
+    """
+    Choix du mode de pagination par action (`cursor_pagination_actions`) ou
+    par requête (`?pagination=cursor`), avec l'ordre indexé de l'action.
+    """
+
+    cursor_pagination_actions = ()
+    cursor_orderings = {}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            use_cursor = (
+                self.action in self.cursor_pagination_actions or
+                self.request.query_params.get('pagination') == 'cursor'
+            )
+            if use_cursor and self.action in self.cursor_orderings:
+                self._paginator = ProductCursorPagination(self.cursor_orderings[self.action])
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,124 @@
+"""
+Calendrier des promotions : ensemble des promotions actives précalculé.
+
+L'ensemble actif (fenêtre `start_at`/`end_at` et limite d'utilisation
+évaluées une fois) est conservé dans le cache avec l'instant du prochain
+changement (début ou fin d'une promotion). Une tâche Celery programmée à cet
+instant le recalcule et le remplace d'une seule écriture ; les chemins
+chauds lisent l'ensemble sans évaluer de fenêtre ni d'agrégat d'utilisation.
+
+Les modifications de promotions et d'utilisations l'invalident ; un ensemble
+dont l'instant de changement est dépassé (tâche en retard) est recalculé à
+la lecture.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+CACHE_KEY = 'showcase:promotion_timeline'
+PUBLISHED_KEY = 'showcase:promotion_timeline:published'
+SCHEDULED_KEY = 'showcase:promotion_timeline:eta:'
+
+
+class PromotionTimeline:
+    """Promotions actives (par id croissant) et instant du prochain changement"""
+
+    def __init__(self, promotions, next_change=None, computed_at=None):
+        self.promotions = promotions
+        self.ids = frozenset(promotion.pk for promotion in promotions)
+        self.next_change = next_change
+        self.computed_at = computed_at
+
+    @classmethod
+    def build(cls, now=None):
+        from .models import Promotion
+
+        now = now or timezone.now()
+        candidates = Promotion.objects.filter(active=True).filter(
+            Q(end_at__isnull=True) | Q(end_at__gte=now)
+        ).order_by('pk')
+
+        active, boundaries = [], []
+        for promotion in candidates:
+            if promotion.start_at and promotion.start_at > now:
+                boundaries.append(promotion.start_at)
+                continue
+            if promotion.usage_limit is not None and promotion.usage_total >= promotion.usage_limit:
+                continue
+            active.append(promotion)
+            if promotion.end_at:
+                # La fin est incluse dans la validité (cf. Promotion.is_active_now)
+                boundaries.append(promotion.end_at + timedelta(microseconds=1))
+
+        return cls(active, min(boundaries, default=None), now)
+
+    def is_current(self, now=None):
+        return self.next_change is None or (now or timezone.now()) < self.next_change
+
+
+def _store(timeline):
+    cache.set(CACHE_KEY, timeline, timeout=None)
+    return timeline
+
+
+def get_promotion_timeline():
+    timeline = cache.get(CACHE_KEY)
+    if timeline is None or not timeline.is_current():
+        timeline = _store(PromotionTimeline.build())
+    return timeline
+
+
+def get_active_promotions():
+    """Promotions actives, sans requête tant que l'ensemble en cache est valide"""
+    return get_promotion_timeline().promotions
+
+
+def get_active_promotion_ids():
+    return get_promotion_timeline().ids
+
+
+def _schedule_swap(timeline, task):
+    """
+    Programme le basculement à `next_change`, une seule fois par instant :
+    le beat, les invalidations et les tâches à échéance rappellent
+    swap_active_set sans multiplier les tâches programmées.
+    """
+    remaining = (timeline.next_change - timeline.computed_at).total_seconds()
+    key = f'{SCHEDULED_KEY}{timeline.next_change.timestamp()}'
+    if cache.add(key, True, timeout=max(1, int(remaining)) + 3600):
+        task.apply_async(eta=timeline.next_change)
+
+
+def swap_active_set():
+    """
+    Recalcule et remplace l'ensemble actif, puis programme le prochain
+    basculement. Si l'ensemble diffère du dernier publié, les réponses en
+    cache et les prix après promotions sont rafraîchis.
+    Retourne True si l'ensemble a changé.
+    """
+    from .response_cache import invalidate_tags
+    from .tasks import refresh_effective_prices, swap_promotion_timeline
+
+    timeline = _store(PromotionTimeline.build())
+    # En mode synchrone (dev, tests), une tâche à échéance s'exécuterait tout de suite
+    if timeline.next_change and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        _schedule_swap(timeline, swap_promotion_timeline)
+
+    if cache.get(PUBLISHED_KEY) == timeline.ids:
+        return False
+    cache.set(PUBLISHED_KEY, timeline.ids, timeout=None)
+    invalidate_tags('promotions', 'products')
+    refresh_effective_prices.delay()
+    return True
+
+
+def invalidate_promotion_timeline():
+    """Invalide l'ensemble actif maintenant et le rebascule après le commit"""
+    from .tasks import swap_promotion_timeline
+
+    cache.delete(CACHE_KEY)
+    transaction.on_commit(swap_promotion_timeline.delay)
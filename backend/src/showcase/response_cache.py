@@ -0,0 +1,147 @@
+"""
+Cache des réponses complètes des endpoints publics du catalogue.
+
+Les entrées sont indexées par hôte, chemin, paramètres normalisés et type de
+contenu demandé, et étiquetées par les modèles dont elles dépendent
+(`products`, `categories`, `promotions`, `settings`). Chaque étiquette porte
+une version dans le cache ; les signaux des modèles la renouvellent, ce qui
+rend caduques les seules entrées concernées.
+
+Une entrée expirée reste servie (`X-Cache: STALE`) pendant la fenêtre de
+revalidation, le temps qu'une seule requête la recalcule.
+"""
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .constants import RESPONSE_CACHE_TIMEOUT, RESPONSE_CACHE_STALE_TTL
+
+KEY_PREFIX = 'showcase:response:'
+TAG_PREFIX = 'showcase:response_tag:'
+
+
+def _bump_tags(tags):
+    cache.set_many({TAG_PREFIX + tag: uuid.uuid4().hex for tag in tags}, timeout=None)
+
+
+def invalidate_tags(*tags):
+    """Invalide les réponses dépendant de ces étiquettes (à nouveau après le commit)"""
+    _bump_tags(tags)
+    transaction.on_commit(lambda: _bump_tags(tags))
+
+
+def get_tag_versions(tags):
+    keys = [TAG_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    for key, version in missing.items():
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key)
+        versions[key] = version
+    return tuple(versions[key] for key in keys)
+
+
+def build_cache_key(request, key_params=None):
+    """
+    `key_params` restreint la clé aux paramètres listés (valeurs vides
+    ignorées) : les autres paramètres partagent alors la même entrée.
+    """
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+        if key_params is None or (key in key_params and value != '')
+    )
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        json.dumps(params),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return KEY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+
+
+def etag_matches(header, etag):
+    """Comparaison faible de `If-None-Match` (liste, préfixe W/, `*`) avec l'ETag de l'entrée"""
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in {candidate.removeprefix('W/') for candidate in etags}
+
+
+def _respond(request, entry, cache_status):
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), entry['etag']):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(entry['data'], status=entry['status'])
+    response['ETag'] = entry['etag']
+    response['X-Cache'] = cache_status
+    return response
+
+
+def cache_response(*tags, timeout=RESPONSE_CACHE_TIMEOUT, stale_ttl=RESPONSE_CACHE_STALE_TTL, key_params=None):
+    """
+    Décorateur de méthode de viewset : met en cache la réponse des requêtes
+    GET anonymes, étiquetée par `tags`.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                response = view_method(self, request, *args, **kwargs)
+                response['X-Cache'] = 'BYPASS'
+                return response
+
+            key = build_cache_key(request, key_params)
+            versions = get_tag_versions(tags)
+            entry = cache.get(key)
+            now = time.time()
+
+            locked = False
+            if entry and entry['versions'] == versions:
+                age = now - entry['created']
+                if age < timeout:
+                    return _respond(request, entry, 'HIT')
+                if age < timeout + stale_ttl:
+                    # Expirée mais revalidée par une autre requête : servir l'ancienne version
+                    locked = cache.add(key + ':lock', True, timeout=30)
+                    if not locked:
+                        return _respond(request, entry, 'STALE')
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    response['X-Cache'] = 'MISS'
+                    return response
+
+                entry = {
+                    'data': response.data,
+                    'status': response.status_code,
+                    'etag': compute_etag(response.data),
+                    'versions': versions,
+                    'created': now,
+                }
+                cache.set(key, entry, timeout=timeout + stale_ttl)
+            finally:
+                # Ne libérer que le verrou pris par cette requête
+                if locked:
+                    cache.delete(key + ':lock')
+            return _respond(request, entry, 'MISS')
+        return wrapper
+    return decorator
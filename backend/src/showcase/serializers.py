@@ -5,6 +5,12 @@ from .models import (
     NewsletterSubscriber, NewsletterTemplate, NewsletterCampaign,
     
 )
+from .category_tree import get_category_tree
+
+
+def _tree_node(obj):
+    """Nœud de l'instantané de l'arbre correspondant à une catégorie (ou elle-même)"""
+    return get_category_tree().get(obj.pk) or obj
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -36,17 +42,20 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_full_path(self, obj):
         """Retourne le chemin complet de la catégorie"""
-        return obj.get_full_path()
+        return _tree_node(obj).get_full_path()
     
     def get_product_count(self, obj):
-        return obj.product_count
+        return _tree_node(obj).product_count
     
     def get_direct_product_count(self, obj):
-        return obj.direct_product_count
+        return _tree_node(obj).direct_product_count
 
 
 class CategoryTreeSerializer(serializers.ModelSerializer):
-    """Serializer récursif pour afficher l'arborescence complète"""
+    """
+    Serializer récursif pour afficher l'arborescence complète.
+    Accepte aussi les nœuds de l'instantané de l'arbre.
+    """
     
     children = serializers.SerializerMethodField()
     product_count = serializers.SerializerMethodField()
@@ -67,7 +76,7 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
     def get_children(self, obj):
         """Retourne les enfants directs de manière récursive"""
         children = obj.get_children()
-        if children.exists():
+        if children:
             return CategoryTreeSerializer(children, many=True).data
         return []
     
@@ -105,7 +114,7 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
     
     # Relations
     parent = CategorySerializer(read_only=True)
-    children = CategorySerializer(many=True, read_only=True, source='get_children')
+    children = CategorySerializer(many=True, read_only=True, source='get_children_with_counts')
     breadcrumb = serializers.SerializerMethodField()
     
     # Champs calculés
@@ -136,10 +145,10 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
     def get_breadcrumb(self, obj):
         """Retourne le fil d'Ariane"""
         return [{'id': cat.id, 'name': cat.name, 'slug': cat.slug} 
-                for cat in obj.get_breadcrumb()]
+                for cat in _tree_node(obj).get_breadcrumb()]
     
     def get_full_path(self, obj):
-        return obj.get_full_path()
+        return _tree_node(obj).get_full_path()
     
     def get_product_count(self, obj):
         return obj.product_count
@@ -158,7 +167,7 @@ class CategoryMinimalSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'level', 'full_path']
     
     def get_full_path(self, obj):
-        return obj.get_full_path()
+        return _tree_node(obj).get_full_path()
 
 
 class SocialLinkSerializer(serializers.ModelSerializer):
@@ -197,7 +206,58 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
 # ===== Product Serializers =====
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductBatchListSerializer(serializers.ListSerializer):
+    """Calcule les prix finaux (et liens WhatsApp) de toute la liste en une seule passe"""
+
+    def to_representation(self, data):
+        from django.db import models
+        from .services.pricing_service import PricingService
+
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        products = list(iterable)
+        self.context['final_prices'] = PricingService.get_final_prices(products)
+        if 'whatsapp_link' in self.child.fields:
+            from .services.whatsapp_service import WhatsAppService
+            self.context['whatsapp_links'] = WhatsAppService.get_variants_many(products)
+        if 'views_count' in self.child.fields:
+            from .services.counter_service import EngagementCounterService
+            self.context['pending_counters'] = EngagementCounterService.get_pending_many(
+                product.status.pk for product in products if hasattr(product, 'status')
+            )
+        return super().to_representation(products)
+
+
+class FinalPriceMixin:
+    """Lit le prix final calculé par lot, sinon le calcule pour le produit seul"""
+
+    def get_final_price(self, obj):
+        final_prices = self.context.get('final_prices')
+        if final_prices is not None and obj.pk in final_prices:
+            return final_prices[obj.pk]
+        return obj.get_final_price()
+
+
+class LiveCountersMixin:
+    """Vues et clics en base plus le delta non reporté, lu par lot pour une liste"""
+
+    def _get_pending(self, status):
+        pending = self.context.get('pending_counters')
+        if pending is None or status.pk not in pending:
+            from .services.counter_service import EngagementCounterService
+            pending = self.context.setdefault('pending_counters', {})
+            pending.update(EngagementCounterService.get_pending_many([status.pk]))
+        return pending[status.pk]
+
+    def get_views_count(self, obj):
+        status = getattr(obj, 'status', None)
+        return status.view_count + self._get_pending(status)[0] if status else 0
+
+    def get_clicks_count(self, obj):
+        status = getattr(obj, 'status', None)
+        return status.whatsapp_click_count + self._get_pending(status)[1] if status else 0
+
+
+class ProductListSerializer(FinalPriceMixin, serializers.ModelSerializer):
     """Serializer optimisé pour les listes de produits"""
     
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -215,29 +275,16 @@ class ProductListSerializer(serializers.ModelSerializer):
             'main_image', 'is_in_stock', 'is_featured', 'is_recommended',
             'short_description', 'created_at'
         ]
+        list_serializer_class = ProductBatchListSerializer
     
     def get_main_image(self, obj):
-        main_img = obj.images.filter(is_primary=True).first()
-        if main_img:
-            image_str = str(main_img.image)
-            # Si c'est une URL externe (commence par http), la retourner brute
-            if image_str.startswith('http'):
-                return image_str
-            # Sinon, c'est un fichier local - construire l'URL complète
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(main_img.image.url)
-            return main_img.image.url
-        return None
-    
-    def get_final_price(self, obj):
-        return obj.get_final_price()
+        return obj.get_main_image_url(self.context.get('request'))
     
     def get_has_discount(self, obj):
         return obj.has_discount
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(LiveCountersMixin, FinalPriceMixin, serializers.ModelSerializer):
     """Serializer détaillé pour un produit individuel"""
     
     category = CategorySerializer(read_only=True)
@@ -252,8 +299,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     is_featured = serializers.BooleanField(source='status.is_featured', read_only=True)
     is_recommended = serializers.BooleanField(source='status.is_recommended', read_only=True)
     featured_score = serializers.IntegerField(source='status.featured_score', read_only=True)
-    views_count = serializers.IntegerField(source='status.views_count', read_only=True)
-    clicks_count = serializers.IntegerField(source='status.clicks_count', read_only=True)
+    views_count = serializers.SerializerMethodField()
+    clicks_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -271,21 +318,10 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'published_at', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'sku', 'slug', 'created_at', 'updated_at']
+        list_serializer_class = ProductBatchListSerializer
     
     def get_main_image(self, obj):
-        main_img = obj.images.filter(is_primary=True).first()
-        if main_img:
-            image_str = str(main_img.image)
-            if image_str.startswith('http'):
-                return image_str
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(main_img.image.url)
-            return main_img.image.url
-        return None
-    
-    def get_final_price(self, obj):
-        return obj.get_final_price()
+        return obj.get_main_image_url(self.context.get('request'))
     
     def get_discount_amount(self, obj):
         return obj.get_discount_amount()
@@ -294,6 +330,10 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         return obj.has_discount
     
     def get_whatsapp_link(self, obj):
+        links = self.context.get('whatsapp_links')
+        if links is not None and obj.pk in links:
+            from .services.whatsapp_service import WhatsAppService
+            return WhatsAppService.get_link(obj, links[obj.pk])
         return obj.get_whatsapp_link()
 
 
@@ -312,19 +352,22 @@ class ProductMinimalSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'price', 'main_image']
     
     def get_main_image(self, obj):
-        main_img = obj.images.filter(is_primary=True).first()
-        if main_img:
-            image_str = str(main_img.image)
-            # Si c'est une URL externe, la retourner brute
-            if image_str.startswith('http'):
-                return image_str
-            return main_img.image.url
-        return None
+        return obj.get_main_image_url()
 
 
 # ===== Promotion Serializers =====
 
-class PromotionListSerializer(serializers.ModelSerializer):
+class ActivePromotionMixin:
+    """`is_active_now` lu dans le calendrier des promotions, une fois par réponse"""
+
+    def get_is_active_now(self, obj):
+        if 'active_promotion_ids' not in self.context:
+            from .promotion_timeline import get_active_promotion_ids
+            self.context['active_promotion_ids'] = get_active_promotion_ids()
+        return obj.pk in self.context['active_promotion_ids']
+
+
+class PromotionListSerializer(ActivePromotionMixin, serializers.ModelSerializer):
     """Serializer pour les listes de promotions"""
     
     is_active_now = serializers.SerializerMethodField()
@@ -340,9 +383,6 @@ class PromotionListSerializer(serializers.ModelSerializer):
             'applies_to_all'
         ]
     
-    def get_is_active_now(self, obj):
-        return obj.is_active_now()
-    
     def get_products_count(self, obj):
         return obj.products.count()
     
@@ -350,7 +390,7 @@ class PromotionListSerializer(serializers.ModelSerializer):
         return obj.categories.count()
 
 
-class PromotionDetailSerializer(serializers.ModelSerializer):
+class PromotionDetailSerializer(ActivePromotionMixin, serializers.ModelSerializer):
     """Serializer détaillé pour une promotion"""
     
     products = ProductMinimalSerializer(many=True, read_only=True)
@@ -370,9 +410,6 @@ class PromotionDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
     
-    def get_is_active_now(self, obj):
-        return obj.is_active_now()
-    
     def get_usage_count(self, obj):
         return obj.usage_count()
 
@@ -420,17 +457,32 @@ class NewsletterCampaignListSerializer(serializers.ModelSerializer):
     
     template_name = serializers.CharField(source='template.name', read_only=True)
     recipients_count = serializers.SerializerMethodField()
+    failed_count = serializers.SerializerMethodField()
+    error_counts = serializers.SerializerMethodField()
     
     class Meta:
         model = NewsletterCampaign
         fields = [
             'id', 'name', 'template', 'template_name', 'status',
-            'scheduled_at', 'sent_count', 'recipients_count', 'created_at'
+            'scheduled_at', 'sent_count', 'failed_count', 'error_counts',
+            'recipients_count', 'created_at'
         ]
     
     def get_recipients_count(self, obj):
         return obj.subscribers.count()
 
+    def _get_stats(self, obj):
+        # Statistiques tenues à jour à l'envoi, absentes avant le premier lot
+        return getattr(obj, 'stats', None)
+
+    def get_failed_count(self, obj):
+        stats = self._get_stats(obj)
+        return stats.failed if stats else 0
+
+    def get_error_counts(self, obj):
+        stats = self._get_stats(obj)
+        return stats.error_counts if stats else {}
+
 
 class NewsletterCampaignDetailSerializer(serializers.ModelSerializer):
     """Serializer détaillé pour une campagne"""
@@ -1,9 +1,27 @@
 from .scoring_service import ScoringService
 from .promotion_service import PromotionService
 from .newsletter_service import NewsletterService
+from .pricing_service import PricingService
+from .promotion_index_service import PromotionIndexService
+from .score_queue_service import ScoreQueueService
+from .counter_service import EngagementCounterService
+from .engagement_service import EngagementBucketService
+from .whatsapp_service import WhatsAppService
+from .search_service import ProductSearchService
+from .facet_service import FacetService
+from .stats_service import ProductStatsService
 
 __all__ = [
     'ScoringService',
     'PromotionService',
     'NewsletterService',
+    'PricingService',
+    'PromotionIndexService',
+    'ScoreQueueService',
+    'EngagementCounterService',
+    'EngagementBucketService',
+    'WhatsAppService',
+    'ProductSearchService',
+    'FacetService',
+    'ProductStatsService',
 ]
@@ -0,0 +1,143 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..cache_store import get_cache_store
+
+
+class EngagementCounterService:
+    """
+    Compteurs de vues et de clics en écriture différée.
+
+    Les incréments sont accumulés dans des hashes partagés (un champ par
+    statut produit) et reportés en base par lots par `flush()`, appelée
+    périodiquement par Celery beat. Les lectures ajoutent le delta non
+    encore reporté.
+    """
+
+    VIEWS_KEY = 'counters:views'
+    CLICKS_KEY = 'counters:clicks'
+    LAST_VIEWED_KEY = 'counters:last_viewed'
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def record_view(status_id):
+        store = get_cache_store()
+        store.hincrby(EngagementCounterService.VIEWS_KEY, status_id)
+        store.hset(EngagementCounterService.LAST_VIEWED_KEY, status_id, timezone.now().timestamp())
+
+    @staticmethod
+    def record_click(status_id):
+        get_cache_store().hincrby(EngagementCounterService.CLICKS_KEY, status_id)
+
+    @staticmethod
+    def get_pending_many(status_ids):
+        """
+        Delta non reporté de plusieurs statuts, en un aller-retour :
+        {statut: (vues, clics, dernière vue)}
+        """
+        status_ids = list(status_ids)
+        if not status_ids:
+            return {}
+        views, clicks, last_viewed = get_cache_store().hmget_multi(
+            [
+                EngagementCounterService.VIEWS_KEY,
+                EngagementCounterService.CLICKS_KEY,
+                EngagementCounterService.LAST_VIEWED_KEY,
+            ],
+            status_ids
+        )
+        return {
+            status_id: (
+                views[i] or 0,
+                clicks[i] or 0,
+                datetime.fromtimestamp(last_viewed[i], tz=dt_timezone.utc) if last_viewed[i] else None,
+            )
+            for i, status_id in enumerate(status_ids)
+        }
+
+    @staticmethod
+    def get_pending(status_id):
+        """Retourne le delta non reporté d'un statut : (vues, clics, dernière vue)"""
+        return EngagementCounterService.get_pending_many([status_id])[status_id]
+
+    @staticmethod
+    def _restore(views, clicks, last_viewed):
+        """Réinjecte des deltas dont le report en base a échoué"""
+        store = get_cache_store()
+        for status_id, delta in views.items():
+            store.hincrby(EngagementCounterService.VIEWS_KEY, status_id, delta)
+        for status_id, delta in clicks.items():
+            store.hincrby(EngagementCounterService.CLICKS_KEY, status_id, delta)
+        for status_id, timestamp in last_viewed.items():
+            store.hset(EngagementCounterService.LAST_VIEWED_KEY, status_id, timestamp)
+
+    @staticmethod
+    def _record_buckets(views, clicks):
+        """Reporte les deltas dans l'historique journalier par produit"""
+        from ..models import ProductStatus
+        from .engagement_service import EngagementBucketService
+
+        product_ids = dict(
+            ProductStatus.objects.filter(
+                pk__in=[int(pk) for pk in set(views) | set(clicks)]
+            ).values_list('pk', 'product_id')
+        )
+        deltas = {}
+        for event_type, counters in (('view', views), ('whatsapp_click', clicks)):
+            for status_id, delta in counters.items():
+                product_id = product_ids.get(int(status_id))
+                if product_id is not None:
+                    deltas[(product_id, event_type)] = delta
+        EngagementBucketService.record(deltas)
+
+    @staticmethod
+    def flush():
+        """Reporte les deltas en base par lots. Retourne le nombre de statuts mis à jour."""
+        from ..models import ProductStatus
+
+        store = get_cache_store()
+        views = store.pop_hash(EngagementCounterService.VIEWS_KEY)
+        clicks = store.pop_hash(EngagementCounterService.CLICKS_KEY)
+        last_viewed = store.pop_hash(EngagementCounterService.LAST_VIEWED_KEY)
+
+        status_ids = sorted(set(views) | set(clicks) | set(last_viewed), key=int)
+        if not status_ids:
+            return 0
+
+        statuses = []
+        for status_id in status_ids:
+            status = ProductStatus(pk=int(status_id))
+            status.view_count = F('view_count') + views.get(status_id, 0)
+            status.whatsapp_click_count = F('whatsapp_click_count') + clicks.get(status_id, 0)
+            if status_id in last_viewed:
+                status.last_viewed_at = datetime.fromtimestamp(
+                    last_viewed[status_id], tz=dt_timezone.utc
+                )
+            else:
+                status.last_viewed_at = F('last_viewed_at')
+            statuses.append(status)
+
+        try:
+            with transaction.atomic():
+                ProductStatus.objects.bulk_update(
+                    statuses,
+                    ['view_count', 'whatsapp_click_count', 'last_viewed_at'],
+                    batch_size=EngagementCounterService.BATCH_SIZE
+                )
+                EngagementCounterService._record_buckets(views, clicks)
+        except Exception:
+            EngagementCounterService._restore(views, clicks, last_viewed)
+            raise
+
+        return len(statuses)
+
+    @staticmethod
+    def reset():
+        get_cache_store().delete(
+            EngagementCounterService.VIEWS_KEY,
+            EngagementCounterService.CLICKS_KEY,
+            EngagementCounterService.LAST_VIEWED_KEY,
+        )
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..constants import ENGAGEMENT_DAY_RETENTION_DAYS
+
+
+class EngagementBucketService:
+    """
+    Historique d'engagement agrégé par produit, type d'événement et jour.
+
+    Les compteurs journaliers plus anciens que la rétention sont regroupés
+    par mois ; les fenêtres glissantes se calculent en une requête groupée
+    sans jamais lire d'événements bruts.
+    """
+
+    @staticmethod
+    def record(deltas, day=None):
+        """
+        Ajoute des événements au compteur du jour.
+        `deltas` : {(product_id, event_type): nombre}
+        """
+        from ..models import ProductEngagementBucket
+
+        deltas = {key: n for key, n in deltas.items() if n}
+        if not deltas:
+            return
+
+        day = day or timezone.localdate()
+        product_ids = {product_id for product_id, _ in deltas}
+        with transaction.atomic():
+            existing = {
+                (bucket.product_id, bucket.event_type): bucket
+                for bucket in ProductEngagementBucket.objects.select_for_update().filter(
+                    product_id__in=product_ids,
+                    period='day',
+                    bucket_date=day
+                )
+            }
+
+            to_update, to_create = [], []
+            for (product_id, event_type), n in deltas.items():
+                bucket = existing.get((product_id, event_type))
+                if bucket:
+                    bucket.count = F('count') + n
+                    to_update.append(bucket)
+                else:
+                    to_create.append(ProductEngagementBucket(
+                        product_id=product_id,
+                        event_type=event_type,
+                        period='day',
+                        bucket_date=day,
+                        count=n
+                    ))
+
+            if to_update:
+                ProductEngagementBucket.objects.bulk_update(to_update, ['count'])
+            if to_create:
+                ProductEngagementBucket.objects.bulk_create(to_create)
+
+    @staticmethod
+    def get_window_totals(product_ids=None, days=30, event_type='view'):
+        """
+        Retourne {product_id: total} sur les `days` derniers jours, aujourd'hui
+        compris. Au-delà de la rétention journalière, la précision est le mois.
+        """
+        from ..models import ProductEngagementBucket
+
+        start = timezone.localdate() - timedelta(days=days - 1)
+        buckets = ProductEngagementBucket.objects.filter(event_type=event_type)
+        if product_ids is not None:
+            buckets = buckets.filter(product_id__in=product_ids)
+
+        buckets = buckets.filter(bucket_date__gte=start) | buckets.filter(
+            period='month', bucket_date__gte=start.replace(day=1)
+        )
+        return dict(
+            buckets.order_by()
+            .values('product_id')
+            .annotate(total=Sum('count'))
+            .values_list('product_id', 'total')
+        )
+
+    @staticmethod
+    def compact(retention_days=ENGAGEMENT_DAY_RETENTION_DAYS):
+        """
+        Regroupe par mois les compteurs journaliers antérieurs à la rétention.
+        Retourne le nombre de compteurs journaliers supprimés.
+        """
+        from ..models import ProductEngagementBucket
+
+        cutoff = timezone.localdate() - timedelta(days=retention_days)
+        old_days = ProductEngagementBucket.objects.filter(period='day', bucket_date__lt=cutoff)
+
+        with transaction.atomic():
+            monthly = defaultdict(int)
+            for product_id, event_type, bucket_date, count in old_days.values_list(
+                'product_id', 'event_type', 'bucket_date', 'count'
+            ).iterator():
+                monthly[(product_id, event_type, bucket_date.replace(day=1))] += count
+
+            if not monthly:
+                return 0
+
+            existing = {
+                (bucket.product_id, bucket.event_type, bucket.bucket_date): bucket
+                for bucket in ProductEngagementBucket.objects.select_for_update().filter(
+                    period='month',
+                    product_id__in={key[0] for key in monthly},
+                    bucket_date__in={key[2] for key in monthly}
+                )
+            }
+
+            to_update, to_create = [], []
+            for (product_id, event_type, month), count in monthly.items():
+                bucket = existing.get((product_id, event_type, month))
+                if bucket:
+                    bucket.count = F('count') + count
+                    to_update.append(bucket)
+                else:
+                    to_create.append(ProductEngagementBucket(
+                        product_id=product_id,
+                        event_type=event_type,
+                        period='month',
+                        bucket_date=month,
+                        count=count
+                    ))
+
+            ProductEngagementBucket.objects.bulk_update(to_update, ['count'], batch_size=500)
+            ProductEngagementBucket.objects.bulk_create(to_create, batch_size=500)
+            deleted, _ = old_days.delete()
+        return deleted
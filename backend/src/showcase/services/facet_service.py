@@ -0,0 +1,73 @@
+from django.db.models import Count, Q
+
+from ..constants import PRICE_RANGES
+from ..utils import get_price_range_q
+
+
+class FacetService:
+    """
+    Comptages par facette d'un ensemble de produits filtré, pour la barre de
+    filtres : une agrégation conditionnelle (stock, réductions, gammes de
+    prix) et un regroupement par catégorie et par marque, soit trois requêtes.
+    """
+
+    @staticmethod
+    def discount_q():
+        # Même définition que ProductFilter.filter_has_discount
+        return Q(compare_at_price__isnull=False, compare_at_price__gt=0)
+
+    @staticmethod
+    def get_facets(queryset):
+        from ..category_tree import get_category_tree
+
+        # Le tri (pertinence, curseur) n'a pas de sens pour des comptages
+        queryset = queryset.order_by()
+
+        aggregates = {
+            'total': Count('pk'),
+            'in_stock': Count('pk', filter=Q(is_in_stock=True)),
+            'has_discount': Count('pk', filter=FacetService.discount_q()),
+        }
+        for index, (key, _label, _minimum, _maximum) in enumerate(PRICE_RANGES):
+            aggregates[f'price_{index}'] = Count('pk', filter=get_price_range_q(key))
+        totals = queryset.aggregate(**aggregates)
+
+        tree = get_category_tree()
+        categories = []
+        for category_id, count in (
+            queryset.values('category_id').annotate(count=Count('pk'))
+            .order_by('-count', 'category_id').values_list('category_id', 'count')
+        ):
+            node = tree.get(category_id)
+            if node is not None:
+                categories.append({
+                    'id': node.id,
+                    'name': node.name,
+                    'slug': node.slug,
+                    'full_path': node.full_path,
+                    'count': count,
+                })
+
+        brands = [
+            {'name': brand, 'count': count}
+            for brand, count in queryset.exclude(brand='').values('brand')
+            .annotate(count=Count('pk')).order_by('-count', 'brand').values_list('brand', 'count')
+        ]
+
+        return {
+            'total': totals['total'],
+            'categories': categories,
+            'brands': brands,
+            'price_ranges': [
+                {'key': key, 'label': str(label), 'min': minimum, 'max': maximum, 'count': totals[f'price_{index}']}
+                for index, (key, label, minimum, maximum) in enumerate(PRICE_RANGES)
+            ],
+            'in_stock': {
+                'true': totals['in_stock'],
+                'false': totals['total'] - totals['in_stock'],
+            },
+            'has_discount': {
+                'true': totals['has_discount'],
+                'false': totals['total'] - totals['has_discount'],
+            },
+        }
@@ -1,6 +1,12 @@
+from itertools import islice
+
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from ..constants import NEWSLETTER_DISPATCH_WINDOW, NEWSLETTER_SEND_RATE, NEWSLETTER_SEND_WORKERS
+from ..mail_pool import MailConnectionPool
 
 
 class NewsletterService:
@@ -37,67 +43,286 @@ class NewsletterService:
             logger.error(f"[Newsletter] Email send error: {str(e)}")
 
     @staticmethod
-    def send_campaign(campaign, chunk_size=100):
+    def get_from_email(template, from_email=None):
+        return from_email or template.default_from or getattr(
+            settings, "DEFAULT_FROM_EMAIL", "no-reply@localhost"
+        )
+
+    @staticmethod
+    def build_message(compiled, subscriber, from_email):
+        """Message d'un abonné à partir d'un template compilé (`NewsletterTemplate.compile`)"""
+        subject, text, html = compiled.render(subscriber)
+        msg = EmailMultiAlternatives(subject, text or '', from_email, [subscriber.email])
+        if html:
+            msg.attach_alternative(html, "text/html")
+        return msg
+
+    @staticmethod
+    def open_mail_pool(workers=None, rate=None):
+        """Pool de connexions SMTP dimensionné par les réglages de la campagne"""
+        if workers is None:
+            workers = getattr(settings, 'NEWSLETTER_SEND_WORKERS', NEWSLETTER_SEND_WORKERS)
+        if rate is None:
+            rate = getattr(settings, 'NEWSLETTER_SEND_RATE', NEWSLETTER_SEND_RATE)
+        return MailConnectionPool(size=workers, rate=rate)
+
+    @staticmethod
+    def deliver_chunk(campaign, compiled, subscribers, from_email, pool):
+        """
+        Prépare les messages d'un lot, les envoie par le pool puis enregistre
+        les résultats. Aucune transaction n'est ouverte pendant l'envoi.
+        Retourne le nombre d'e-mails envoyés.
+        """
         from ..models import NewsletterLog
 
-        if campaign.status in ['sent', 'cancelled']:
-            return 0
+        messages, recipients, failures = [], [], []
+        for sub in subscribers:
+            try:
+                messages.append(NewsletterService.build_message(compiled, sub, from_email))
+                recipients.append(sub)
+            except Exception as e:
+                failures.append((sub, e))
+
+        errors = pool.send(messages)
+        failures.extend(
+            (sub, error) for sub, error in zip(recipients, errors) if error is not None
+        )
+        sent = [sub for sub, error in zip(recipients, errors) if error is None]
+
+        logs = [NewsletterLog(campaign=campaign, subscriber=sub, status='sent') for sub in sent]
+        logs.extend(
+            NewsletterLog(campaign=campaign, subscriber=sub, status='failed', error=str(error))
+            for sub, error in failures
+        )
+        with transaction.atomic():
+            # Destinataires déjà en échec (lot relancé) : ni recomptés, ni laissés en échec s'ils passent
+            already_failed = set(NewsletterLog.objects.filter(
+                campaign=campaign, status='failed', subscriber__in=[sub.pk for sub in subscribers]
+            ).values_list('subscriber_id', flat=True))
+            NewsletterLog.objects.bulk_create(logs, batch_size=500)
+            NewsletterService.record_results(
+                campaign,
+                len(sent),
+                [error for _, error in failures],
+                failed=len({sub.pk for sub, _ in failures} - already_failed),
+                recovered=sum(1 for sub in sent if sub.pk in already_failed),
+            )
+        return len(sent)
+
+    @staticmethod
+    def record_results(campaign, sent, errors, failed=None, recovered=0):
+        """
+        Ajoute un lot aux statistiques de la campagne et à `sent_count`.
+
+        `failed` compte les destinataires passés en échec (une erreur chacun
+        par défaut), `recovered` ceux en échec auparavant et envoyés par ce
+        lot : `stats.failed` reste le nombre de destinataires en échec.
+        `error_counts` compte les tentatives échouées par classe d'erreur.
+        """
+        from ..models import NewsletterCampaign, NewsletterCampaignStats
+
+        if failed is None:
+            failed = len(errors)
+        stats, _ = NewsletterCampaignStats.objects.select_for_update().get_or_create(campaign=campaign)
+        stats.sent += sent
+        stats.failed = max(0, stats.failed + failed - recovered)
+        for error in errors:
+            error_class = type(error).__name__
+            stats.error_counts[error_class] = stats.error_counts.get(error_class, 0) + 1
+        stats.save()
+
+        if sent:
+            NewsletterCampaign.objects.filter(pk=campaign.pk).update(sent_count=F('sent_count') + sent)
+        return stats
+
+    @staticmethod
+    def pending_recipients(campaign, start_pk=None, end_pk=None):
+        """Destinataires (plage d'ids incluse) qui n'ont pas encore reçu la campagne"""
+        from ..models import NewsletterLog
+
+        recipients = campaign.queue_recipients()
+        if start_pk is not None:
+            recipients = recipients.filter(pk__gte=start_pk)
+        if end_pk is not None:
+            recipients = recipients.filter(pk__lte=end_pk)
+        return recipients.exclude(
+            Exists(NewsletterLog.objects.filter(
+                campaign=campaign, subscriber=OuterRef('pk'), status='sent'
+            ))
+        ).order_by('pk')
+
+    @staticmethod
+    def recipient_ranges(campaign, chunk_size=100, after_pk=None):
+        """
+        Plages d'ids (début, fin incluses) de `chunk_size` destinataires en
+        attente d'id supérieur à `after_pk`, lues page par page par clé
+        (`pk > dernier LIMIT n`) : la mémoire ne dépend pas de la taille de la liste.
+        """
+        pending = NewsletterService.pending_recipients(campaign).values_list('pk', flat=True)
+        while True:
+            page = pending if after_pk is None else pending.filter(pk__gt=after_pk)
+            page = list(page[:chunk_size])
+            if not page:
+                return
+            yield page[0], page[-1]
+            if len(page) < chunk_size:
+                return
+            after_pk = page[-1]
+
+    @staticmethod
+    def save_checkpoint(campaign, pk):
+        from ..models import NewsletterCampaign
+
+        NewsletterCampaign.objects.filter(pk=campaign.pk).update(checkpoint_pk=pk)
+        campaign.checkpoint_pk = pk
+
+    @staticmethod
+    def send_chunk(campaign, start_pk, end_pk, from_email=None, pool=None, compiled=None):
+        """
+        Envoie la campagne aux destinataires de la plage qui ne l'ont pas
+        encore reçue. Retourne le nombre d'e-mails envoyés.
 
+        Les destinataires déjà servis sont lus dans les logs, écrits après
+        l'envoi : rejouer une plage terminée ne renvoie rien, mais un arrêt
+        entre l'envoi et l'écriture des logs renvoie toute la plage à la
+        reprise. Deux exécutions simultanées d'une même plage ne sont pas
+        protégées (cf. start_campaign).
+        """
         template = campaign.template
-        if not template.is_active:
+        from_email = NewsletterService.get_from_email(template, from_email)
+        subscribers = list(
+            NewsletterService.pending_recipients(campaign, start_pk, end_pk).only('id', 'email', 'name')
+        )
+        if not subscribers:
             return 0
 
-        from_email = template.default_from or getattr(
-            settings, "DEFAULT_FROM_EMAIL", "no-reply@localhost"
+        compiled = compiled or template.compile()
+        if pool is None:
+            with NewsletterService.open_mail_pool() as pool:
+                sent = NewsletterService.deliver_chunk(campaign, compiled, subscribers, from_email, pool)
+        else:
+            sent = NewsletterService.deliver_chunk(campaign, compiled, subscribers, from_email, pool)
+        return sent
+
+    @staticmethod
+    def finish_campaign(campaign):
+        """Marque la campagne envoyée avec le nombre exact d'envois"""
+        from ..models import NewsletterCampaign, NewsletterCampaignStats
+
+        sent = NewsletterCampaignStats.objects.filter(campaign=campaign).values_list(
+            'sent', flat=True
+        ).first() or 0
+        NewsletterCampaign.objects.filter(pk=campaign.pk, status='sending').update(
+            status='sent', sent_count=sent
         )
+        campaign.refresh_from_db(fields=['status', 'sent_count'])
+        return sent
 
-        recipients_qs = campaign.queue_recipients()
-        total_sent = 0
+    @staticmethod
+    def cancel_campaign(campaign):
+        """Interrompt une campagne en envoi ; resume_campaign la reprendra au point de reprise"""
+        from ..models import NewsletterCampaign
+
+        if not NewsletterCampaign.objects.filter(pk=campaign.pk, status='sending').update(status='cancelled'):
+            return False
+        campaign.status = 'cancelled'
+        return True
 
+    @staticmethod
+    def start_campaign(campaign, resume=False):
+        """
+        Passe la campagne en envoi. Une campagne envoyée ou annulée ne repart
+        que sur reprise (destinataires en échec ou jamais atteints).
+
+        Le passage est une mise à jour conditionnelle : une campagne déjà en
+        envoi n'est jamais relancée, sans quoi deux séries de tâches
+        serviraient les mêmes plages en parallèle. Une campagne bloquée en
+        envoi (worker perdu) doit d'abord être annulée, puis reprise.
+        """
+        from ..models import NewsletterCampaign
+
+        if not campaign.template.is_active:
+            return False
+
+        allowed = ['sent', 'cancelled'] if resume else ['draft', 'scheduled']
+        if not NewsletterCampaign.objects.filter(pk=campaign.pk, status__in=allowed).update(status='sending'):
+            return False
         campaign.status = 'sending'
-        campaign.save(update_fields=['status'])
+        return True
+
+    @staticmethod
+    def dispatch_campaign(campaign, chunk_size=100, resume=False, retry_failed=False):
+        """
+        Répartit l'envoi en tâches Celery, une par plage de `chunk_size`
+        destinataires en attente, par fenêtres de `NEWSLETTER_DISPATCH_WINDOW`
+        plages : le chord d'une fenêtre avance le point de reprise
+        (`checkpoint_pk`) puis lance la suivante, la dernière clôt la campagne.
+        Retourne le nombre de tâches de la première fenêtre.
+
+        Chaque tâche ignore les destinataires déjà servis : une reprise repart
+        du point de reprise, ou du début avec `retry_failed` pour renvoyer
+        aussi aux destinataires en échec.
+        """
+        if not NewsletterService.start_campaign(campaign, resume=resume):
+            return 0
+        if retry_failed:
+            NewsletterService.save_checkpoint(campaign, None)
+        return NewsletterService.dispatch_window(campaign, chunk_size)
 
+    @staticmethod
+    def dispatch_window(campaign, chunk_size=100):
+        from celery import chord
+        from ..tasks import advance_newsletter_campaign, send_newsletter_chunk
+
+        ranges = list(islice(
+            NewsletterService.recipient_ranges(campaign, chunk_size, campaign.checkpoint_pk),
+            NEWSLETTER_DISPATCH_WINDOW
+        ))
+        if not ranges:
+            NewsletterService.finish_campaign(campaign)
+            return 0
+
+        chord(
+            send_newsletter_chunk.si(campaign.pk, start_pk, end_pk)
+            for start_pk, end_pk in ranges
+        )(advance_newsletter_campaign.si(campaign.pk, ranges[-1][1], chunk_size))
+        return len(ranges)
+
+    @staticmethod
+    def advance_campaign(campaign, checkpoint_pk, chunk_size=100):
+        """Fenêtre terminée : enregistre le point de reprise et lance la suivante"""
+        if campaign.status != 'sending':
+            return 0
+        NewsletterService.save_checkpoint(campaign, checkpoint_pk)
+        return NewsletterService.dispatch_window(campaign, chunk_size)
+
+    @staticmethod
+    def resume_campaign(campaign, chunk_size=100, retry_failed=False):
+        """Relance une campagne interrompue, annulée ou avec des échecs là où elle s'est arrêtée"""
+        return NewsletterService.dispatch_campaign(
+            campaign, chunk_size, resume=True, retry_failed=retry_failed
+        )
+
+    @staticmethod
+    def send_campaign(campaign, chunk_size=100, from_email=None, workers=None, rate=None):
+        """Envoi synchrone, plage par plage depuis le point de reprise, sur un seul pool de connexions"""
+        if not NewsletterService.start_campaign(campaign):
+            return 0
+
+        total_sent = 0
         try:
-            pks = list(recipients_qs.values_list('pk', flat=True))
-            for i in range(0, len(pks), chunk_size):
-                chunk_pks = pks[i:i + chunk_size]
-                subscribers = recipients_qs.model.objects.filter(pk__in=chunk_pks)
-
-                with transaction.atomic():
-                    for sub in subscribers:
-                        try:
-                            text, html = template.render_for_subscriber(sub)
-                            subject = template.subject.format(
-                                name=sub.name or "",
-                                email=sub.email
-                            )
-                            msg = EmailMultiAlternatives(
-                                subject, text or '', from_email, [sub.email]
-                            )
-                            if html:
-                                msg.attach_alternative(html, "text/html")
-                            msg.send(fail_silently=False)
-
-                            NewsletterLog.objects.create(
-                                campaign=campaign,
-                                subscriber=sub,
-                                status='sent'
-                            )
-                            total_sent += 1
-                        except Exception as e:
-                            NewsletterLog.objects.create(
-                                campaign=campaign,
-                                subscriber=sub,
-                                status='failed',
-                                error=str(e)
-                            )
-
-            campaign.sent_count = total_sent
-            campaign.status = 'sent'
-            campaign.save(update_fields=['sent_count', 'status'])
+            compiled = campaign.template.compile()
+            with NewsletterService.open_mail_pool(workers, rate) as pool:
+                for start_pk, end_pk in NewsletterService.recipient_ranges(
+                    campaign, chunk_size, campaign.checkpoint_pk
+                ):
+                    total_sent += NewsletterService.send_chunk(
+                        campaign, start_pk, end_pk, from_email, pool, compiled
+                    )
+                    NewsletterService.save_checkpoint(campaign, end_pk)
+            NewsletterService.finish_campaign(campaign)
         except Exception:
-            campaign.status = 'cancelled'
-            campaign.save(update_fields=['status'])
+            NewsletterService.cancel_campaign(campaign)
             raise
 
         return total_sent
@@ -0,0 +1,137 @@
+from django.db import transaction
+
+from ..response_cache import invalidate_tags
+from .promotion_service import PromotionService
+
+
+class PricingService:
+    """
+    Moteur de prix par lot : calcule les prix finaux d'une page entière de
+    produits avec un nombre fixe de requêtes, quel que soit le nombre de
+    produits ou de promotions actives.
+
+    Le prix après promotions est aussi dénormalisé sur `Product`
+    (`effective_price`, `best_promotion`) pour trier et filtrer les listes
+    en base ; il est recalculé quand une promotion ou ses cibles changent et
+    quand le calendrier des promotions bascule (`promotion_timeline`).
+    """
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def get_active_promotions():
+        """Promotions actives lues dans le calendrier en cache"""
+        from ..promotion_timeline import get_active_promotions
+
+        return get_active_promotions()
+
+    @staticmethod
+    def get_applicable_map(products, promotions):
+        """
+        Retourne {product_id: [promotions applicables]} en conservant l'ordre
+        des promotions. Les ciblages sont lus dans l'index d'applicabilité.
+        """
+        from .promotion_index_service import PromotionIndexService
+
+        targeted_ids = [p.pk for p in promotions if not p.applies_to_all]
+        index = {}
+        if targeted_ids:
+            index = PromotionIndexService.get_promotion_ids(
+                [p.pk for p in products], targeted_ids
+            )
+
+        applicable = {}
+        for product in products:
+            promotion_ids = index.get(product.pk, ())
+            applicable[product.pk] = [
+                promo for promo in promotions
+                if promo.applies_to_all or promo.pk in promotion_ids
+            ]
+        return applicable
+
+    @staticmethod
+    def get_final_prices(products, quantity=1):
+        """Retourne {product_id: prix unitaire final} pour une liste de produits"""
+        products = [p for p in products if p.pk is not None]
+        if not products:
+            return {}
+
+        promotions = PricingService.get_active_promotions()
+        if not promotions:
+            return {p.pk: p.price for p in products}
+
+        applicable = PricingService.get_applicable_map(products, promotions)
+        prices = {}
+        for product in products:
+            _, final = PromotionService.combine_promotions(
+                product.price, applicable[product.pk], quantity
+            )
+            prices[product.pk] = final
+        return prices
+
+    @staticmethod
+    def get_best_promotion(price, applicable):
+        """Promotion seule donnant le prix unitaire le plus bas (None si aucune remise)"""
+        best, best_final = None, price
+        for promotion in applicable:
+            try:
+                _, final = promotion.compute_discount(price, quantity=1)
+            except Exception:
+                continue
+            if final < best_final:
+                best, best_final = promotion, final
+        return best
+
+    @staticmethod
+    def refresh_effective_prices(product_ids=None, batch_size=None):
+        """
+        Recalcule `effective_price` et `best_promotion` par lots (tout le
+        catalogue par défaut). Seules les lignes modifiées sont réécrites ;
+        retourne leur nombre.
+        """
+        from ..models import Product
+
+        batch_size = batch_size or PricingService.BATCH_SIZE
+        promotions = PricingService.get_active_promotions()
+
+        queryset = Product.objects.only('pk', 'price', 'effective_price', 'best_promotion_id').order_by('pk')
+        if product_ids is not None:
+            queryset = queryset.filter(pk__in=list(product_ids))
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            applicable = PricingService.get_applicable_map(batch, promotions) if promotions else {}
+            changed = []
+            for product in batch:
+                product_promotions = applicable.get(product.pk, [])
+                _, final = PromotionService.combine_promotions(product.price, product_promotions)
+                best = PricingService.get_best_promotion(product.price, product_promotions)
+                best_id = best.pk if best else None
+                if product.effective_price != final or product.best_promotion_id != best_id:
+                    product.effective_price = final
+                    product.best_promotion_id = best_id
+                    changed.append(product)
+
+            if changed:
+                Product.objects.bulk_update(changed, ['effective_price', 'best_promotion'])
+                updated += len(changed)
+
+            if len(batch) < batch_size:
+                break
+
+        if updated:
+            invalidate_tags('products')
+        return updated
+
+    @staticmethod
+    def schedule_refresh():
+        """Recalcule tous les prix après le commit (promotion ou ciblage modifié)"""
+        from ..tasks import refresh_effective_prices
+
+        transaction.on_commit(refresh_effective_prices.delay)
@@ -0,0 +1,137 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+
+
+class PromotionIndexService:
+    """
+    Maintient l'index `PromotionApplicability` (produit → promotions ciblées).
+
+    Les promotions ciblant des produits ou des catégories y sont matérialisées
+    quel que soit leur état `active` ; la fenêtre de validité reste évaluée à
+    la lecture. Les promotions `applies_to_all` ne sont pas matérialisées.
+    """
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def _subtree_filter(category_coords):
+        condition = Q()
+        for tree_id, lft, rght in category_coords:
+            condition |= Q(
+                category__tree_id=tree_id,
+                category__lft__gte=lft,
+                category__rght__lte=rght
+            )
+        return condition
+
+    @staticmethod
+    def target_product_ids(promotion):
+        from ..models import Product
+
+        if promotion.applies_to_all:
+            return set()
+
+        product_ids = set(promotion.products.values_list('pk', flat=True))
+        coords = list(promotion.categories.values_list('tree_id', 'lft', 'rght'))
+        if coords:
+            product_ids.update(
+                Product.objects.filter(
+                    PromotionIndexService._subtree_filter(coords)
+                ).values_list('pk', flat=True)
+            )
+        return product_ids
+
+    @staticmethod
+    def reindex_promotion(promotion):
+        from ..models import PromotionApplicability
+
+        product_ids = PromotionIndexService.target_product_ids(promotion)
+        with transaction.atomic():
+            PromotionApplicability.objects.filter(promotion=promotion).delete()
+            PromotionApplicability.objects.bulk_create(
+                [PromotionApplicability(promotion=promotion, product_id=pk) for pk in product_ids],
+                batch_size=PromotionIndexService.BATCH_SIZE
+            )
+        return len(product_ids)
+
+    @staticmethod
+    def reindex_promotions(promotions):
+        for promotion in promotions:
+            PromotionIndexService.reindex_promotion(promotion)
+
+    @staticmethod
+    def reindex_category_promotions():
+        """Réindexe les promotions ciblant des catégories (après un déplacement dans l'arbre)"""
+        from ..models import Promotion
+
+        promotions = Promotion.objects.filter(
+            applies_to_all=False,
+            categories__isnull=False
+        ).distinct()
+        PromotionIndexService.reindex_promotions(promotions)
+
+    @staticmethod
+    def reindex_products(product_ids):
+        """Recalcule les lignes d'index de quelques produits (création, changement de catégorie)"""
+        from ..models import Product, Promotion, PromotionApplicability
+
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+
+        coords = {
+            pk: (tree_id, lft, rght)
+            for pk, tree_id, lft, rght in Product.objects.filter(pk__in=product_ids).values_list(
+                'pk', 'category__tree_id', 'category__lft', 'category__rght'
+            )
+        }
+
+        matches = defaultdict(set)
+        for product_id, promotion_id in Promotion.products.through.objects.filter(
+            product_id__in=product_ids,
+            promotion__applies_to_all=False
+        ).values_list('product_id', 'promotion_id'):
+            matches[product_id].add(promotion_id)
+
+        category_targets = Promotion.categories.through.objects.filter(
+            promotion__applies_to_all=False
+        ).values_list('promotion_id', 'category__tree_id', 'category__lft', 'category__rght')
+        for promotion_id, tree_id, lft, rght in category_targets:
+            for product_id, (p_tree, p_lft, p_rght) in coords.items():
+                if p_tree == tree_id and lft <= p_lft and p_rght <= rght:
+                    matches[product_id].add(promotion_id)
+
+        with transaction.atomic():
+            PromotionApplicability.objects.filter(product_id__in=product_ids).delete()
+            PromotionApplicability.objects.bulk_create(
+                [
+                    PromotionApplicability(promotion_id=promotion_id, product_id=product_id)
+                    for product_id, promotion_ids in matches.items()
+                    for promotion_id in promotion_ids
+                ],
+                batch_size=PromotionIndexService.BATCH_SIZE
+            )
+
+    @staticmethod
+    def rebuild():
+        from ..models import Promotion, PromotionApplicability
+
+        with transaction.atomic():
+            PromotionApplicability.objects.all().delete()
+            for promotion in Promotion.objects.filter(applies_to_all=False):
+                PromotionIndexService.reindex_promotion(promotion)
+
+    @staticmethod
+    def get_promotion_ids(product_ids, promotion_ids=None):
+        """Retourne {product_id: {promotion_id, ...}} en une seule requête sur l'index"""
+        from ..models import PromotionApplicability
+
+        qs = PromotionApplicability.objects.filter(product_id__in=list(product_ids))
+        if promotion_ids is not None:
+            qs = qs.filter(promotion_id__in=list(promotion_ids))
+
+        mapping = defaultdict(set)
+        for product_id, promotion_id in qs.values_list('product_id', 'promotion_id'):
+            mapping[product_id].add(promotion_id)
+        return mapping
@@ -1,17 +1,20 @@
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from django.db.models import F
 
 
 class PromotionService:
 
     @staticmethod
     def get_applicable_promotions(product):
-        from ..models import Promotion
+        from .pricing_service import PricingService
 
-        now_qs = Promotion.objects.filter(active=True)
-        applicable = [p for p in now_qs if p.is_active_now() and p.applies_to_product(product)]
-        return applicable
+        promotions = PricingService.get_active_promotions()
+        if not promotions:
+            return []
+        return PricingService.get_applicable_map([product], promotions)[product.pk]
 
     @staticmethod
     def get_best_promotion(product, quantity=1):
@@ -29,9 +32,16 @@ class PromotionService:
 
     @staticmethod
     def calculate_price_with_promotions(product, quantity=1):
-        qty = max(1, int(quantity))
-        original = product.price
         applicable = PromotionService.get_applicable_promotions(product)
+        return PromotionService.combine_promotions(product.price, applicable, quantity)
+
+    @staticmethod
+    def combine_promotions(original, applicable, quantity=1):
+        """
+        Combine des promotions déjà reconnues applicables et retourne
+        (remise totale, prix unitaire final). Aucune requête n'est exécutée.
+        """
+        qty = max(1, int(quantity))
 
         if not applicable:
             return Decimal('0.00'), original
@@ -77,7 +87,7 @@ class PromotionService:
         best_non_stack_final = original
         for p in non_stackable:
             try:
-                _, final = p.get_discount_amount(product, quantity=1)
+                _, final = p.compute_discount(original, quantity=1)
                 if final < best_non_stack_final:
                     best_non_stack_final = final
             except Exception:
@@ -94,27 +104,65 @@ class PromotionService:
 
     @staticmethod
     def redeem_promotion(promotion, user=None, increment=1):
-        from ..models import PromotionUsage
-
-        if promotion.usage_limit is not None and (promotion.usage_count() + increment) > promotion.usage_limit:
-            return False
+        """
+        Enregistre `increment` utilisations de `promotion`.
+
+        Chaque limite est vérifiée par la mise à jour conditionnelle qui
+        incrémente son compteur (`usage_total` pour la limite globale,
+        `PromotionUsage.count` pour la limite par utilisateur) : deux
+        utilisations concurrentes ne peuvent pas dépasser la limite. Si la
+        seconde échoue, la transaction annule la première.
+        Retourne False si une limite est atteinte.
+        """
+        from ..models import Promotion, PromotionUsage
+        from ..promotion_timeline import invalidate_promotion_timeline
+
+        with transaction.atomic():
+            promotions = Promotion.objects.filter(pk=promotion.pk)
+            if promotion.usage_limit is not None:
+                promotions = promotions.filter(usage_total__lte=F('usage_limit') - increment)
+            if not promotions.update(usage_total=F('usage_total') + increment):
+                return False
 
-        if user and promotion.per_user_limit is not None:
             usage, _ = PromotionUsage.objects.get_or_create(promotion=promotion, user=user)
-            if (usage.count + increment) > promotion.per_user_limit:
+            usages = PromotionUsage.objects.filter(pk=usage.pk)
+            if user and promotion.per_user_limit is not None:
+                usages = usages.filter(count__lte=promotion.per_user_limit - increment)
+            if not usages.update(count=F('count') + increment, last_used_at=timezone.now()):
+                transaction.set_rollback(True)
                 return False
-            usage.count = F('count') + increment
-            usage.last_used_at = timezone.now()
-            usage.save(update_fields=['count', 'last_used_at'])
-            usage.refresh_from_db()
-            return True
-
-        if not user:
-            usage, _ = PromotionUsage.objects.get_or_create(promotion=promotion, user=None)
-            usage.count = F('count') + increment
-            usage.last_used_at = timezone.now()
-            usage.save(update_fields=['count', 'last_used_at'])
-            usage.refresh_from_db()
-            return True
 
+            promotion.usage_total = Promotion.objects.values_list(
+                'usage_total', flat=True
+            ).get(pk=promotion.pk)
+
+        # update() n'émet pas de signal : une promotion épuisée quitte l'ensemble actif
+        if promotion.usage_limit is not None and promotion.usage_total >= promotion.usage_limit:
+            invalidate_promotion_timeline()
         return True
+
+    @staticmethod
+    def reconcile_usage_totals():
+        """
+        Recale `usage_total` sur la somme des `PromotionUsage` (utilisations
+        supprimées ou saisies dans l'admin). Retourne le nombre de promotions corrigées.
+        """
+        from ..models import Promotion, PromotionUsage
+        from ..promotion_timeline import invalidate_promotion_timeline
+
+        expected = Coalesce(
+            Subquery(
+                PromotionUsage.objects.filter(promotion=OuterRef('pk')).order_by()
+                .values('promotion').annotate(total=Sum('count')).values('total')
+            ),
+            0
+        )
+        stale_ids = list(
+            Promotion.objects.annotate(expected_total=expected)
+            .exclude(usage_total=F('expected_total')).values_list('pk', flat=True)
+        )
+        if stale_ids:
+            # Sous-requête corrélée : la somme est relue au moment de la mise à jour
+            Promotion.objects.filter(pk__in=stale_ids).update(usage_total=expected)
+            invalidate_promotion_timeline()
+        return len(stale_ids)
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+
+from ..cache_store import get_cache_store
+from ..constants import SCORE_QUEUE_WINDOW_SECONDS
+
+
+class ScoreQueueService:
+    """
+    File de recalcul des scores dédupliquée par statut produit.
+
+    Les demandes reçues pendant la fenêtre sont regroupées dans un ensemble
+    partagé ; une seule tâche de vidage est planifiée par fenêtre et recalcule
+    le lot en une passe.
+    """
+
+    PENDING_KEY = 'score_queue:pending'
+    ENQUEUED_KEY = 'score_queue:enqueued'
+    DEDUPLICATED_KEY = 'score_queue:deduplicated'
+    FLUSHED_KEY = 'score_queue:flushed'
+    FLUSH_SCHEDULED_KEY = 'score_queue:flush_scheduled'
+
+    @staticmethod
+    def enqueue(*status_ids, window=None):
+        from ..tasks import flush_score_queue
+
+        if not status_ids:
+            return 0
+
+        window = SCORE_QUEUE_WINDOW_SECONDS if window is None else window
+        store = get_cache_store()
+        added = store.sadd(ScoreQueueService.PENDING_KEY, *status_ids)
+        store.incr(ScoreQueueService.ENQUEUED_KEY, len(status_ids))
+        if added < len(status_ids):
+            store.incr(ScoreQueueService.DEDUPLICATED_KEY, len(status_ids) - added)
+
+        # Le drapeau expire après la fenêtre : une tâche perdue ne bloque pas la file
+        if cache.add(ScoreQueueService.FLUSH_SCHEDULED_KEY, True, timeout=max(window * 2, 1)):
+            flush_score_queue.apply_async(countdown=window)
+        return added
+
+    @staticmethod
+    def flush():
+        """Vide la file et recalcule les statuts en attente. Retourne le nombre traité."""
+        from ..models import ProductStatus
+        from .scoring_service import ScoringService
+
+        # Retirer le drapeau avant de vider : une demande arrivant pendant le
+        # recalcul planifie une nouvelle fenêtre au lieu d'être perdue
+        cache.delete(ScoreQueueService.FLUSH_SCHEDULED_KEY)
+        store = get_cache_store()
+        status_ids = [int(pk) for pk in store.pop_all(ScoreQueueService.PENDING_KEY)]
+        if not status_ids:
+            return 0
+
+        ScoringService.bulk_recalculate(
+            ProductStatus.objects.filter(pk__in=status_ids),
+            preserve_featured=True
+        )
+        store.incr(ScoreQueueService.FLUSHED_KEY, len(status_ids))
+        return len(status_ids)
+
+    @staticmethod
+    def get_metrics():
+        store = get_cache_store()
+        enqueued = store.get_int(ScoreQueueService.ENQUEUED_KEY)
+        deduplicated = store.get_int(ScoreQueueService.DEDUPLICATED_KEY)
+        return {
+            'depth': store.scard(ScoreQueueService.PENDING_KEY),
+            'enqueued': enqueued,
+            'deduplicated': deduplicated,
+            'flushed': store.get_int(ScoreQueueService.FLUSHED_KEY),
+            'dedup_ratio': round(deduplicated / enqueued, 4) if enqueued else 0.0,
+        }
+
+    @staticmethod
+    def reset():
+        cache.delete(ScoreQueueService.FLUSH_SCHEDULED_KEY)
+        get_cache_store().delete(
+            ScoreQueueService.PENDING_KEY,
+            ScoreQueueService.ENQUEUED_KEY,
+            ScoreQueueService.DEDUPLICATED_KEY,
+            ScoreQueueService.FLUSHED_KEY,
+        )
@@ -1,8 +1,13 @@
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 from django.db.models import Avg
 from django.utils import timezone
 
+from .engagement_service import EngagementBucketService
+from ..response_cache import invalidate_tags
+from ..suggest_index import mark_products_changed
 from ..constants import (
     SCORE_WEIGHTS,
     RECOMMENDATION_WEIGHTS,
@@ -13,9 +18,17 @@ from ..constants import (
 
 class ScoringService:
 
+    BULK_BATCH_SIZE = 1000
+    SCORE_FIELDS = ['is_featured', 'featured_score', 'is_recommended', 'recommendation_score']
+
     @staticmethod
-    def calculate_featured_score(product_status):
+    def calculate_featured_score(product_status, avg_price=None, now=None, views_last_30_days=None):
+        """
+        `avg_price` (prix moyen de la catégorie) et `views_last_30_days` peuvent
+        être précalculés par l'appelant pour éviter des requêtes par produit.
+        """
         product = product_status.product
+        now = now or timezone.now()
 
         if product_status.exclude_from_featured:
             return False, Decimal('0.0')
@@ -25,7 +38,8 @@ class ScoringService:
 
         score = Decimal('0.0')
 
-        views_last_30_days = product_status.get_views_last_n_days(30)
+        if views_last_30_days is None:
+            views_last_30_days = product_status.get_views_last_n_days(30)
         views_weight = Decimal(str(SCORE_WEIGHTS['views']))
         score += min(Decimal(str(views_last_30_days / 100)) * views_weight, views_weight)
 
@@ -35,7 +49,7 @@ class ScoringService:
             whatsapp_weight
         )
 
-        days_since_creation = (timezone.now() - product.created_at).days
+        days_since_creation = (now - product.created_at).days
         if days_since_creation <= 7:
             novelty_score = 10
         elif days_since_creation <= 30:
@@ -53,9 +67,11 @@ class ScoringService:
             stock_score = 0
         score += stock_score
 
-        avg_price = product.category.products.filter(
-            is_active=True, is_in_stock=True
-        ).aggregate(avg=Avg('price'))['avg'] or product.price
+        if avg_price is None:
+            avg_price = product.category.products.filter(
+                is_active=True, is_in_stock=True
+            ).aggregate(avg=Avg('price'))['avg']
+        avg_price = avg_price or product.price
 
         if product.price <= avg_price * Decimal('0.8'):
             price_score = 10
@@ -85,8 +101,14 @@ class ScoringService:
         return is_featured, final_score
 
     @staticmethod
-    def calculate_recommendation_score(product_status):
+    def calculate_recommendation_score(product_status, category_view_counts=None, now=None):
+        """
+        `category_view_counts` (vues triées des produits actifs de la catégorie,
+        voir `_sorted_view_counts`) peut être précalculé par l'appelant pour
+        éviter deux comptages par produit.
+        """
         product = product_status.product
+        now = now or timezone.now()
 
         if product_status.exclude_from_recommended:
             return False, Decimal('0.0')
@@ -114,12 +136,17 @@ class ScoringService:
             else:
                 score += 5
 
-        category_products = product.category.products.filter(is_active=True)
-        if category_products.exists():
-            products_above = category_products.filter(
-                status__view_count__gt=product_status.view_count
-            ).count()
-            total_products = category_products.count()
+        if category_view_counts is None:
+            category_view_counts = ScoringService._sorted_view_counts(
+                product.category.products.filter(is_active=True).values_list(
+                    'status__view_count', flat=True
+                )
+            )
+        if category_view_counts:
+            products_above = len(category_view_counts) - bisect_right(
+                category_view_counts, product_status.view_count
+            )
+            total_products = len(category_view_counts)
             percentile = (1 - products_above / max(total_products, 1)) * 100
 
             if percentile >= 80:
@@ -147,7 +174,7 @@ class ScoringService:
             score += 7
 
         if product_status.last_viewed_at:
-            days_since_view = (timezone.now() - product_status.last_viewed_at).days
+            days_since_view = (now - product_status.last_viewed_at).days
             if days_since_view <= 7:
                 score += 10
             elif days_since_view <= 30:
@@ -161,3 +188,128 @@ class ScoringService:
         is_recommended = final_score >= RECOMMENDATION_SCORE_THRESHOLD
 
         return is_recommended, final_score
+
+    @staticmethod
+    def _sorted_view_counts(view_counts):
+        """
+        Trie les vues ; un produit sans statut compte dans le total mais jamais
+        au-dessus d'un autre, d'où la valeur -1.
+        """
+        return sorted(-1 if c is None else c for c in view_counts)
+
+    @staticmethod
+    def get_category_contexts(category_ids=None):
+        """
+        Précalcule, en deux requêtes groupées, le contexte de scoring de chaque
+        catégorie (ou des seules `category_ids`) : prix moyen des produits
+        actifs en stock et vues triées des produits actifs.
+        """
+        from ..models import Product
+
+        products = Product.objects.all()
+        if category_ids is not None:
+            products = products.filter(category_id__in=category_ids)
+
+        avg_prices = dict(
+            products.filter(is_active=True, is_in_stock=True)
+            .order_by()
+            .values('category_id')
+            .annotate(avg=Avg('price'))
+            .values_list('category_id', 'avg')
+        )
+
+        view_counts = defaultdict(list)
+        for category_id, view_count in products.filter(is_active=True).values_list(
+            'category_id', 'status__view_count'
+        ).iterator(chunk_size=ScoringService.BULK_BATCH_SIZE):
+            view_counts[category_id].append(view_count)
+
+        for category_id, counts in view_counts.items():
+            view_counts[category_id] = ScoringService._sorted_view_counts(counts)
+
+        return avg_prices, view_counts
+
+    @staticmethod
+    def bulk_recalculate(queryset=None, batch_size=None, preserve_featured=False):
+        """
+        Recalcule les scores de tous les statuts (ou d'un sous-ensemble) avec un
+        nombre de requêtes indépendant du nombre de produits : contexte par
+        catégorie calculé une fois, scoring en mémoire, écriture par lots des
+        seules lignes modifiées. Retourne le nombre de statuts mis à jour.
+
+        Avec `preserve_featured`, une vedette déjà en place est conservée
+        (comportement de `recalculate_product_scores`).
+        """
+        from ..models import ProductStatus
+
+        batch_size = batch_size or ScoringService.BULK_BATCH_SIZE
+        if queryset is None:
+            queryset = ProductStatus.objects.all()
+            category_ids = None
+        else:
+            category_ids = queryset.values('product__category_id')
+
+        avg_prices, view_counts = ScoringService.get_category_contexts(category_ids)
+        recent_views = EngagementBucketService.get_window_totals(
+            None if category_ids is None else queryset.values('product_id'),
+            days=30
+        )
+        now = timezone.now()
+
+        pending = []
+        updated = 0
+        changed_product_ids = []
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).select_related('product').order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for status in batch:
+                category_id = status.product.category_id
+                is_featured, featured_score = ScoringService.calculate_featured_score(
+                    status, avg_price=avg_prices.get(category_id), now=now,
+                    views_last_30_days=recent_views.get(status.product_id, 0)
+                )
+                is_recommended, recommendation_score = ScoringService.calculate_recommendation_score(
+                    status, category_view_counts=view_counts.get(category_id, []), now=now
+                )
+
+                featured_score = float(featured_score)
+                recommendation_score = float(recommendation_score)
+                if preserve_featured and status.is_featured and featured_score < 100:
+                    is_featured, featured_score = True, 100.0
+                if (
+                    status.is_featured == is_featured and
+                    status.featured_score == featured_score and
+                    status.is_recommended == is_recommended and
+                    status.recommendation_score == recommendation_score
+                ):
+                    continue
+
+                status.is_featured = is_featured
+                status.featured_score = featured_score
+                status.is_recommended = is_recommended
+                status.recommendation_score = recommendation_score
+                pending.append(status)
+                changed_product_ids.append(status.product_id)
+
+            if len(pending) >= batch_size:
+                ProductStatus.objects.bulk_update(pending, ScoringService.SCORE_FIELDS)
+                updated += len(pending)
+                pending = []
+
+        if pending:
+            ProductStatus.objects.bulk_update(pending, ScoringService.SCORE_FIELDS)
+            updated += len(pending)
+
+        # bulk_update n'émet pas de signal : invalider les listes vedettes/recommandées
+        # et ne recharger que ces produits dans l'autocomplétion
+        if updated:
+            invalidate_tags('products')
+            mark_products_changed(changed_product_ids)
+
+        return updated
@@ -0,0 +1,172 @@
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from ..utils import normalize_search_text
+
+
+FTS_TABLE = 'showcase_product_fts'
+
+# Doit rester identique à l'expression de l'index GIN (migration 0008)
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', brand), 'B') || "
+    "setweight(to_tsvector('simple', codes), 'B') || "
+    "setweight(to_tsvector('simple', body), 'C')"
+)
+
+# Poids bm25 des colonnes FTS5 : name, brand, body, codes
+FTS_WEIGHTS = '10.0, 5.0, 1.0, 5.0'
+
+
+def sqlite_has_fts5(conn):
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+class ProductSearchService:
+    """
+    Recherche plein texte des produits.
+
+    Chaque produit a un `ProductSearchDocument` (nom, marque, description,
+    codes) normalisé en minuscules sans accents, tenu à jour par les signaux.
+    L'index est une table FTS5 synchronisée par triggers sous SQLite et un
+    index GIN sur `tsvector` sous PostgreSQL ; les autres bases se rabattent
+    sur `contains`. Chaque terme de la requête est cherché en préfixe.
+    """
+
+    BATCH_SIZE = 500
+    _fts5 = None
+
+    @staticmethod
+    def backend():
+        if connection.vendor == 'postgresql':
+            return 'postgresql'
+        if connection.vendor == 'sqlite':
+            if ProductSearchService._fts5 is None:
+                ProductSearchService._fts5 = sqlite_has_fts5(connection)
+            if ProductSearchService._fts5:
+                return 'sqlite'
+        return 'basic'
+
+    @staticmethod
+    def tokenize(query):
+        return normalize_search_text(query).split()
+
+    @staticmethod
+    def build_document(product):
+        from ..models import ProductSearchDocument
+
+        return ProductSearchDocument(
+            product_id=product.pk,
+            name=normalize_search_text(product.name),
+            brand=normalize_search_text(product.brand),
+            body=normalize_search_text(f"{product.short_description} {product.characteristics}"),
+            codes=normalize_search_text(f"{product.sku} {product.barcode}"),
+        )
+
+    @staticmethod
+    def index_product(product):
+        document = ProductSearchService.build_document(product)
+        document.save()
+        return document
+
+    @staticmethod
+    def index_products(product_ids):
+        """Reconstruit les documents de quelques produits (mises à jour en masse)"""
+        from ..models import Product, ProductSearchDocument
+
+        product_ids = list(product_ids)
+        documents = [
+            ProductSearchService.build_document(product)
+            for product in Product.objects.filter(pk__in=product_ids).only(
+                'name', 'brand', 'short_description', 'characteristics', 'sku', 'barcode'
+            )
+        ]
+        with transaction.atomic():
+            ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+            ProductSearchDocument.objects.bulk_create(
+                documents, batch_size=ProductSearchService.BATCH_SIZE
+            )
+        return len(documents)
+
+    @staticmethod
+    def rebuild():
+        """Reconstruit tous les documents et l'index. Retourne le nombre de produits indexés."""
+        from ..models import Product, ProductSearchDocument
+
+        count = 0
+        with transaction.atomic():
+            ProductSearchDocument.objects.all().delete()
+            products = Product.objects.only(
+                'name', 'brand', 'short_description', 'characteristics', 'sku', 'barcode'
+            ).order_by('pk')
+            batch = []
+            for product in products.iterator(chunk_size=ProductSearchService.BATCH_SIZE):
+                batch.append(ProductSearchService.build_document(product))
+                if len(batch) >= ProductSearchService.BATCH_SIZE:
+                    ProductSearchDocument.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            ProductSearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+
+            if ProductSearchService.backend() == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+        return count
+
+    @staticmethod
+    def search(queryset, query):
+        """
+        Filtre `queryset` sur `query` et annote `search_rank` (plus grand =
+        plus pertinent). Le tri par pertinence est laissé à l'appelant.
+        """
+        terms = ProductSearchService.tokenize(query)
+        if not terms:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        product_pk = f'{queryset.model._meta.db_table}.{queryset.model._meta.pk.column}'
+        backend = ProductSearchService.backend()
+
+        if backend == 'sqlite':
+            match = ' '.join(f'"{term}"*' for term in terms)
+            matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            rank = RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {product_pk}",
+                [match],
+                output_field=FloatField()
+            )
+        elif backend == 'postgresql':
+            tsquery = ' & '.join(f'{term}:*' for term in terms)
+            matches = RawSQL(
+                "SELECT product_id FROM showcase_productsearchdocument "
+                f"WHERE ({PG_VECTOR}) @@ to_tsquery('simple', %s)",
+                [tsquery]
+            )
+            rank = RawSQL(
+                f"SELECT ts_rank(({PG_VECTOR}), to_tsquery('simple', %s)) "
+                f"FROM showcase_productsearchdocument WHERE product_id = {product_pk}",
+                [tsquery],
+                output_field=FloatField()
+            )
+        else:
+            condition = Q()
+            for term in terms:
+                condition &= (
+                    Q(search_document__name__contains=term) |
+                    Q(search_document__brand__contains=term) |
+                    Q(search_document__body__contains=term) |
+                    Q(search_document__codes__contains=term)
+                )
+            return queryset.filter(condition).annotate(
+                search_rank=Case(
+                    When(search_document__name__startswith=terms[0], then=Value(1.0)),
+                    default=Value(0.0),
+                    output_field=FloatField()
+                )
+            )
+
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
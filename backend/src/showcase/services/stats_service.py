@@ -0,0 +1,115 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from ..constants import STATS_CACHE_TIMEOUT, STATS_STALE_TTL
+from .facet_service import FacetService
+
+
+class ProductStatsService:
+    """
+    Tableau de bord du catalogue : totaux par agrégation conditionnelle en une
+    requête, répartitions par catégorie et par marque en une requête groupée
+    chacune.
+
+    Le résultat est mis en cache par périmètre (`public` : produits actifs,
+    `all` : tout le catalogue). Passé `STATS_CACHE_TIMEOUT`, l'ancienne valeur
+    reste servie et une tâche Celery la recalcule.
+    """
+
+    CACHE_KEY = 'showcase:product_stats:'
+    SCOPES = ('public', 'all')
+
+    @staticmethod
+    def get_queryset(scope):
+        from ..models import Product
+
+        queryset = Product.objects.all()
+        if scope == 'public':
+            queryset = queryset.filter(is_active=True)
+        return queryset.order_by()
+
+    @staticmethod
+    def _breakdown_aggregates():
+        return {
+            'count': Count('pk'),
+            'in_stock': Count('pk', filter=Q(is_in_stock=True)),
+            'on_sale': Count('pk', filter=FacetService.discount_q()),
+            'featured': Count('pk', filter=Q(status__is_featured=True)),
+        }
+
+    @staticmethod
+    def compute(scope='public'):
+        from ..category_tree import get_category_tree
+
+        queryset = ProductStatsService.get_queryset(scope)
+
+        totals = queryset.aggregate(
+            total=Count('pk'),
+            featured=Count('pk', filter=Q(status__is_featured=True)),
+            recommended=Count('pk', filter=Q(status__is_recommended=True)),
+            on_sale=Count('pk', filter=FacetService.discount_q()),
+            in_stock=Count('pk', filter=Q(is_in_stock=True)),
+            average_price=Avg('price'),
+        )
+
+        tree = get_category_tree()
+        by_category = []
+        for row in (
+            queryset.values('category_id')
+            .annotate(**ProductStatsService._breakdown_aggregates())
+            .order_by('-count', 'category_id')
+        ):
+            node = tree.get(row.pop('category_id'))
+            if node is not None:
+                by_category.append({'id': node.id, 'name': node.name, 'slug': node.slug, **row})
+
+        by_brand = list(
+            queryset.exclude(brand='').values('brand')
+            .annotate(**ProductStatsService._breakdown_aggregates(), average_price=Avg('price'))
+            .order_by('-count', 'brand')
+        )
+        for row in by_brand:
+            row['name'] = row.pop('brand')
+            row['average_price'] = round(float(row['average_price'] or 0), 2)
+
+        return {
+            'total_products': totals['total'],
+            'featured_products': totals['featured'],
+            'recommended_products': totals['recommended'],
+            'on_sale_products': totals['on_sale'],
+            'in_stock_products': totals['in_stock'],
+            'average_price': round(float(totals['average_price'] or 0), 2),
+            'by_category': by_category,
+            'by_brand': by_brand,
+        }
+
+    @staticmethod
+    def refresh(scope='public'):
+        """Recalcule et met en cache les statistiques d'un périmètre"""
+        key = ProductStatsService.CACHE_KEY + scope
+        data = ProductStatsService.compute(scope)
+        cache.set(
+            key,
+            {'data': data, 'created': time.time()},
+            timeout=STATS_CACHE_TIMEOUT + STATS_STALE_TTL
+        )
+        cache.delete(key + ':lock')
+        return data
+
+    @staticmethod
+    def get(scope='public'):
+        """Statistiques en cache ; une valeur périmée déclenche un recalcul en tâche de fond"""
+        from ..tasks import refresh_product_stats
+
+        key = ProductStatsService.CACHE_KEY + scope
+        entry = cache.get(key)
+        if entry is None:
+            return ProductStatsService.refresh(scope)
+
+        if time.time() - entry['created'] >= STATS_CACHE_TIMEOUT and cache.add(
+            key + ':lock', True, timeout=STATS_CACHE_TIMEOUT
+        ):
+            refresh_product_stats.delay(scope)
+        return entry['data']
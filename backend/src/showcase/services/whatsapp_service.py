@@ -0,0 +1,64 @@
+import hashlib
+
+from django.core.cache import cache
+
+from ..utils import WHATSAPP_SALUTATIONS, build_whatsapp_link, build_whatsapp_message, get_whatsapp_salutation
+
+
+class WhatsAppService:
+    """
+    Liens WhatsApp précalculés par produit.
+
+    Les deux variantes du message (Bonjour / Bonsoir) sont construites une
+    fois et mises en cache sous une empreinte des champs qu'elles utilisent :
+    une modification du produit ou des paramètres change la clé. Servir un
+    lien revient à une lecture du cache et au choix de la variante selon
+    l'heure.
+    """
+
+    CACHE_TIMEOUT = 24 * 60 * 60
+
+    @staticmethod
+    def _cache_key(product, settings):
+        fingerprint = repr((
+            product.name, product.brand, str(product.price), str(product.compare_at_price),
+            product.slug, settings.company_name, settings.whatsapp_number,
+        ))
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        return f'showcase:whatsapp:{product.pk}:{digest}'
+
+    @staticmethod
+    def build_variants(product, settings):
+        return {
+            salutation: build_whatsapp_link(
+                settings.whatsapp_number,
+                build_whatsapp_message(product, settings, salutation=salutation)
+            )
+            for salutation in WHATSAPP_SALUTATIONS
+        }
+
+    @staticmethod
+    def get_variants_many(products):
+        """Retourne {product_id: {salutation: lien}} avec une lecture groupée du cache"""
+        from ..models import SiteSettings
+
+        settings = SiteSettings.get_settings()
+        keys = {product.pk: WhatsAppService._cache_key(product, settings) for product in products}
+        cached = cache.get_many(list(keys.values()))
+
+        variants, missing = {}, {}
+        for product in products:
+            key = keys[product.pk]
+            if key not in cached:
+                cached[key] = missing[key] = WhatsAppService.build_variants(product, settings)
+            variants[product.pk] = cached[key]
+
+        if missing:
+            cache.set_many(missing, timeout=WhatsAppService.CACHE_TIMEOUT)
+        return variants
+
+    @staticmethod
+    def get_link(product, variants=None):
+        if variants is None:
+            variants = WhatsAppService.get_variants_many([product])[product.pk]
+        return variants[get_whatsapp_salutation()]
@@ -1,9 +1,19 @@
 import os
-from django.db.models.signals import pre_delete, post_save
+from django.db.models.signals import pre_delete, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from showcase.models import ProductImage, Category, Product, ProductStatus
+from mptt.signals import node_moved
+from showcase.category_tree import invalidate_category_tree
+from showcase.promotion_timeline import invalidate_promotion_timeline
+from showcase.models import (
+    ProductImage, Category, Product, ProductStatus, Promotion, PromotionUsage, SiteSettings, SocialLink
+)
+from showcase.response_cache import invalidate_tags
 from showcase.services.scoring_service import ScoringService
-from showcase.tasks import recalculate_product_scores
+from showcase.services.pricing_service import PricingService
+from showcase.services.promotion_index_service import PromotionIndexService
+from showcase.services.score_queue_service import ScoreQueueService
+from showcase.services.search_service import ProductSearchService
+from showcase.suggest_index import invalidate_suggest_index, mark_products_changed
 
 
 @receiver(pre_delete, sender=ProductImage)
@@ -28,10 +38,157 @@ def create_product_status(sender, instance, created, **kwargs):
         ProductStatus.objects.get_or_create(product=instance)
 
 
+@receiver(post_save, sender=Product)
+def index_product_promotions(sender, instance, created, update_fields=None, **kwargs):
+    # Seule la catégorie d'un produit change les promotions qui le ciblent
+    if created or instance.has_changed('category_id', update_fields=update_fields):
+        PromotionIndexService.reindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def index_product_search_document(sender, instance, **kwargs):
+    ProductSearchService.index_product(instance)
+
+
+@receiver(post_save, sender=Promotion)
+def index_promotion(sender, instance, **kwargs):
+    PromotionIndexService.reindex_promotion(instance)
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+def index_promotion_targets(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        PromotionIndexService.reindex_promotion(instance)
+    elif isinstance(instance, Product):
+        PromotionIndexService.reindex_products([instance.pk])
+    elif pk_set:
+        PromotionIndexService.reindex_promotions(Promotion.objects.filter(pk__in=pk_set))
+    else:
+        PromotionIndexService.reindex_category_promotions()
+
+
+@receiver(node_moved, sender=Category)
+def index_moved_category(sender, instance, **kwargs):
+    PromotionIndexService.reindex_category_promotions()
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_effective_price(sender, instance, created, update_fields=None, **kwargs):
+    # Après index_product_promotions : l'index d'applicabilité est à jour.
+    # Un changement de catégorie peut changer les promotions applicables
+    if created or instance.has_changed('price', 'category_id', update_fields=update_fields):
+        PricingService.refresh_effective_prices([instance.pk])
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def refresh_promotion_effective_prices(sender, instance, **kwargs):
+    PricingService.schedule_refresh()
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(post_save, sender=PromotionUsage)
+@receiver(post_delete, sender=PromotionUsage)
+def refresh_promotion_timeline(sender, **kwargs):
+    # Fenêtres de validité ou limites d'utilisation modifiées
+    invalidate_promotion_timeline()
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+def refresh_target_effective_prices(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        PricingService.schedule_refresh()
+
+
+@receiver(node_moved, sender=Category)
+def refresh_moved_category_effective_prices(sender, **kwargs):
+    PricingService.schedule_refresh()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def invalidate_tree_snapshot(sender, **kwargs):
+    # Les produits comptent dans les totaux par catégorie de l'instantané
+    invalidate_category_tree()
+
+
+@receiver(post_save, sender=Product)
+def invalidate_tree_snapshot_for_product(sender, instance, created, update_fields=None, **kwargs):
+    # Seules la catégorie et l'activation d'un produit touchent l'instantané
+    if created or instance.has_changed('category_id', 'is_active', update_fields=update_fields):
+        invalidate_category_tree()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def update_suggest_index(sender, instance, **kwargs):
+    mark_products_changed([instance.pk])
+
+
+@receiver(post_save, sender=ProductStatus)
+def update_suggest_index_score(sender, instance, **kwargs):
+    mark_products_changed([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def rebuild_suggest_index(sender, **kwargs):
+    # Les chemins de catégorie font partie des jetons indexés
+    invalidate_suggest_index()
+
+
 
 @receiver(post_save, sender=ProductStatus)
 def update_product_scores(sender, instance, created, **kwargs):
     if not created and not kwargs.get('update_fields'):
-        # Déclenche la tâche Celery asynchrone
-        recalculate_product_scores.delay(instance.id)
+        # Regroupe les demandes : un seul recalcul par lot et par fenêtre
+        ScoreQueueService.enqueue(instance.id)
+
+
+# Étiquettes du cache de réponses invalidées par chaque modèle
+RESPONSE_CACHE_TAGS = {
+    Product: ('products', 'categories'),
+    ProductImage: ('products',),
+    ProductStatus: ('products',),
+    Category: ('categories', 'products'),
+    Promotion: ('promotions', 'products'),
+    SiteSettings: ('settings', 'products'),
+    SocialLink: ('settings',),
+}
+
+
+def invalidate_response_cache(sender, **kwargs):
+    invalidate_tags(*RESPONSE_CACHE_TAGS[sender])
+
+
+for model in RESPONSE_CACHE_TAGS:
+    post_save.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+@receiver(m2m_changed, sender=SiteSettings.social_links.through)
+def invalidate_response_cache_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_tags('promotions', 'products', 'settings')
+
+
+@receiver(m2m_changed, sender=SiteSettings.social_links.through)
+def invalidate_site_settings_links(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        SiteSettings.invalidate_cache()
+
 
+@receiver(post_save, sender=SocialLink)
+@receiver(post_delete, sender=SocialLink)
+def invalidate_site_settings_link_content(sender, **kwargs):
+    SiteSettings.invalidate_cache()
@@ -0,0 +1,190 @@
+"""
+Index de préfixes en mémoire pour l'autocomplétion des produits.
+
+Les jetons normalisés des noms, marques et chemins de catégorie des produits
+actifs sont conservés dans un tableau trié de paires (jeton, produit) : une
+recherche par préfixe est une dichotomie suivie d'un parcours contigu, sans
+accès à la base.
+
+Chaque processus garde son instantané. Les signaux des produits notent les
+identifiants modifiés avec un numéro de version partagé ; un processus en
+retard ne recharge que ces produits. Les changements de catégories (chemins)
+demandent une reconstruction complète.
+"""
+import bisect
+import heapq
+import threading
+
+from django.db import transaction
+
+from .cache_store import get_cache_store
+from .constants import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_PENDING_CHANGES
+from .utils import normalize_search_text
+
+META_KEY = 'suggest:meta'
+CHANGES_KEY = 'suggest:changes'
+
+
+class SuggestEntry:
+    """Produit tel que renvoyé par l'autocomplétion"""
+
+    __slots__ = ('id', 'name', 'slug', 'brand', 'category_path', 'featured_score')
+
+    def __init__(self, id, name, slug, brand, category_path, featured_score):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.brand = brand
+        self.category_path = category_path
+        self.featured_score = featured_score or 0.0
+
+    def tokens(self):
+        return set(normalize_search_text(f"{self.name} {self.brand} {self.category_path}").split())
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug,
+            'brand': self.brand,
+            'category_path': self.category_path,
+        }
+
+
+class SuggestIndex:
+    """Entrées par id et tableau trié des paires (jeton, id)"""
+
+    def __init__(self, entries, version=0, tokens=None):
+        self.version = version
+        self.entries = entries
+        if tokens is None:
+            tokens = sorted(
+                (token, entry.id) for entry in entries.values() for token in entry.tokens()
+            )
+        self.tokens = tokens
+
+    @staticmethod
+    def load_entries(product_ids=None):
+        from .category_tree import get_category_tree
+        from .models import Product
+
+        products = Product.objects.filter(is_active=True)
+        if product_ids is not None:
+            products = products.filter(pk__in=product_ids)
+
+        tree = get_category_tree()
+        entries = {}
+        for row in products.values(
+            'id', 'name', 'slug', 'brand', 'category_id', 'status__featured_score'
+        ).iterator():
+            node = tree.get(row['category_id'])
+            entries[row['id']] = SuggestEntry(
+                row['id'], row['name'], row['slug'], row['brand'],
+                node.full_path if node else '',
+                row['status__featured_score']
+            )
+        return entries
+
+    @classmethod
+    def build(cls, version=0):
+        return cls(cls.load_entries(), version)
+
+    def updated(self, product_ids, version):
+        """Nouvel index où seuls `product_ids` sont rechargés (supprimés s'ils ne sont plus actifs)"""
+        product_ids = set(product_ids)
+        fresh = self.load_entries(product_ids)
+
+        entries = {pk: entry for pk, entry in self.entries.items() if pk not in product_ids}
+        entries.update(fresh)
+
+        tokens = [pair for pair in self.tokens if pair[1] not in product_ids]
+        tokens.extend((token, entry.id) for entry in fresh.values() for token in entry.tokens())
+        tokens.sort()
+        return SuggestIndex(entries, version, tokens)
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self.tokens, (prefix,))
+        while i < len(self.tokens) and self.tokens[i][0].startswith(prefix):
+            ids.add(self.tokens[i][1])
+            i += 1
+        return ids
+
+    def search(self, query, limit=SUGGEST_DEFAULT_LIMIT):
+        """Produits dont chaque terme de `query` préfixe un jeton, par score de mise en avant"""
+        terms = sorted(set(normalize_search_text(query).split()), key=len, reverse=True)
+        if not terms:
+            return []
+
+        candidates = None
+        for term in terms:
+            ids = self._prefix_ids(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        return heapq.nsmallest(
+            limit,
+            (self.entries[pk] for pk in candidates),
+            key=lambda entry: (-entry.featured_score, entry.name)
+        )
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_suggest_index():
+    """Retourne l'index courant, mis à jour si la version partagée a changé"""
+    global _snapshot
+
+    store = get_cache_store()
+    version = store.hget(META_KEY, 'version') or 0
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+
+        rebuild_version = store.hget(META_KEY, 'rebuild') or 0
+        if _snapshot is None or rebuild_version > _snapshot.version:
+            _snapshot = SuggestIndex.build(version)
+        else:
+            changed = [
+                int(pk) for pk, changed_at in store.hgetall(CHANGES_KEY).items()
+                if changed_at > _snapshot.version
+            ]
+            _snapshot = _snapshot.updated(changed, version)
+        return _snapshot
+
+
+def _mark_changed(product_ids):
+    store = get_cache_store()
+    if store.hlen(CHANGES_KEY) + len(product_ids) > SUGGEST_MAX_PENDING_CHANGES:
+        _request_rebuild()
+        return
+    # Produits notés et version avancée d'un seul bloc : un lecteur qui voit
+    # la nouvelle version voit aussi les changements
+    store.hset_version(CHANGES_KEY, product_ids, META_KEY)
+
+
+def _request_rebuild():
+    store = get_cache_store()
+    store.delete(CHANGES_KEY)
+    store.hset_version(META_KEY, ['rebuild'], META_KEY)
+
+
+def mark_products_changed(product_ids):
+    """Signale des produits modifiés (à nouveau après le commit)"""
+    product_ids = list(product_ids)
+    _mark_changed(product_ids)
+    transaction.on_commit(lambda: _mark_changed(product_ids))
+
+
+def invalidate_suggest_index():
+    """Demande une reconstruction complète dans tous les processus"""
+    _request_rebuild()
+    transaction.on_commit(_request_rebuild)
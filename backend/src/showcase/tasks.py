@@ -35,3 +35,103 @@ def recalculate_product_scores(product_status_id):
             ])
     except ProductStatus.DoesNotExist:
         pass
+
+
+@shared_task
+def bulk_recalculate_product_scores():
+    """Recalcule les scores de tout le catalogue en lots"""
+    return ScoringService.bulk_recalculate()
+
+
+@shared_task
+def flush_score_queue():
+    """Recalcule en un lot les statuts accumulés dans la file de scores"""
+    from showcase.services.score_queue_service import ScoreQueueService
+    return ScoreQueueService.flush()
+
+
+@shared_task
+def flush_engagement_counters():
+    """Reporte en base les vues et clics accumulés dans le cache"""
+    from showcase.services.counter_service import EngagementCounterService
+    return EngagementCounterService.flush()
+
+
+@shared_task
+def compact_engagement_buckets():
+    """Regroupe par mois les compteurs d'engagement journaliers anciens"""
+    from showcase.services.engagement_service import EngagementBucketService
+    return EngagementBucketService.compact()
+
+
+@shared_task
+def refresh_product_stats(scope=None):
+    """Recalcule les statistiques produits en cache (tous les périmètres par défaut)"""
+    from showcase.services.stats_service import ProductStatsService
+    scopes = [scope] if scope else ProductStatsService.SCOPES
+    for name in scopes:
+        ProductStatsService.refresh(name)
+    return len(scopes)
+
+
+@shared_task
+def refresh_effective_prices(product_ids=None):
+    """Recalcule les prix après promotions dénormalisés sur les produits"""
+    from showcase.services.pricing_service import PricingService
+    return PricingService.refresh_effective_prices(product_ids)
+
+
+@shared_task
+def swap_promotion_timeline():
+    """Bascule l'ensemble des promotions actives (borne de début ou de fin atteinte)"""
+    from showcase.promotion_timeline import swap_active_set
+    return swap_active_set()
+
+
+@shared_task
+def reconcile_promotion_usage():
+    """Recale les compteurs d'utilisation des promotions sur PromotionUsage"""
+    from showcase.services import PromotionService
+    return PromotionService.reconcile_usage_totals()
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_newsletter_chunk(self, campaign_id, start_pk, end_pk):
+    """Envoie une plage de destinataires d'une campagne (rejouable sans doublon)"""
+    from showcase.models import NewsletterCampaign
+    from showcase.services import NewsletterService
+
+    campaign = NewsletterCampaign.objects.select_related('template').get(pk=campaign_id)
+    if campaign.status != 'sending':
+        return 0
+    try:
+        return NewsletterService.send_chunk(campaign, start_pk, end_pk)
+    except Exception as exc:
+        if self.request.is_eager or self.request.retries >= self.max_retries:
+            # Plus de tentative (ou exécution immédiate, sans nouvelle tentative) : le
+            # chord ne se terminera pas et la campagne resterait en envoi
+            NewsletterService.cancel_campaign(campaign)
+            raise
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def advance_newsletter_campaign(campaign_id, checkpoint_pk, chunk_size=100):
+    """Fenêtre de plages terminée : avance le point de reprise et lance la suivante"""
+    from showcase.models import NewsletterCampaign
+    from showcase.services import NewsletterService
+
+    campaign = NewsletterCampaign.objects.select_related('template').get(pk=campaign_id)
+    return NewsletterService.advance_campaign(campaign, checkpoint_pk, chunk_size)
+
+
+@shared_task
+def send_newsletter_campaign(campaign_id, chunk_size=100, resume=False, retry_failed=False):
+    """Lance l'envoi réparti d'une campagne (ou sa reprise)"""
+    from showcase.models import NewsletterCampaign
+    from showcase.services import NewsletterService
+
+    campaign = NewsletterCampaign.objects.select_related('template').get(pk=campaign_id)
+    return NewsletterService.dispatch_campaign(
+        campaign, chunk_size, resume=resume, retry_failed=retry_failed
+    )
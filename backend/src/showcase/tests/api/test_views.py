@@ -2,6 +2,8 @@
 Tests complets pour les vues API
 """
 from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -12,6 +14,10 @@ from ...models import (
     Category, Product, ProductImage, ProductStatus,
     Service, SiteSettings, NewsletterSubscriber
 )
+from ...services.counter_service import EngagementCounterService
+from ...services.scoring_service import ScoringService
+from ...suggest_index import SuggestIndex, invalidate_suggest_index
+from ...category_tree import get_category_tree
 from ..utils import generate_image_file
 
 
@@ -45,6 +51,23 @@ class CategoryAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsInstance(response.data, list)
 
+    def test_category_tree_counts_in_one_query(self):
+        """Test arborescence avec comptages en une requête"""
+        Category.objects.create(name='Bureautique', parent=self.parent)
+        Product.objects.create(
+            name='Test Laptop',
+            brand='Test',
+            price=Decimal('500000.00'),
+            category=self.child,
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/categories/tree/')
+        root = response.data[0]
+        self.assertEqual(root['product_count'], 1)
+        self.assertEqual(root['direct_product_count'], 0)
+        self.assertEqual(len(root['children']), 2)
+        self.assertEqual(root['children'][1]['product_count'], 1)
+
     def test_category_products_endpoint(self):
         """Test endpoint produits d'une catégorie"""
         Product.objects.create(
@@ -206,6 +229,8 @@ class ProductAPITests(TestCase):
         initial_count = self.status.whatsapp_click_count
         response = self.client.post(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.status.live_whatsapp_click_count, initial_count + 1)
+        EngagementCounterService.flush()
         self.status.refresh_from_db()
         self.assertEqual(self.status.whatsapp_click_count, initial_count + 1)
 
@@ -259,6 +284,13 @@ class SiteSettingsAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsInstance(response.data, (list, dict))
 
+    def test_current_settings(self):
+        """Test paramètres courants servis depuis le cache"""
+        url = '/api/v1/settings/current/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['company_name'], 'NIASOTAC')
+
 
 class NewsletterAPITests(TestCase):
     """Tests API pour la newsletter"""
@@ -345,3 +377,270 @@ class PaginationTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 10)
+
+    def test_count_free_pages(self):
+        """Test pages sans comptage"""
+        response = self.client.get('/api/v1/products/?page=3&page_size=10&count=false')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=2', response.data['previous'])
+
+    def _walk_cursor(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_cursor_pagination_walks_all_products(self):
+        """Test parcours complet par curseur"""
+        ids, pages = self._walk_cursor('/api/v1/products/?pagination=cursor&page_size=10')
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_cursor_pagination_by_price(self):
+        """Test curseur sur le tri par prix avec des prix égaux"""
+        Product.objects.filter(name__in=['Product 3', 'Product 4']).update(price=Decimal('5000.00'))
+        ids, _ = self._walk_cursor('/api/v1/products/?pagination=cursor&ordering=price&page_size=4')
+        self.assertEqual(len(set(ids)), 25)
+        cheapest = set(Product.objects.filter(price=Decimal('5000.00')).values_list('id', flat=True))
+        self.assertEqual(set(ids[:2]), cheapest)
+
+    def test_cursor_pagination_featured(self):
+        """Test curseur sur le score de mise en avant (champ lié)"""
+        products = list(Product.objects.order_by('id')[:3])
+        for score, product in enumerate(products, start=1):
+            ProductStatus.objects.filter(product=product).update(
+                is_featured=True, featured_score=score * 10
+            )
+
+        ids, _ = self._walk_cursor('/api/v1/products/featured/?pagination=cursor&page_size=2')
+        self.assertEqual(ids, [p.id for p in reversed(products)])
+
+    def test_live_counters_read_once_per_page(self):
+        """Test vues non reportées lues en une fois pour toute la page"""
+        EngagementCounterService.reset()
+        self.addCleanup(EngagementCounterService.reset)
+        products = list(Product.objects.order_by('id')[:3])
+        ProductStatus.objects.filter(product__in=products).update(is_featured=True)
+        EngagementCounterService.record_view(products[0].status.pk)
+
+        with mock.patch(
+            'showcase.services.counter_service.EngagementCounterService.get_pending_many',
+            wraps=EngagementCounterService.get_pending_many
+        ) as get_pending_many:
+            response = self.client.get('/api/v1/products/featured/?page_size=10')
+        get_pending_many.assert_called_once()
+        views = {item['id']: item['views_count'] for item in response.data['results']}
+        self.assertEqual(views[products[0].id], 1)
+        self.assertEqual(views[products[1].id], 0)
+
+
+class ProductSuggestAPITests(TestCase):
+    """Tests pour l'autocomplétion des produits"""
+
+    def setUp(self):
+        invalidate_suggest_index()
+        self.client = APIClient()
+        self.url = '/api/v1/products/suggest/'
+        self.parent = Category.objects.create(name='Électroménager')
+        self.category = Category.objects.create(name='Réfrigérateurs', parent=self.parent)
+        self.fridge = Product.objects.create(
+            name='Réfrigérateur Samsung 300L', brand='Samsung',
+            price=Decimal('250000.00'), category=self.category,
+        )
+        self.phone = Product.objects.create(
+            name='Galaxy A54', brand='Samsung',
+            price=Decimal('200000.00'), category=self.parent,
+        )
+        ProductStatus.objects.filter(product=self.phone).update(featured_score=50)
+        ProductStatus.objects.filter(product=self.fridge).update(featured_score=10)
+        invalidate_suggest_index()
+
+    def test_prefix_ranked_by_featured_score(self):
+        """Test préfixe sur la marque, tri par score"""
+        response = self.client.get(self.url + '?q=sams')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [self.phone.id, self.fridge.id])
+
+    def test_accents_and_category_path(self):
+        """Test jetons sans accents, chemin de catégorie inclus"""
+        response = self.client.get(self.url + '?q=REFRIG')
+        self.assertEqual([item['slug'] for item in response.data], [self.fridge.slug])
+        self.assertEqual(response.data[0]['category_path'], 'Électroménager > Réfrigérateurs')
+
+        response = self.client.get(self.url + '?q=electro gal')
+        self.assertEqual([item['id'] for item in response.data], [self.phone.id])
+
+    def test_no_query_per_keystroke(self):
+        """Test suggestions servies sans requête en base"""
+        self.client.get(self.url + '?q=s')
+        with self.assertNumQueries(0):
+            for prefix in ('sa', 'sam', 'sams'):
+                self.client.get(self.url + f'?q={prefix}')
+
+    def test_limit(self):
+        """Test nombre de suggestions limité"""
+        response = self.client.get(self.url + '?q=samsung&limit=1')
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get(self.url + '?q=')
+        self.assertEqual(response.data, [])
+
+    def test_incremental_update(self):
+        """Test produits modifiés rechargés sans reconstruction"""
+        self.client.get(self.url + '?q=s')
+        self.phone.name = 'Smartphone Galaxy A55'
+        self.phone.save()
+        Product.objects.create(
+            name='Climatiseur LG', brand='LG',
+            price=Decimal('300000.00'), category=self.parent,
+        )
+        response = self.client.get(self.url + '?q=a55')
+        self.assertEqual([item['id'] for item in response.data], [self.phone.id])
+        self.assertEqual(len(self.client.get(self.url + '?q=clim').data), 1)
+
+        self.fridge.is_active = False
+        self.fridge.save()
+        self.assertEqual(self.client.get(self.url + '?q=refrig').data, [])
+
+    def test_score_recalculation_without_rebuild(self):
+        """Test recalcul des scores : seuls les produits modifiés sont rechargés"""
+        self.client.get(self.url + '?q=s')
+        ProductStatus.objects.update(featured_score=999)
+        with mock.patch.object(SuggestIndex, 'build', wraps=SuggestIndex.build) as build:
+            self.assertEqual(ScoringService.bulk_recalculate(), 2)
+            response = self.client.get(self.url + '?q=samsung')
+        build.assert_not_called()
+        self.assertEqual(len(response.data), 2)
+
+
+class ProductFacetsAPITests(TestCase):
+    """Tests pour les comptages par facette"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/v1/products/facets/'
+        self.audio = Category.objects.create(name='Audio')
+        self.tv = Category.objects.create(name='TV')
+        for name, brand, price, category, in_stock, compare_at in [
+            ('Casque', 'Sony', '8000', self.audio, True, None),
+            ('Enceinte', 'JBL', '45000', self.audio, False, '55000'),
+            ('Barre de son', 'Sony', '95000', self.audio, True, None),
+            ('Téléviseur', 'Samsung', '350000', self.tv, True, '400000'),
+        ]:
+            Product.objects.create(
+                name=name, brand=brand, price=Decimal(price), category=category,
+                is_in_stock=in_stock, compare_at_price=Decimal(compare_at) if compare_at else None,
+            )
+
+    def test_facet_counts(self):
+        """Test comptages de toutes les facettes"""
+        get_category_tree()
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        data = response.data
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(
+            [(c['slug'], c['count']) for c in data['categories']],
+            [(self.audio.slug, 3), (self.tv.slug, 1)]
+        )
+        self.assertEqual([(b['name'], b['count']) for b in data['brands']][0], ('Sony', 2))
+        self.assertEqual([r['count'] for r in data['price_ranges']], [1, 1, 1, 1])
+        self.assertEqual(data['in_stock'], {'true': 3, 'false': 1})
+        self.assertEqual(data['has_discount'], {'true': 2, 'false': 2})
+
+    def test_facets_apply_filters(self):
+        """Test facettes restreintes par les filtres courants"""
+        response = self.client.get(self.url + f'?category_slug={self.audio.slug}&is_in_stock=true')
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual([b['name'] for b in response.data['brands']], ['Sony'])
+
+    def test_price_bucket_filter(self):
+        """Test filtre par gamme de prix partagée avec l'admin"""
+        response = self.client.get('/api/v1/products/?price_bucket=10k-50k')
+        self.assertEqual([p['name'] for p in response.data['results']], ['Enceinte'])
+
+    def test_cache_key_ignores_non_filter_params(self):
+        """Test paramètres hors filtres sans effet sur la clé de cache"""
+        first = self.client.get(self.url + '?brand=Sony&page=2')
+        second = self.client.get(self.url + '?ordering=price&brand=Sony&page_size=5')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+
+
+class ResponseCacheTests(TestCase):
+    """Tests pour le cache des réponses publiques"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Audio')
+        self.url = '/api/v1/categories/tree/'
+
+    def test_hit_after_miss(self):
+        """Test deuxième requête servie depuis le cache"""
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_query_params_are_normalized(self):
+        """Test ordre des paramètres sans effet sur la clé"""
+        self.client.get(self.url + '?a=1&b=2')
+        response = self.client.get(self.url + '?b=2&a=1')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_etag_not_modified(self):
+        """Test réponse 304 si l'ETag correspond"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for header in (f'"autre", W/{etag}', '*'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Sous-chaîne de l'ETag : pas de correspondance
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"x' + etag.strip('"') + 'x"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_model_change_invalidates(self):
+        """Test invalidation par étiquette après modification d'une catégorie"""
+        self.client.get(self.url)
+        Category.objects.create(name='Vidéo')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 2)
+
+    def test_stale_while_revalidate(self):
+        """Test entrée expirée servie pendant qu'une autre requête la recalcule"""
+        with mock.patch('showcase.response_cache.time.time', return_value=1000.0):
+            self.client.get(self.url)
+
+        with mock.patch('showcase.response_cache.time.time', return_value=1310.0):
+            # Verrou de revalidation déjà pris par une autre requête
+            with mock.patch('showcase.response_cache.cache.add', return_value=False):
+                self.assertEqual(self.client.get(self.url)['X-Cache'], 'STALE')
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_miss_keeps_lock_of_other_request(self):
+        """Test une requête qui n'a pas pris le verrou ne le libère pas"""
+        with mock.patch('showcase.response_cache.cache.delete') as delete:
+            self.client.get(self.url)
+        self.assertFalse(any(call.args[0].endswith(':lock') for call in delete.call_args_list))
+
+    def test_authenticated_bypass(self):
+        """Test requêtes authentifiées jamais mises en cache"""
+        admin = User.objects.create_superuser(username='admin', password='pass123')
+        self.client.force_authenticate(user=admin)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'BYPASS')
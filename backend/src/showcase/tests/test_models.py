@@ -8,7 +8,8 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
 
-from ..models import Category, Product, ProductImage, ProductStatus, Service, SiteSettings
+from ..models import Category, Product, ProductImage, ProductStatus, Service, SiteSettings, SocialLink
+from ..category_tree import get_category_tree
 from .utils import generate_image_file
 
 
@@ -73,6 +74,93 @@ class CategoryModelTests(TestCase):
         path = self.grandchild.get_full_path()
         self.assertEqual(path, 'Ordinateurs > Portables > Gaming')
 
+    def test_with_product_counts(self):
+        """Test comptages annotés identiques aux propriétés"""
+        for name, category in [('A', self.parent), ('B', self.child), ('C', self.grandchild), ('D', self.grandchild)]:
+            Product.objects.create(
+                name=f'Produit {name}',
+                brand='Test',
+                price=Decimal('1000.00'),
+                category=category,
+            )
+
+        with self.assertNumQueries(1):
+            counts = {
+                c.name: (c.product_count, c.direct_product_count)
+                for c in Category.objects.with_product_counts()
+            }
+        self.assertEqual(counts['Ordinateurs'], (4, 1))
+        self.assertEqual(counts['Portables'], (3, 1))
+        self.assertEqual(counts['Gaming'], (2, 2))
+        parent = Category.objects.get(pk=self.parent.pk)
+        self.assertEqual(parent.product_count, 4)
+
+
+class CategoryTreeSnapshotTests(TestCase):
+    """Tests pour l'instantané en mémoire de l'arbre des catégories"""
+
+    def setUp(self):
+        self.parent = Category.objects.create(name='Ordinateurs')
+        self.child = Category.objects.create(name='Portables', parent=self.parent)
+        Product.objects.create(
+            name='Laptop',
+            brand='Test',
+            price=Decimal('1000.00'),
+            category=self.child,
+        )
+
+    def test_snapshot_content(self):
+        """Test chemins, ancêtres et comptages de l'instantané"""
+        tree = get_category_tree()
+        node = tree.get(self.child.pk)
+        self.assertEqual(node.full_path, 'Ordinateurs > Portables')
+        self.assertEqual([n.name for n in node.get_breadcrumb()], ['Ordinateurs', 'Portables'])
+        self.assertEqual(tree.get(self.parent.pk).product_count, 1)
+        self.assertEqual(tree.get(self.parent.pk).direct_product_count, 0)
+        self.assertEqual([n.pk for n in tree.get_root_nodes()], [self.parent.pk])
+
+    def test_snapshot_reused_until_invalidated(self):
+        """Test réutilisation sans requête puis reconstruction après modification"""
+        tree = get_category_tree()
+        with self.assertNumQueries(0):
+            self.assertIs(get_category_tree(), tree)
+
+        self.child.name = 'Ultraportables'
+        self.child.save()
+        self.assertEqual(
+            get_category_tree().get(self.child.pk).full_path,
+            'Ordinateurs > Ultraportables'
+        )
+
+    def test_product_edit_keeps_snapshot(self):
+        """Test instantané conservé sauf changement de catégorie ou d'activation"""
+        product = Product.objects.get(name='Laptop')
+        tree = get_category_tree()
+        product.price = Decimal('900.00')
+        with self.assertNumQueries(0):
+            self.assertFalse(product.has_changed('category_id', 'is_active'))
+        product.save()
+        self.assertIs(get_category_tree(), tree)
+
+        product.category = self.parent
+        product.save()
+        tree = get_category_tree()
+        self.assertEqual(tree.get(self.parent.pk).direct_product_count, 1)
+
+        product.is_active = False
+        product.save(update_fields=['is_active'])
+        self.assertIsNot(get_category_tree(), tree)
+
+        Product.objects.filter(pk=product.pk).update(is_active=True)
+        product.refresh_from_db()
+        self.assertFalse(product.has_changed('category_id', 'is_active'))
+
+    def test_rebuild_invalidates_snapshot(self):
+        """Test reconstruction MPTT via le gestionnaire par défaut"""
+        tree = get_category_tree()
+        Category.objects.rebuild()
+        self.assertIsNot(get_category_tree(), tree)
+
 
 class ProductModelTests(TestCase):
     """Tests pour le modèle Product"""
@@ -254,6 +342,47 @@ class ProductImageModelTests(TestCase):
         self.assertFalse(img1.is_primary)
         self.assertTrue(img2.is_primary)
 
+    def test_main_image_from_prefetch(self):
+        """Test résolution de l'image principale sans requête après préchargement"""
+        ProductImage.objects.create(product=self.product, image=generate_image_file('img1.jpg'))
+        primary = ProductImage.objects.create(
+            product=self.product,
+            image=generate_image_file('img2.jpg'),
+            is_primary=True
+        )
+
+        for queryset in (
+            Product.objects.prefetch_related('images'),
+            Product.objects.with_primary_image(),
+        ):
+            product = queryset.get(pk=self.product.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(product.get_main_image(), primary)
+                self.assertEqual(product.get_main_image_url(), primary.image.url)
+
+    def test_main_image_fallback_consistent(self):
+        """Test sans image principale : première image quel que soit le chemin"""
+        first = ProductImage.objects.create(
+            product=self.product, image=generate_image_file('img1.jpg'), order=0
+        )
+        ProductImage.objects.create(product=self.product, image=generate_image_file('img2.jpg'), order=1)
+        ProductImage.objects.filter(product=self.product).update(is_primary=False)
+
+        for queryset in (
+            Product.objects.all(),
+            Product.objects.prefetch_related('images'),
+            Product.objects.with_primary_image(),
+        ):
+            self.assertEqual(queryset.get(pk=self.product.pk).get_main_image(), first)
+
+    def test_main_image_without_prefetch(self):
+        """Test une seule requête sans préchargement, puis résultat mémorisé"""
+        img = ProductImage.objects.create(product=self.product, image=generate_image_file())
+        product = Product.objects.get(pk=self.product.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(product.get_main_image(), img)
+            product.get_main_image_url()
+
 
 class ServiceModelTests(TestCase):
     """Tests pour le modèle Service"""
@@ -295,3 +424,24 @@ class SiteSettingsModelTests(TestCase):
         settings.save()
         settings.refresh_from_db()
         self.assertEqual(settings.company_name, 'NIASOTAC')
+
+    def test_get_settings_cached(self):
+        """Test lecture en cache sans requête puis invalidation à la sauvegarde"""
+        SiteSettings.load()
+        SiteSettings.get_settings()
+        with self.assertNumQueries(0):
+            cached = SiteSettings.get_settings()
+            list(cached.social_links.all())
+
+        settings = SiteSettings.load()
+        settings.company_name = 'NIASOTAC'
+        settings.save()
+        self.assertEqual(SiteSettings.get_settings().company_name, 'NIASOTAC')
+
+    def test_get_settings_social_links_invalidation(self):
+        """Test invalidation après ajout d'un lien social"""
+        settings = SiteSettings.load()
+        self.assertEqual(list(SiteSettings.get_settings().social_links.all()), [])
+        link = SocialLink.objects.create(name='Facebook', url='https://facebook.com/niasotac')
+        settings.social_links.add(link)
+        self.assertEqual(list(SiteSettings.get_settings().social_links.all()), [link])
@@ -1,14 +1,41 @@
 """
 Tests pour les services métier
 """
+import time
 from decimal import Decimal
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
+from unittest import mock
+from celery.exceptions import Retry
 
-from ..models import Category, Product, ProductStatus, Promotion
+from ..admin.actions import PromotionActions
+from ..models import (
+    Category, Product, ProductStatus, Promotion, PromotionUsage, ProductEngagementBucket, SiteSettings,
+    NewsletterSubscriber, NewsletterTemplate, NewsletterCampaign, NewsletterLog, NewsletterCampaignStats
+)
 from ..services.scoring_service import ScoringService
 from ..services.promotion_service import PromotionService
+from ..services.pricing_service import PricingService
+from ..services.promotion_index_service import PromotionIndexService
+from ..services.score_queue_service import ScoreQueueService
+from ..services.counter_service import EngagementCounterService
+from ..services.engagement_service import EngagementBucketService
+from ..services.whatsapp_service import WhatsAppService
+from ..services.search_service import ProductSearchService
+from ..services.stats_service import ProductStatsService
+from ..services.newsletter_service import NewsletterService
+from ..constants import STATS_CACHE_TIMEOUT
+from ..cache_store import get_cache_store
+from ..category_tree import get_category_tree
+from ..mail_pool import MailConnectionPool
+from ..tasks import send_newsletter_chunk
+from ..promotion_timeline import (
+    get_active_promotion_ids, get_active_promotions, get_promotion_timeline, swap_active_set
+)
 
 
 class ScoringServiceTests(TestCase):
@@ -88,10 +115,419 @@ class ScoringServiceTests(TestCase):
         self.assertGreater(in_stock_score, out_of_stock_score)
 
 
+class BulkScoringTests(TestCase):
+    """Tests pour le recalcul des scores par lot"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio')
+        self.products = []
+        for i, (price, views) in enumerate([(50000, 0), (100000, 40), (150000, 120)]):
+            product = Product.objects.create(
+                name=f'Produit {i}',
+                brand='Test',
+                price=Decimal(price),
+                characteristics='Test description',
+                category=self.category,
+                is_in_stock=True,
+            )
+            ProductStatus.objects.filter(product=product).update(
+                view_count=views,
+                last_viewed_at=timezone.now() - timedelta(days=i * 10)
+            )
+            self.products.append(product)
+
+    def test_bulk_matches_per_product_scores(self):
+        """Le calcul par lot produit les mêmes scores que le calcul unitaire"""
+        expected = {}
+        for status in ProductStatus.objects.select_related('product'):
+            expected[status.pk] = (
+                float(ScoringService.calculate_featured_score(status)[1]),
+                float(ScoringService.calculate_recommendation_score(status)[1]),
+            )
+
+        ScoringService.bulk_recalculate(batch_size=2)
+
+        for status in ProductStatus.objects.all():
+            self.assertEqual(
+                (status.featured_score, status.recommendation_score),
+                expected[status.pk]
+            )
+
+    def test_bulk_query_count_is_constant(self):
+        """Le nombre de requêtes ne dépend pas du nombre de produits"""
+        ScoringService.bulk_recalculate()
+        ProductStatus.objects.update(featured_score=0, recommendation_score=0)
+        # 3 requêtes de contexte + 1 lot + 1 lot vide + 1 écriture
+        with self.assertNumQueries(6):
+            updated = ScoringService.bulk_recalculate()
+        self.assertEqual(updated, len(self.products))
+
+    def test_bulk_skips_unchanged_rows(self):
+        """Les statuts inchangés ne sont pas réécrits"""
+        ScoringService.bulk_recalculate()
+        self.assertEqual(ScoringService.bulk_recalculate(), 0)
+
+
+class ScoreQueueServiceTests(TestCase):
+    """Tests pour la file de recalcul des scores"""
+
+    def setUp(self):
+        ScoreQueueService.reset()
+        self.category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            name='Test Product',
+            brand='Test',
+            price=Decimal('100000.00'),
+            characteristics='Test description',
+            category=self.category,
+        )
+        self.status = self.product.status
+
+    def tearDown(self):
+        ScoreQueueService.reset()
+
+    @mock.patch('showcase.tasks.flush_score_queue.apply_async')
+    def test_enqueue_deduplicates_and_schedules_once(self, apply_async):
+        """Les demandes répétées sont regroupées en une seule tâche"""
+        for _ in range(5):
+            ScoreQueueService.enqueue(self.status.pk)
+
+        apply_async.assert_called_once()
+        metrics = ScoreQueueService.get_metrics()
+        self.assertEqual(metrics['depth'], 1)
+        self.assertEqual(metrics['enqueued'], 5)
+        self.assertEqual(metrics['deduplicated'], 4)
+        self.assertEqual(metrics['dedup_ratio'], 0.8)
+
+    @mock.patch('showcase.tasks.flush_score_queue.apply_async')
+    def test_flush_rescores_pending_statuses(self, apply_async):
+        """Le vidage recalcule les statuts et libère la fenêtre"""
+        ProductStatus.objects.filter(pk=self.status.pk).update(featured_score=0)
+        ScoreQueueService.enqueue(self.status.pk)
+
+        self.assertEqual(ScoreQueueService.flush(), 1)
+        self.status.refresh_from_db()
+        self.assertGreater(self.status.featured_score, 0)
+        self.assertEqual(ScoreQueueService.get_metrics()['depth'], 0)
+
+        ScoreQueueService.enqueue(self.status.pk)
+        self.assertEqual(apply_async.call_count, 2)
+
+    @mock.patch('showcase.tasks.flush_score_queue.apply_async')
+    def test_status_save_enqueues(self, apply_async):
+        """Une sauvegarde complète du statut passe par la file"""
+        self.status.save()
+        self.status.save()
+        self.assertEqual(ScoreQueueService.get_metrics()['depth'], 1)
+
+
+class EngagementCounterServiceTests(TestCase):
+    """Tests pour les compteurs de vues et clics en écriture différée"""
+
+    def setUp(self):
+        EngagementCounterService.reset()
+        self.category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            name='Test Product',
+            brand='Test',
+            price=Decimal('100000.00'),
+            characteristics='Test description',
+            category=self.category,
+        )
+        self.status = self.product.status
+
+    def tearDown(self):
+        EngagementCounterService.reset()
+
+    def test_increments_are_buffered(self):
+        """Les incréments ne touchent pas la base mais sont visibles en lecture"""
+        with self.assertNumQueries(0):
+            EngagementCounterService.record_view(self.status.pk)
+            EngagementCounterService.record_view(self.status.pk)
+            EngagementCounterService.record_click(self.status.pk)
+
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.view_count, 0)
+        self.assertEqual(self.status.live_view_count, 2)
+        self.assertEqual(self.status.live_whatsapp_click_count, 1)
+        self.assertIsNotNone(self.status.live_last_viewed_at)
+
+    def test_pending_many_in_one_read(self):
+        """Deltas de plusieurs statuts lus en une fois"""
+        other = Product.objects.create(
+            name='Autre', brand='Test', price=Decimal('1000.00'), category=self.category
+        ).status
+        EngagementCounterService.record_view(self.status.pk)
+        EngagementCounterService.record_click(other.pk)
+
+        with mock.patch.object(
+            type(get_cache_store()), 'hmget_multi', wraps=get_cache_store().hmget_multi
+        ) as hmget_multi:
+            pending = EngagementCounterService.get_pending_many([self.status.pk, other.pk])
+        hmget_multi.assert_called_once()
+        self.assertEqual(pending[self.status.pk][:2], (1, 0))
+        self.assertIsNotNone(pending[self.status.pk][2])
+        self.assertEqual(pending[other.pk], (0, 1, None))
+
+    def test_flush_writes_deltas(self):
+        """Le report cumule les deltas aux valeurs en base"""
+        ProductStatus.objects.filter(pk=self.status.pk).update(view_count=10)
+        EngagementCounterService.record_view(self.status.pk)
+        EngagementCounterService.record_click(self.status.pk)
+
+        self.assertEqual(EngagementCounterService.flush(), 1)
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.view_count, 11)
+        self.assertEqual(self.status.whatsapp_click_count, 1)
+        self.assertIsNotNone(self.status.last_viewed_at)
+        self.assertEqual(self.status.live_view_count, 11)
+        self.assertEqual(EngagementCounterService.flush(), 0)
+
+    def test_click_flush_keeps_last_view(self):
+        """Un report sans nouvelle vue conserve la date de dernière vue"""
+        viewed_at = timezone.now() - timedelta(days=3)
+        ProductStatus.objects.filter(pk=self.status.pk).update(last_viewed_at=viewed_at)
+        EngagementCounterService.record_click(self.status.pk)
+        EngagementCounterService.flush()
+
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.last_viewed_at, viewed_at)
+
+
+    def test_redis_script_registered_once(self):
+        """Le script Lua n'est enregistré qu'une fois par connexion Redis"""
+        connection = mock.MagicMock()
+        connection.register_script.return_value.return_value = 1
+        with override_settings(CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache'}}), \
+                mock.patch('django_redis.get_redis_connection', return_value=connection):
+            for _ in range(2):
+                get_cache_store().hset_version('changes', [1], 'meta')
+        connection.register_script.assert_called_once()
+
+class EngagementBucketServiceTests(TestCase):
+    """Tests pour l'historique d'engagement par jour"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            name='Test Product',
+            brand='Test',
+            price=Decimal('100000.00'),
+            characteristics='Test description',
+            category=self.category,
+        )
+        self.today = timezone.localdate()
+
+    def test_record_accumulates_daily_bucket(self):
+        """Les événements d'un même jour s'ajoutent au même compteur"""
+        EngagementBucketService.record({(self.product.pk, 'view'): 3})
+        EngagementBucketService.record({(self.product.pk, 'view'): 2})
+        bucket = ProductEngagementBucket.objects.get(product=self.product, event_type='view')
+        self.assertEqual(bucket.count, 5)
+
+    def test_window_totals(self):
+        """Seuls les jours de la fenêtre sont comptés"""
+        EngagementBucketService.record({(self.product.pk, 'view'): 4}, day=self.today)
+        EngagementBucketService.record(
+            {(self.product.pk, 'view'): 10}, day=self.today - timedelta(days=45)
+        )
+        with self.assertNumQueries(1):
+            totals = EngagementBucketService.get_window_totals([self.product.pk], days=30)
+        self.assertEqual(totals, {self.product.pk: 4})
+        self.assertEqual(self.product.status.get_views_last_n_days(60), 14)
+
+    def test_compact_rolls_old_days_into_months(self):
+        """Les jours anciens sont regroupés par mois sans perte"""
+        old_day = self.today - timedelta(days=200)
+        EngagementBucketService.record({(self.product.pk, 'view'): 2}, day=old_day)
+        EngagementBucketService.record(
+            {(self.product.pk, 'view'): 3}, day=old_day.replace(day=1)
+        )
+        EngagementBucketService.record({(self.product.pk, 'view'): 1})
+
+        self.assertEqual(EngagementBucketService.compact(), 2 if old_day.day != 1 else 1)
+        month = ProductEngagementBucket.objects.get(period='month')
+        self.assertEqual(month.bucket_date, old_day.replace(day=1))
+        self.assertEqual(month.count, 5)
+        self.assertEqual(ProductEngagementBucket.objects.filter(period='day').count(), 1)
+
+    def test_counter_flush_feeds_buckets(self):
+        """Le report des compteurs alimente l'historique du jour"""
+        EngagementCounterService.reset()
+        EngagementCounterService.record_view(self.product.status.pk)
+        EngagementCounterService.flush()
+        self.assertEqual(self.product.status.get_views_last_n_days(30), 1)
+
+
+class WhatsAppServiceTests(TestCase):
+    """Tests pour les liens WhatsApp précalculés"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio')
+        self.product = Product.objects.create(
+            name='Casque',
+            brand='Sony',
+            price=Decimal('100000.00'),
+            characteristics='Test description',
+            category=self.category,
+        )
+
+    def test_variants_cached(self):
+        """Les deux variantes sont construites une fois puis lues dans le cache"""
+        variants = WhatsAppService.get_variants_many([self.product])[self.product.pk]
+        self.assertEqual(set(variants), {'Bonjour', 'Bonsoir'})
+        self.assertIn('Bonsoir', variants['Bonsoir'])
+
+        with mock.patch.object(WhatsAppService, 'build_variants') as build_variants:
+            again = WhatsAppService.get_variants_many([self.product])[self.product.pk]
+        build_variants.assert_not_called()
+        self.assertEqual(again, variants)
+        self.assertIn(self.product.get_whatsapp_link(), variants.values())
+
+    def test_regenerated_on_product_or_settings_change(self):
+        """Un changement de prix ou de paramètres produit un nouveau lien"""
+        before = WhatsAppService.get_variants_many([self.product])[self.product.pk]
+
+        self.product.price = Decimal('90000.00')
+        self.product.save()
+        after_price = WhatsAppService.get_variants_many([self.product])[self.product.pk]
+        self.assertNotEqual(before, after_price)
+
+        settings = SiteSettings.load()
+        settings.whatsapp_number = '22900000000'
+        settings.save()
+        after_settings = WhatsAppService.get_variants_many([self.product])[self.product.pk]
+        self.assertTrue(after_settings['Bonjour'].startswith('https://wa.me/22900000000'))
+
+
+class ProductSearchServiceTests(TestCase):
+    """Tests pour la recherche plein texte"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Informatique')
+        self.screen = Product.objects.create(
+            name='Écran Dell 24 pouces',
+            brand='Dell',
+            price=Decimal('90000.00'),
+            characteristics='Dalle IPS, résolution Full HD',
+            category=self.category,
+        )
+        self.laptop = Product.objects.create(
+            name='Ordinateur portable',
+            brand='Lenovo',
+            price=Decimal('350000.00'),
+            characteristics='Écran 14 pouces',
+            category=self.category,
+        )
+
+    def _search(self, query):
+        return list(ProductSearchService.search(Product.objects.all(), query).order_by('-search_rank'))
+
+    def test_accent_folding(self):
+        """Test recherche insensible aux accents"""
+        self.assertEqual(self._search('ecran')[0], self.screen)
+        self.assertIn(self.screen, self._search('RÉSOLUTION'))
+
+    def test_prefix_and_all_terms(self):
+        """Test recherche par préfixe, tous les termes requis"""
+        self.assertEqual(self._search('ordi port'), [self.laptop])
+        self.assertEqual(self._search('dell ordi'), [])
+
+    def test_name_ranks_above_body(self):
+        """Test correspondance sur le nom mieux classée"""
+        results = self._search('ecran')
+        self.assertEqual(results, [self.screen, self.laptop])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_sku_search(self):
+        """Test recherche par SKU"""
+        self.assertEqual(self._search(self.laptop.sku), [self.laptop])
+
+    def test_index_follows_updates(self):
+        """Test document mis à jour à la sauvegarde"""
+        self.laptop.name = 'Station de travail'
+        self.laptop.save()
+        self.assertEqual(self._search('station'), [self.laptop])
+        self.assertEqual(self._search('ordinateur'), [])
+
+    def test_rebuild_after_bulk_update(self):
+        """Test reconstruction après une mise à jour en masse"""
+        Product.objects.filter(pk=self.screen.pk).update(name='Moniteur Dell')
+        self.assertEqual(self._search('moniteur'), [])
+        self.assertEqual(ProductSearchService.rebuild(), 2)
+        self.assertEqual(self._search('moniteur'), [self.screen])
+
+    def test_fallback_without_full_text_index(self):
+        """Test recherche sans index plein texte (autres bases)"""
+        with mock.patch.object(ProductSearchService, 'backend', return_value='basic'):
+            self.assertEqual(self._search('ecran'), [self.screen, self.laptop])
+            self.assertEqual(self._search('ordi port'), [self.laptop])
+
+    def test_punctuation_only_query(self):
+        """Test requête sans terme exploitable"""
+        self.assertEqual(self._search('--'), [])
+
+
+class ProductStatsServiceTests(TestCase):
+    """Tests pour les statistiques produits"""
+
+    def setUp(self):
+        cache.clear()
+        self.audio = Category.objects.create(name='Audio')
+        self.tv = Category.objects.create(name='TV')
+        Product.objects.create(
+            name='Casque', brand='Sony', price=Decimal('10000.00'), category=self.audio,
+            compare_at_price=Decimal('12000.00'),
+        )
+        Product.objects.create(
+            name='Enceinte', brand='Sony', price=Decimal('30000.00'), category=self.audio,
+            is_in_stock=False,
+        )
+        Product.objects.create(
+            name='Téléviseur', brand='LG', price=Decimal('200000.00'), category=self.tv,
+            is_active=False,
+        )
+
+    def test_compute_in_three_queries(self):
+        """Test totaux et répartitions en trois requêtes"""
+        get_category_tree()
+        with self.assertNumQueries(3):
+            stats = ProductStatsService.compute('public')
+        self.assertEqual(stats['total_products'], 2)
+        self.assertEqual(stats['on_sale_products'], 1)
+        self.assertEqual(stats['in_stock_products'], 1)
+        self.assertEqual(stats['average_price'], 20000.0)
+        self.assertEqual(stats['by_category'][0]['slug'], self.audio.slug)
+        self.assertEqual(stats['by_category'][0]['count'], 2)
+        self.assertEqual(stats['by_brand'], [{
+            'name': 'Sony', 'count': 2, 'in_stock': 1, 'on_sale': 1, 'featured': 0,
+            'average_price': 20000.0,
+        }])
+
+    def test_scope_all_includes_inactive(self):
+        """Test périmètre complet pour les administrateurs"""
+        self.assertEqual(ProductStatsService.compute('all')['total_products'], 3)
+
+    def test_cached_then_refreshed_in_background(self):
+        """Test valeur en cache puis recalcul en tâche de fond une fois périmée"""
+        ProductStatsService.get('public')
+        with self.assertNumQueries(0):
+            ProductStatsService.get('public')
+
+        later = time.time() + STATS_CACHE_TIMEOUT + 1
+        with mock.patch('showcase.services.stats_service.time.time', return_value=later), \
+                mock.patch('showcase.tasks.refresh_product_stats.delay') as delay:
+            ProductStatsService.get('public')
+            ProductStatsService.get('public')
+        delay.assert_called_once_with('public')
+
+
 class PromotionServiceTests(TestCase):
     """Tests pour le service de promotions"""
 
     def setUp(self):
+        # Le calendrier des promotions en cache survit au rollback du test
+        self.addCleanup(cache.clear)
         self.category = Category.objects.create(name='Test')
         self.product = Product.objects.create(
             name='Test Product',
@@ -116,3 +552,528 @@ class PromotionServiceTests(TestCase):
         """Test meilleure promo sans promotions"""
         best = PromotionService.get_best_promotion(self.product)
         self.assertIsNone(best)
+
+    def test_redeem_enforces_global_limit(self):
+        """Test limite globale appliquée par le compteur"""
+        promo = Promotion.objects.create(name='Limitée', value=Decimal('10'), usage_limit=3)
+        self.assertTrue(PromotionService.redeem_promotion(promo, increment=2))
+        self.assertFalse(PromotionService.redeem_promotion(promo, increment=2))
+        self.assertTrue(PromotionService.redeem_promotion(promo))
+        self.assertFalse(PromotionService.redeem_promotion(promo))
+        promo.refresh_from_db()
+        self.assertEqual(promo.usage_total, 3)
+        self.assertEqual(promo.usage_count(), 3)
+
+    def test_redeem_enforces_per_user_limit(self):
+        """Test limite par utilisateur sans consommer la limite globale"""
+        user = User.objects.create_user('client', password='secret')
+        promo = Promotion.objects.create(name='Par client', value=Decimal('10'), per_user_limit=1)
+        self.assertTrue(PromotionService.redeem_promotion(promo, user=user))
+        self.assertFalse(PromotionService.redeem_promotion(promo, user=user))
+        promo.refresh_from_db()
+        self.assertEqual(promo.usage_total, 1)
+        self.assertEqual(PromotionUsage.objects.get(promotion=promo, user=user).count, 1)
+
+    def test_save_keeps_usage_total(self):
+        """Test une instance périmée n'écrase pas le compteur"""
+        promo = Promotion.objects.create(name='Admin', value=Decimal('10'))
+        stale = Promotion.objects.get(pk=promo.pk)
+        PromotionService.redeem_promotion(promo)
+        stale.name = 'Admin modifiée'
+        stale.save()
+        promo.refresh_from_db()
+        self.assertEqual(promo.usage_total, 1)
+
+    def test_reconcile_usage_totals(self):
+        """Test compteur recalé sur les utilisations"""
+        promo = Promotion.objects.create(name='Recalée', value=Decimal('10'))
+        PromotionService.redeem_promotion(promo, increment=4)
+        PromotionUsage.objects.filter(promotion=promo).update(count=2)
+        self.assertEqual(PromotionService.reconcile_usage_totals(), 1)
+        promo.refresh_from_db()
+        self.assertEqual(promo.usage_total, 2)
+        self.assertEqual(PromotionService.reconcile_usage_totals(), 0)
+
+
+class PricingServiceTests(TestCase):
+    """Tests pour le moteur de prix par lot"""
+
+    def setUp(self):
+        # Le calendrier des promotions en cache survit au rollback du test
+        self.addCleanup(cache.clear)
+        self.parent = Category.objects.create(name='Informatique')
+        self.child = Category.objects.create(name='Portables', parent=self.parent)
+        self.other = Category.objects.create(name='Audio')
+        self.products = [
+            Product.objects.create(
+                name=f'Produit {i}',
+                brand='Test',
+                price=Decimal('10000.00') * (i + 1),
+                category=self.child if i % 2 else self.other,
+            )
+            for i in range(6)
+        ]
+        # Recharger les catégories : les arbres MPTT ont été renumérotés
+        self.products = list(Product.objects.select_related('category').order_by('price'))
+        Promotion.objects.create(
+            name='Tout -10%', promotion_type='percent', value=Decimal('10'),
+            applies_to_all=True, is_stackable=True,
+        )
+        category_promo = Promotion.objects.create(
+            name='Informatique -5000', promotion_type='amount', value=Decimal('5000'),
+        )
+        category_promo.categories.add(self.parent)
+        product_promo = Promotion.objects.create(
+            name='Prix fixé', promotion_type='set_price', value=Decimal('1000'),
+        )
+        product_promo.products.add(self.products[0])
+        Promotion.objects.create(
+            name='Expirée', promotion_type='percent', value=Decimal('90'),
+            applies_to_all=True, end_at=timezone.now() - timedelta(days=1),
+        )
+
+    def test_batch_prices_match_single_product_prices(self):
+        """Les prix par lot sont identiques au calcul produit par produit"""
+        prices = PricingService.get_final_prices(self.products)
+        for product in self.products:
+            _, expected = PromotionService.calculate_price_with_promotions(product)
+            self.assertEqual(prices[product.pk], expected)
+
+    def test_category_promotion_applies_to_descendants(self):
+        """Une promotion de catégorie s'applique aux sous-catégories"""
+        prices = PricingService.get_final_prices(self.products)
+        laptop = self.products[1]
+        self.assertEqual(prices[laptop.pk], laptop.price - Decimal('5000'))
+
+    def test_fixed_number_of_queries(self):
+        """Le nombre de requêtes ne dépend pas de la taille de la page"""
+        products = list(Product.objects.select_related('category'))
+        with self.assertNumQueries(2):
+            PricingService.get_final_prices(products)
+
+    def test_no_active_promotions_single_query(self):
+        """Sans promotion active, une seule requête est exécutée"""
+        Promotion.objects.update(active=False)
+        with self.assertNumQueries(1):
+            prices = PricingService.get_final_prices(self.products)
+        self.assertEqual(prices[self.products[0].pk], self.products[0].price)
+
+    def test_refresh_effective_prices(self):
+        """Les prix dénormalisés correspondent au calcul par lot"""
+        PricingService.refresh_effective_prices()
+        prices = PricingService.get_final_prices(self.products)
+        stored = dict(Product.objects.values_list('pk', 'effective_price'))
+        self.assertEqual(stored, prices)
+
+        cheapest = Product.objects.order_by('effective_price').first()
+        self.assertEqual(cheapest, self.products[0])
+        self.assertEqual(cheapest.best_promotion.name, 'Prix fixé')
+        self.assertEqual(PricingService.refresh_effective_prices(), 0)
+
+    def test_promotion_change_refreshes_after_commit(self):
+        """Une promotion modifiée recalcule les prix après le commit"""
+        PricingService.refresh_effective_prices()
+        with self.captureOnCommitCallbacks(execute=True):
+            Promotion.objects.filter(name='Tout -10%').get().delete()
+        product = Product.objects.get(pk=self.products[2].pk)
+        self.assertEqual(product.effective_price, product.price)
+        self.assertIsNone(product.best_promotion)
+
+    def test_product_save_updates_effective_price(self):
+        """La sauvegarde d'un produit recalcule son prix après promotions"""
+        product = self.products[2]
+        product.price = Decimal('50000.00')
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.effective_price, Decimal('45000.00'))
+
+
+    def test_refresh_only_when_price_changes(self):
+        """Seuls la création ou un changement de prix recalculent le prix effectif"""
+        product = Product.objects.get(pk=self.products[2].pk)
+        with mock.patch.object(PricingService, 'refresh_effective_prices') as refresh:
+            product.name = 'Produit renommé'
+            product.save()
+            refresh.assert_not_called()
+            product.price = Decimal('50000.00')
+            product.save()
+        refresh.assert_called_once_with([product.pk])
+
+    def test_single_batch_without_trailing_query(self):
+        """Un lot incomplet termine le parcours sans requête vide"""
+        PricingService.refresh_effective_prices()
+        get_active_promotions()
+        # Produits du lot, puis index d'applicabilité
+        with self.assertNumQueries(2):
+            self.assertEqual(PricingService.refresh_effective_prices([self.products[0].pk]), 0)
+
+class PromotionTimelineTests(TestCase):
+    """Tests pour le calendrier des promotions actives"""
+
+    def setUp(self):
+        # Le calendrier des promotions en cache survit au rollback du test
+        self.addCleanup(cache.clear)
+        cache.clear()
+        now = timezone.now()
+        self.current = Promotion.objects.create(
+            name='En cours', promotion_type='percent', value=Decimal('10'),
+            applies_to_all=True, end_at=now + timedelta(days=2),
+        )
+        self.upcoming = Promotion.objects.create(
+            name='À venir', promotion_type='percent', value=Decimal('20'),
+            applies_to_all=True, start_at=now + timedelta(days=1),
+        )
+        self.open_ended = Promotion.objects.create(
+            name='Permanente', promotion_type='amount', value=Decimal('500'),
+        )
+        Promotion.objects.create(
+            name='Désactivée', promotion_type='percent', value=Decimal('50'), active=False,
+        )
+
+    def test_active_set_and_next_change(self):
+        """Test ensemble actif et prochain basculement"""
+        timeline = get_promotion_timeline()
+        self.assertEqual(timeline.ids, {self.current.pk, self.open_ended.pk})
+        self.assertEqual(timeline.next_change, self.upcoming.start_at)
+
+    def test_hot_path_without_queries(self):
+        """Test lecture de l'ensemble actif sans requête"""
+        get_active_promotions()
+        with self.assertNumQueries(0):
+            promotions = PricingService.get_active_promotions()
+        self.assertEqual([p.pk for p in promotions], [self.current.pk, self.open_ended.pk])
+        with self.assertNumQueries(1):
+            active = set(Promotion.objects.active().values_list('pk', flat=True))
+        self.assertEqual(active, {self.current.pk, self.open_ended.pk})
+
+    def test_rebuilt_once_boundary_is_passed(self):
+        """Test ensemble recalculé si la borne est dépassée (tâche en retard)"""
+        get_promotion_timeline()
+        later = self.upcoming.start_at + timedelta(minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertIn(self.upcoming.pk, get_active_promotion_ids())
+
+    def test_usage_limit_reached_leaves_active_set(self):
+        """Test promotion épuisée retirée de l'ensemble actif"""
+        self.open_ended.usage_limit = 1
+        self.open_ended.save()
+        get_promotion_timeline()
+        PromotionService.redeem_promotion(self.open_ended)
+        self.assertNotIn(self.open_ended.pk, get_active_promotion_ids())
+
+    def test_admin_action_refreshes_active_set_and_prices(self):
+        """Test désactivation depuis l'admin : ensemble actif et prix effectifs à jour"""
+        category = Category.objects.create(name='Audio')
+        product = Product.objects.create(
+            name='Casque', brand='Test', price=Decimal('1000.00'), category=category,
+        )
+        get_promotion_timeline()
+
+        with mock.patch('showcase.admin.actions.messages'), \
+                self.captureOnCommitCallbacks(execute=True):
+            PromotionActions.deactivate_promotions(None, None, Promotion.objects.all())
+
+        self.assertEqual(get_active_promotion_ids(), set())
+        product.refresh_from_db()
+        self.assertEqual(product.effective_price, Decimal('1000.00'))
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    def test_swap_schedules_next_boundary(self):
+        """Test basculement publié une fois et prochain basculement programmé"""
+        with mock.patch('showcase.tasks.swap_promotion_timeline.apply_async') as apply_async, \
+                mock.patch('showcase.tasks.refresh_effective_prices.delay') as refresh:
+            self.assertTrue(swap_active_set())
+            self.assertFalse(swap_active_set())
+        # Une seule tâche programmée pour une même borne
+        apply_async.assert_called_once_with(eta=self.upcoming.start_at)
+        refresh.assert_called_once_with()
+
+
+class PromotionIndexServiceTests(TestCase):
+    """Tests pour l'index d'applicabilité des promotions"""
+
+    def setUp(self):
+        # Le calendrier des promotions en cache survit au rollback du test
+        self.addCleanup(cache.clear)
+        self.parent = Category.objects.create(name='Informatique')
+        self.child = Category.objects.create(name='Portables', parent=self.parent)
+        self.other = Category.objects.create(name='Audio')
+        self.laptop = Product.objects.create(
+            name='Laptop', brand='Test', price=Decimal('500000.00'), category=self.child
+        )
+        self.speaker = Product.objects.create(
+            name='Enceinte', brand='Test', price=Decimal('50000.00'), category=self.other
+        )
+        self.promo = Promotion.objects.create(
+            name='Informatique', promotion_type='percent', value=Decimal('10')
+        )
+
+    def test_category_target_indexes_descendant_products(self):
+        """Cibler une catégorie indexe les produits des sous-catégories"""
+        self.promo.categories.add(self.parent)
+        self.assertTrue(self.promo.applies_to_product(self.laptop))
+        self.assertFalse(self.promo.applies_to_product(self.speaker))
+
+    def test_product_target_and_removal(self):
+        """L'index suit les ajouts et retraits du M2M produits"""
+        self.promo.products.add(self.speaker)
+        self.assertIn(self.promo, Promotion.objects.for_product(self.speaker))
+        self.promo.products.remove(self.speaker)
+        self.assertNotIn(self.promo, Promotion.objects.for_product(self.speaker))
+
+    def test_new_product_in_targeted_category(self):
+        """Un produit créé dans une catégorie ciblée est indexé"""
+        self.promo.categories.add(self.parent)
+        product = Product.objects.create(
+            name='Autre laptop', brand='Test', price=Decimal('400000.00'), category=self.child
+        )
+        self.assertTrue(self.promo.applies_to_product(product))
+
+    def test_category_move_reindexes(self):
+        """Déplacer une catégorie met à jour l'index"""
+        self.promo.categories.add(self.parent)
+        child = Category.objects.get(pk=self.child.pk)
+        child.parent = None
+        child.save()
+        self.assertFalse(self.promo.applies_to_product(self.laptop))
+
+    def test_product_reindexed_on_category_change_only(self):
+        """Seul un changement de catégorie réindexe le produit"""
+        self.promo.categories.add(self.parent)
+        laptop = Product.objects.get(pk=self.laptop.pk)
+        with mock.patch.object(PromotionIndexService, 'reindex_products') as reindex:
+            laptop.name = 'Laptop Pro'
+            laptop.save()
+            reindex.assert_not_called()
+
+        laptop.category = self.other
+        laptop.save()
+        self.assertFalse(self.promo.applies_to_product(laptop))
+
+    def test_rebuild_matches_incremental_index(self):
+        """Une reconstruction complète donne le même index"""
+        self.promo.categories.add(self.parent)
+        self.promo.products.add(self.speaker)
+        before = PromotionIndexService.get_promotion_ids([self.laptop.pk, self.speaker.pk])
+        PromotionIndexService.rebuild()
+        after = PromotionIndexService.get_promotion_ids([self.laptop.pk, self.speaker.pk])
+        self.assertEqual(before, after)
+
+
+class NewsletterServiceTests(TestCase):
+    """Tests pour l'envoi des campagnes newsletter"""
+
+    def setUp(self):
+        self.template = NewsletterTemplate.objects.create(
+            name='Promo',
+            subject='Bonjour {name}',
+            plain_content='Salut {name} ({email}) - {unsubscribe_url}',
+            html_content='<p>Salut {name}</p>',
+        )
+        self.subscribers = [
+            NewsletterSubscriber.objects.create(email=f'client{i}@example.com', name=f'Client {i}')
+            for i in range(5)
+        ]
+        self.campaign = NewsletterCampaign.objects.create(name='Soldes', template=self.template)
+        self.campaign.subscribers.set(self.subscribers)
+
+    def test_send_campaign(self):
+        """Test envoi d'une campagne à tous les destinataires"""
+        sent = NewsletterService.send_campaign(self.campaign, chunk_size=2, workers=2)
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(sub.email for sub in self.subscribers)
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(self.campaign.sent_count, 5)
+        self.assertEqual(NewsletterLog.objects.filter(campaign=self.campaign, status='sent').count(), 5)
+
+    def test_connections_reused_across_chunks(self):
+        """Test une connexion par worker pour toute la campagne"""
+        with mock.patch('showcase.mail_pool.get_connection', wraps=mail.get_connection) as factory:
+            NewsletterService.send_campaign(self.campaign, chunk_size=1, workers=2)
+        self.assertEqual(factory.call_count, 2)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failure_attributed_to_recipient(self):
+        """Test échec d'un destinataire sans bloquer les autres"""
+        failing = self.subscribers[2].email
+        backend = mail.get_connection()
+        original = backend.send_messages
+
+        def send_messages(messages):
+            if messages[0].to == [failing]:
+                raise OSError('refusé')
+            return original(messages)
+
+        backend.send_messages = send_messages
+        pool = MailConnectionPool(size=1, connection_factory=lambda **kwargs: backend)
+        with mock.patch.object(NewsletterService, 'open_mail_pool', return_value=pool):
+            sent = NewsletterService.send_campaign(self.campaign)
+
+        self.assertEqual(sent, 4)
+        log = NewsletterLog.objects.get(campaign=self.campaign, status='failed')
+        self.assertEqual(log.subscriber.email, failing)
+        self.assertEqual(log.error, 'refusé')
+
+    def test_rate_limit_per_connection(self):
+        """Test débit maximal respecté par connexion"""
+        with mock.patch('showcase.mail_pool.time.sleep') as sleep:
+            NewsletterService.send_campaign(self.campaign, workers=1, rate=10)
+        self.assertEqual(sleep.call_count, 4)
+
+    def test_dispatch_campaign_in_chunks(self):
+        """Test envoi réparti en tâches par plage d'ids"""
+        self.assertEqual(NewsletterService.dispatch_campaign(self.campaign, chunk_size=2), 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(self.campaign.sent_count, 5)
+
+    def test_results_summarized_per_campaign(self):
+        """Test logs écrits par lot et totaux par classe d'erreur"""
+        self.template.plain_content = 'Salut {name} {inconnu}'
+        self.template.save()
+        NewsletterService.send_campaign(self.campaign, chunk_size=5)
+
+        stats = NewsletterCampaignStats.objects.get(campaign=self.campaign)
+        self.assertEqual(stats.sent, 0)
+        self.assertEqual(stats.failed, 5)
+        self.assertEqual(stats.error_counts, {'KeyError': 5})
+        self.assertEqual(NewsletterLog.objects.filter(campaign=self.campaign, status='failed').count(), 5)
+
+    def test_resume_skips_sent_recipients(self):
+        """Test reprise d'une campagne interrompue sans doublon"""
+        first, second = self.subscribers[0].pk, self.subscribers[1].pk
+        NewsletterService.start_campaign(self.campaign)
+        NewsletterService.send_chunk(self.campaign, min(first, second), max(first, second))
+        self.campaign.status = 'cancelled'
+        self.campaign.save(update_fields=['status'])
+        mail.outbox.clear()
+
+        NewsletterService.resume_campaign(self.campaign)
+        self.assertEqual(len(mail.outbox), 3)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(self.campaign.sent_count, 5)
+
+    def test_campaign_in_progress_not_dispatched_again(self):
+        """Test pas de seconde série de tâches pendant un envoi"""
+        NewsletterService.start_campaign(self.campaign)
+        self.assertEqual(NewsletterService.resume_campaign(self.campaign), 0)
+        self.assertEqual(NewsletterService.dispatch_campaign(self.campaign), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_chunk_failure_cancels_campaign(self):
+        """Test plage en échec après les tentatives : campagne annulée puis reprise"""
+        with mock.patch.object(NewsletterService, 'send_chunk', side_effect=OSError('SMTP indisponible')):
+            with self.assertRaises(OSError):
+                NewsletterService.dispatch_campaign(self.campaign, chunk_size=2)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'cancelled')
+
+        NewsletterService.resume_campaign(self.campaign, chunk_size=2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+
+    def test_chunk_retried_before_cancelling(self):
+        """Test plage en échec renvoyée tant qu'il reste des tentatives"""
+        NewsletterService.start_campaign(self.campaign)
+        first = self.subscribers[0].pk
+        with mock.patch.object(NewsletterService, 'send_chunk', side_effect=OSError('SMTP indisponible')):
+            for retries, expected in ((0, Retry), (send_newsletter_chunk.max_retries, OSError)):
+                send_newsletter_chunk.push_request(retries=retries, is_eager=False)
+                try:
+                    with mock.patch.object(send_newsletter_chunk, 'retry', side_effect=Retry):
+                        with self.assertRaises(expected):
+                            send_newsletter_chunk.run(self.campaign.pk, first, first)
+                finally:
+                    send_newsletter_chunk.pop_request()
+                self.campaign.refresh_from_db()
+                self.assertEqual(self.campaign.status, 'sending' if expected is Retry else 'cancelled')
+
+    def test_resume_retries_failed_recipients(self):
+        """Test destinataires en échec renvoyés à la reprise"""
+        failing = self.subscribers[0]
+        with mock.patch.object(
+            MailConnectionPool, 'send',
+            side_effect=lambda messages: [OSError('refusé') for _ in messages]
+        ):
+            NewsletterService.send_campaign(self.campaign)
+        self.assertEqual(NewsletterLog.objects.filter(status='failed').count(), 5)
+
+        self.assertEqual(NewsletterService.resume_campaign(self.campaign), 0)
+        NewsletterService.resume_campaign(self.campaign, retry_failed=True)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn([failing.email], [message.to for message in mail.outbox])
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.sent_count, 5)
+
+    def test_retry_updates_failed_recipients(self):
+        """Test échecs par destinataire corrigés par une reprise réussie"""
+        refuse = mock.patch.object(
+            MailConnectionPool, 'send',
+            side_effect=lambda messages: [OSError('refusé') for _ in messages]
+        )
+        with refuse:
+            NewsletterService.send_campaign(self.campaign)
+            NewsletterService.resume_campaign(self.campaign, retry_failed=True)
+        stats = NewsletterCampaignStats.objects.get(campaign=self.campaign)
+        self.assertEqual(stats.failed, 5)
+        self.assertEqual(stats.error_counts, {'OSError': 10})
+
+        NewsletterService.resume_campaign(self.campaign, retry_failed=True)
+        stats.refresh_from_db()
+        self.assertEqual(stats.sent, 5)
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(stats.error_counts, {'OSError': 10})
+
+    def test_compiled_template_matches_format(self):
+        """Test rendu compilé identique à str.format"""
+        self.template.html_content = "<p>{{ {name} }}</p><a href='{unsubscribe_url}'>{email!s:>30}</a>"
+        compiled = self.template.compile()
+        sub = self.subscribers[0]
+        context = {'name': sub.name, 'email': sub.email, 'unsubscribe_url': sub.get_unsubscribe_url()}
+
+        with self.assertNumQueries(0):
+            subject, text, html = compiled.render(sub)
+        self.assertEqual(subject, self.template.subject.format(name=sub.name, email=sub.email))
+        self.assertEqual(text, self.template.plain_content.format(**context))
+        self.assertEqual(html, self.template.html_content.format(**context))
+
+    def test_compiled_template_unknown_field(self):
+        """Test champ inconnu : même erreur qu'avec str.format"""
+        self.template.plain_content = 'Salut {prenom}'
+        with self.assertRaises(KeyError):
+            self.template.compile().render(self.subscribers[0])
+
+    def test_recipients_streamed_by_key(self):
+        """Test plages lues par clé, audience par défaut sans exists() préalable"""
+        self.campaign.subscribers.clear()
+        for sub in self.subscribers[:4]:
+            sub.confirm()
+        pks = sorted(sub.pk for sub in self.subscribers[:4])
+
+        with self.assertNumQueries(3):
+            ranges = list(NewsletterService.recipient_ranges(self.campaign, chunk_size=2))
+        self.assertEqual(ranges, [(pks[0], pks[1]), (pks[2], pks[3])])
+        self.assertEqual(
+            list(NewsletterService.recipient_ranges(self.campaign, chunk_size=2, after_pk=pks[1])),
+            [(pks[2], pks[3])]
+        )
+
+    def test_send_campaign_resumes_from_checkpoint(self):
+        """Test envoi synchrone repris après le dernier destinataire traité"""
+        pks = sorted(sub.pk for sub in self.subscribers)
+        NewsletterService.save_checkpoint(self.campaign, pks[2])
+        self.assertEqual(NewsletterService.send_campaign(self.campaign, chunk_size=2), 2)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(sub.email for sub in self.subscribers if sub.pk > pks[2])
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.checkpoint_pk, pks[-1])
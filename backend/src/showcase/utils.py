@@ -1,3 +1,5 @@
+import re
+import unicodedata
 import urllib.parse
 from datetime import datetime
 from decimal import Decimal
@@ -5,8 +7,11 @@ import locale
 import pytz
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.db.models import Q
 from django.utils.text import slugify
 
+from .constants import PRICE_RANGES
+
 
 def format_price(price, with_decimals=False, display_mode=True, use_locale=False):
     """
@@ -45,6 +50,30 @@ def format_price(price, with_decimals=False, display_mode=True, use_locale=False
     except Exception:
         return str(price) + " FCFA"
 
+def get_price_range_q(key):
+    """Condition sur `price` d'une gamme de `PRICE_RANGES` (None si clé inconnue)"""
+    for range_key, _label, minimum, maximum in PRICE_RANGES:
+        if range_key == key:
+            condition = Q()
+            if minimum is not None:
+                condition &= Q(price__gte=minimum)
+            if maximum is not None:
+                condition &= Q(price__lt=maximum)
+            return condition
+    return None
+
+
+def normalize_search_text(value):
+    """
+    Texte de recherche normalisé : minuscules, sans accents ni ponctuation.
+    Ex : « Écran Œil-de-bœuf 24\" » → « ecran oeil de boeuf 24 »
+    """
+    value = str(value or '').replace('œ', 'oe').replace('Œ', 'OE').replace('æ', 'ae').replace('Æ', 'AE')
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char)).lower()
+    return ' '.join(re.findall(r'[^\W_]+', value))
+
+
 def generate_unique_slug(model_class, base_text, max_length=180, slug_field='slug'):
     base_slug = slugify(base_text)[:max_length-10]
     slug = base_slug
@@ -74,10 +103,16 @@ def generate_sku(category_slug, model_class, prefix_length=3):
 
     return f"{prefix}-{new_num:05d}"
 
-def build_whatsapp_message(product, settings_obj):
-    benin_tz = pytz.timezone("Africa/Porto-Novo")
-    current_hour = datetime.now(benin_tz).hour
-    salutation = "Bonsoir" if current_hour >= 12 else "Bonjour"
+BENIN_TZ = pytz.timezone("Africa/Porto-Novo")
+WHATSAPP_SALUTATIONS = ("Bonjour", "Bonsoir")
+
+
+def get_whatsapp_salutation():
+    current_hour = datetime.now(BENIN_TZ).hour
+    return "Bonsoir" if current_hour >= 12 else "Bonjour"
+
+def build_whatsapp_message(product, settings_obj, salutation=None):
+    salutation = salutation or get_whatsapp_salutation()
 
     message_parts = [
         f"{salutation} {settings_obj.company_name},",
@@ -3,9 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q, F
-from django.utils import timezone
+from django.db.models import Count, Q
 
+from .constants import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
 from .models import (
     Category, Product, ProductImage, Promotion, 
     NewsletterSubscriber, NewsletterTemplate, NewsletterCampaign,
@@ -23,9 +23,17 @@ from .serializers import (
 )
 
 from .api_filters import (
-    ProductFilter, CategoryFilter, PromotionFilter, NewsletterCampaignFilter,
+    get_filter_params, ProductFilter, CategoryFilter, PromotionFilter, NewsletterCampaignFilter,
     NewsletterSubscriberFilter, NewsletterTemplateFilter
 )
+from .category_tree import get_category_tree
+from .pagination import CursorPaginationMixin
+from .promotion_timeline import get_active_promotion_ids
+from .response_cache import cache_response
+from .suggest_index import get_suggest_index
+from .services.counter_service import EngagementCounterService
+from .services.facet_service import FacetService
+from .services.stats_service import ProductStatsService
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -51,12 +59,24 @@ class CategoryViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action != 'minimal':
+            queryset = queryset.with_product_counts()
         return queryset
     
+    @cache_response('categories', 'products')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response('categories', 'products')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @cache_response('categories', 'products')
     def tree(self, request):
         """Retourne l'arborescence complète des catégories"""
-        root_categories = self.get_queryset().filter(parent__isnull=True)
+        # Servi depuis l'instantané en mémoire de l'arbre
+        root_categories = get_category_tree().get_root_nodes()
         serializer = self.get_serializer(root_categories, many=True)
         return Response(serializer.data)
     
@@ -71,7 +91,9 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def products(self, request, slug=None):
         """Retourne les produits d'une catégorie"""
         category = self.get_object()
-        products = category.products.filter(is_active=True)
+        products = category.products.filter(is_active=True).select_related(
+            'category', 'status'
+        ).prefetch_related('images')
         
         # Utiliser le ProductListSerializer
         from .serializers import ProductListSerializer
@@ -79,15 +101,23 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     """
-    ViewSet pour les produits avec filtres avancés
+    ViewSet pour les produits avec filtres avancés.
+    Les flux acceptent `?pagination=cursor` (pagination par curseur, sans comptage).
     """
     queryset = Product.objects.all().select_related('category', 'status').prefetch_related('images').order_by('-created_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
     lookup_field = 'slug'
+    cursor_orderings = {
+        'list': '-created_at',
+        'recent': '-created_at',
+        'recommended': '-created_at',
+        'on_sale': '-created_at',
+        'featured': '-featured_score',
+    }
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -105,8 +135,17 @@ class ProductViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_active=True)
         
+        # La liste n'affiche que l'image principale
+        if self.action == 'list':
+            queryset = queryset.prefetch_related(None).with_primary_image()
+        
         return queryset
     
+    @cache_response('products', 'categories', 'promotions', 'settings')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response('products', 'categories', 'promotions', 'settings')
     def retrieve(self, request, *args, **kwargs):
         """Retourner le détail du produit"""
         instance = self.get_object()
@@ -114,6 +153,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('products', 'categories', 'promotions', 'settings')
     def featured(self, request):
         """Retourne les produits mis en avant"""
         queryset = self.get_queryset().filter(status__is_featured=True)
@@ -128,6 +168,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('products', 'categories', 'promotions', 'settings')
     def recent(self, request):
         """Retourne les produits récemment ajoutés"""
         queryset = self.get_queryset().order_by('-created_at')
@@ -141,6 +182,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('products', 'categories', 'promotions', 'settings')
     def recommended(self, request):
         """Retourne les produits recommandés"""
         queryset = self.get_queryset().filter(status__is_recommended=True)
@@ -156,20 +198,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Retourne les statistiques des produits"""
-        total = self.get_queryset().count()
-        featured = self.get_queryset().filter(status__is_featured=True).count()
-        on_sale = self.get_queryset().exclude(Q(compare_at_price__isnull=True) | Q(compare_at_price__lte=0)).count()
-        in_stock = self.get_queryset().filter(is_in_stock=True).count()
-        
-        return Response({
-            'total_products': total,
-            'featured_products': featured,
-            'on_sale_products': on_sale,
-            'in_stock_products': in_stock,
-        })
+        """Retourne les statistiques des produits (cache court, recalcul en tâche de fond)"""
+        scope = 'all' if request.user.is_authenticated else 'public'
+        return Response(ProductStatsService.get(scope))
     
     @action(detail=False, methods=['get'])
+    @cache_response('products', 'categories', 'promotions', 'settings')
     def on_sale(self, request):
         """Retourne les produits en promotion"""
         queryset = self.get_queryset().exclude(
@@ -185,14 +219,34 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    @cache_response(
+        'products', 'categories',
+        key_params=get_filter_params(ProductFilter) - {'ordering'}
+    )
+    def facets(self, request):
+        """Comptages par facette des produits correspondant aux filtres courants"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(FacetService.get_facets(queryset))
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Autocomplétion : `?q=` préfixes, servie par l'index en mémoire"""
+        try:
+            limit = min(int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT)), SUGGEST_MAX_LIMIT)
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+
+        entries = get_suggest_index().search(request.query_params.get('q', ''), max(limit, 1))
+        return Response([entry.as_dict() for entry in entries])
+    
     @action(detail=True, methods=['post'])
     def track_click(self, request, slug=None):
         """Enregistrer un clic sur le produit (WhatsApp par exemple)"""
         product = self.get_object()
         
         if hasattr(product, 'status') and product.status:
-            product.status.clicks_count = F('clicks_count') + 1
-            product.status.save(update_fields=['clicks_count'])
+            EngagementCounterService.record_click(product.status.pk)
         
         return Response({'status': 'click tracked'})
     
@@ -202,9 +256,9 @@ class ProductViewSet(viewsets.ModelViewSet):
         product = self.get_object()
         
         if hasattr(product, 'status') and product.status:
-            product.status.increment_view_count()
+            EngagementCounterService.record_view(product.status.pk)
         
-        return Response({'status': 'view tracked', 'view_count': product.status.view_count})
+        return Response({'status': 'view tracked', 'view_count': product.status.live_view_count})
 
 
 class PromotionViewSet(viewsets.ModelViewSet):
@@ -227,24 +281,19 @@ class PromotionViewSet(viewsets.ModelViewSet):
         
         # Filtrer uniquement les promotions actives pour les non-authentifiés
         if not self.request.user.is_authenticated:
-            now = timezone.now()
-            queryset = queryset.filter(
-                active=True,
-                start_at__lte=now,
-                end_at__gte=now
-            )
+            queryset = queryset.filter(pk__in=get_active_promotion_ids())
         
         return queryset
     
+    @cache_response('promotions')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @cache_response('promotions')
     def active(self, request):
         """Retourne les promotions actuellement actives"""
-        now = timezone.now()
-        queryset = self.get_queryset().filter(
-            active=True,
-            start_at__lte=now,
-            end_at__gte=now
-        )
+        queryset = self.get_queryset().filter(pk__in=get_active_promotion_ids())
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -400,7 +449,7 @@ class NewsletterCampaignViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour les campagnes newsletter
     """
-    queryset = NewsletterCampaign.objects.all().select_related('template').prefetch_related('subscribers').order_by('-created_at')
+    queryset = NewsletterCampaign.objects.all().select_related('template', 'stats').prefetch_related('subscribers').order_by('-created_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = NewsletterCampaignFilter
@@ -451,6 +500,7 @@ class SiteSettingsViewSet(viewsets.ReadOnlyModelViewSet):
         return SiteSettings.objects.all()
     
     @action(detail=False, methods=['get'])
+    @cache_response('settings')
     def current(self, request):
         """Retourne les paramètres actuels du site"""
         settings = SiteSettings.get_settings()